@@ -10,6 +10,14 @@ from app.models.user import User
 from app.models.lesson import Lesson
 from app.models.organisation import Organisation
 from app.models.associations import LessonStudent, lesson_teachers
+from app.models.change import LessonTombstone
+from app.models.invoice import Invoice, InvoiceLine, InvoiceRun
+from app.models.archive import ArchivedLesson, ArchivedLessonStudent, archive_lesson_teachers
+from app.models.series import LessonSeries, LessonSeriesExdate, series_students, series_teachers
+from app.models.payroll import PayrollSnapshot, PayrollSnapshotLine
+from app.models.reminder import LessonReminder
+from app.models.shard import OrganisationShard, UserEmail
+from app.models.audit import AuditEvent
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -63,11 +71,17 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
+    # alembic -x shard=<name> upgrade head migrates one shard of app.tenancy instead
+    shard = context.get_x_argument(as_dictionary=True).get("shard")
+    if shard is not None:
+        from app.tenancy import tenants
+        connectable = tenants.engine(shard)
+    else:
+        connectable = engine_from_config(
+            config.get_section(config.config_ini_section, {}),
+            prefix="sqlalchemy.",
+            poolclass=pool.NullPool,
+        )
 
     with connectable.connect() as connection:
         context.configure(
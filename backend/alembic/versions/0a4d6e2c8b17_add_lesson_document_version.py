@@ -0,0 +1,26 @@
+"""add lesson document version
+
+Revision ID: 0a4d6e2c8b17
+Revises: f1b7d4e8a235
+Create Date: 2026-10-19 16:02:44.381205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a4d6e2c8b17'
+down_revision: Union[str, Sequence[str], None] = 'f1b7d4e8a235'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("lessons", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade() -> None:
+    op.drop_column("lessons", "version")
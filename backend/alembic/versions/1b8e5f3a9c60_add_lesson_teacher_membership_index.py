@@ -0,0 +1,26 @@
+"""add lesson teacher membership index
+
+Revision ID: 1b8e5f3a9c60
+Revises: 0a4d6e2c8b17
+Create Date: 2026-10-19 16:41:12.507316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b8e5f3a9c60'
+down_revision: Union[str, Sequence[str], None] = '0a4d6e2c8b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_lesson_teachers_lesson_id_teacher_id", "lesson_teachers", ["lesson_id", "teacher_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lesson_teachers_lesson_id_teacher_id", table_name="lesson_teachers")
@@ -0,0 +1,71 @@
+"""store lesson student statuses as enums
+
+Revision ID: 2c9f7a4d1e83
+Revises: 1b8e5f3a9c60
+Create Date: 2026-10-19 17:12:37.640219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c9f7a4d1e83'
+down_revision: Union[str, Sequence[str], None] = '1b8e5f3a9c60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+attendance_status = postgresql.ENUM("assigned", "attended", "missed", "cancelled", name="attendance_status")
+payment_status = postgresql.ENUM("unpaid", "paid", name="payment_status")
+
+TABLES = ("lesson_students", "archive_lesson_students")
+ENUMS = {"attendance_status": attendance_status, "payment_status": payment_status}
+# varchar server defaults from 16d758107c57 (the archive tables have none); postgres can't cast
+# a default along with its column, so they come off before the type changes and go back after
+SERVER_DEFAULTS = {("lesson_students", "attendance_status"): "assigned", ("lesson_students", "payment_status"): "unpaid"}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    attendance_status.create(bind, checkfirst=True)
+    payment_status.create(bind, checkfirst=True)
+
+    # rewrites the tables (and every archive partition) with the compact type
+    for table in TABLES:
+        for column, enum in ENUMS.items():
+            default = SERVER_DEFAULTS.get((table, column))
+            if default is not None:
+                op.alter_column(table, column, server_default=None)
+            op.alter_column(table, column, type_=enum, postgresql_using=f"{column}::{enum.name}")
+            if default is not None:
+                op.alter_column(table, column, server_default=sa.text(f"'{default}'::{enum.name}"))
+
+    op.create_index(
+        "ix_lesson_students_unpaid", "lesson_students", ["student_id", "lesson_id"],
+        postgresql_where=sa.text("payment_status = 'unpaid'"),
+    )
+    op.create_index(
+        "ix_lesson_students_assigned", "lesson_students", ["lesson_id"],
+        postgresql_where=sa.text("attendance_status = 'assigned'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lesson_students_assigned", table_name="lesson_students")
+    op.drop_index("ix_lesson_students_unpaid", table_name="lesson_students")
+
+    for table in TABLES:
+        for column in ENUMS:
+            default = SERVER_DEFAULTS.get((table, column))
+            if default is not None:
+                op.alter_column(table, column, server_default=None)
+            op.alter_column(table, column, type_=sa.String(), postgresql_using=f"{column}::text")
+            if default is not None:
+                op.alter_column(table, column, server_default=default)
+
+    bind = op.get_bind()
+    payment_status.drop(bind, checkfirst=True)
+    attendance_status.drop(bind, checkfirst=True)
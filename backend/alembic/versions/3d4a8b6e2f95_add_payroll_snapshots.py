@@ -0,0 +1,46 @@
+"""add payroll snapshots
+
+Revision ID: 3d4a8b6e2f95
+Revises: 2c9f7a4d1e83
+Create Date: 2026-10-19 17:48:05.219733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d4a8b6e2f95'
+down_revision: Union[str, Sequence[str], None] = '2c9f7a4d1e83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "payroll_snapshots",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("organisation_id", sa.Integer(), sa.ForeignKey("organisations.id"), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint("organisation_id", "period_start", name="uq_payroll_snapshots_org_period"),
+    )
+
+    op.create_table(
+        "payroll_snapshot_lines",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("snapshot_id", sa.Integer(), sa.ForeignKey("payroll_snapshots.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("teacher_id", sa.Integer(), nullable=False),
+        sa.Column("teacher_name", sa.String(), nullable=False),
+        sa.Column("lesson_count", sa.Integer(), nullable=False),
+        sa.Column("minutes", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_payroll_snapshot_lines_snapshot_id", "payroll_snapshot_lines", ["snapshot_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_payroll_snapshot_lines_snapshot_id", table_name="payroll_snapshot_lines")
+    op.drop_table("payroll_snapshot_lines")
+    op.drop_table("payroll_snapshots")
@@ -0,0 +1,39 @@
+"""add lesson reminders
+
+Revision ID: 4e7b1c9d5a02
+Revises: 3d4a8b6e2f95
+Create Date: 2026-10-19 18:21:49.873104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e7b1c9d5a02'
+down_revision: Union[str, Sequence[str], None] = '3d4a8b6e2f95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_lessons_date_time", "lessons", ["date", "time"])
+
+    op.create_table(
+        "lesson_reminders",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("lesson_id", sa.Integer(), sa.ForeignKey("lessons.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("lesson_date", sa.Date(), nullable=False),
+        sa.Column("lesson_time", sa.Time(), nullable=False),
+        sa.Column("claimed_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint("lesson_id", "user_id", "lesson_date", "lesson_time", name="uq_lesson_reminders_lesson_user_start"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("lesson_reminders")
+    op.drop_index("ix_lessons_date_time", table_name="lessons")
@@ -0,0 +1,31 @@
+"""add organisation shards
+
+Revision ID: 5f2c8d1a7e46
+Revises: 4e7b1c9d5a02
+Create Date: 2026-10-19 20:02:13.518240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2c8d1a7e46'
+down_revision: Union[str, Sequence[str], None] = '4e7b1c9d5a02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "organisation_shards",
+        sa.Column("organisation_id", sa.Integer(), primary_key=True),
+        sa.Column("shard", sa.String(), nullable=False),
+        sa.Column("moving", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("organisation_shards")
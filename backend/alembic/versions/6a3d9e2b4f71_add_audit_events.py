@@ -0,0 +1,54 @@
+"""add audit events
+
+Revision ID: 6a3d9e2b4f71
+Revises: 5f2c8d1a7e46
+Create Date: 2026-10-19 21:14:37.602915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a3d9e2b4f71'
+down_revision: Union[str, Sequence[str], None] = '5f2c8d1a7e46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "audit_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("organisation_id", sa.Integer(), sa.ForeignKey("organisations.id"), nullable=False),
+        sa.Column("actor_id", sa.Integer(), nullable=True),
+        sa.Column("action", sa.String(), nullable=False),
+        sa.Column("lesson_id", sa.Integer(), nullable=False),
+        sa.Column("student_id", sa.Integer(), nullable=True),
+        sa.Column("changes", sa.JSON(), nullable=False),
+        sa.Column("occurred_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_audit_events_org_occurred", "audit_events", ["organisation_id", "occurred_at", "id"])
+    op.create_index("ix_audit_events_org_lesson_occurred", "audit_events", ["organisation_id", "lesson_id", "occurred_at"])
+    # append-only: rows may be inserted (and deleted with their organisation) but never rewritten
+    op.execute("""
+        CREATE OR REPLACE FUNCTION audit_events_immutable() RETURNS trigger AS $$
+        BEGIN
+            RAISE EXCEPTION 'audit_events rows cannot be updated';
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(
+        "CREATE TRIGGER audit_events_no_update BEFORE UPDATE ON audit_events "
+        "FOR EACH ROW EXECUTE FUNCTION audit_events_immutable()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS audit_events_no_update ON audit_events")
+    op.execute("DROP FUNCTION IF EXISTS audit_events_immutable()")
+    op.drop_index("ix_audit_events_org_lesson_occurred", table_name="audit_events")
+    op.drop_index("ix_audit_events_org_occurred", table_name="audit_events")
+    op.drop_table("audit_events")
@@ -0,0 +1,28 @@
+"""add lesson copied from
+
+Revision ID: 7b4e1f3c8d25
+Revises: 6a3d9e2b4f71
+Create Date: 2026-10-19 23:05:12.418630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b4e1f3c8d25'
+down_revision: Union[str, Sequence[str], None] = '6a3d9e2b4f71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("lessons", sa.Column("copied_from_id", sa.Integer(), nullable=True))
+    op.create_index("ix_lessons_copied_from_id", "lessons", ["copied_from_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lessons_copied_from_id", table_name="lessons")
+    op.drop_column("lessons", "copied_from_id")
@@ -0,0 +1,32 @@
+"""add user email directory
+
+Revision ID: 8c2f6a9d3e14
+Revises: 7b4e1f3c8d25
+Create Date: 2026-10-20 09:41:27.306815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2f6a9d3e14'
+down_revision: Union[str, Sequence[str], None] = '7b4e1f3c8d25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_emails",
+        sa.Column("email", sa.String(), primary_key=True),
+        sa.Column("organisation_id", sa.Integer(), nullable=True),
+    )
+    # users of this database; those on other shards are added by python -m app.tenancy index-emails
+    op.execute("INSERT INTO user_emails (email, organisation_id) SELECT email, organisation_id FROM users")
+
+
+def downgrade() -> None:
+    op.drop_table("user_emails")
@@ -0,0 +1,28 @@
+"""allow audit events without a lesson
+
+Revision ID: 9d4a7e2c5b16
+Revises: 8c2f6a9d3e14
+Create Date: 2026-10-20 14:12:03.518240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4a7e2c5b16'
+down_revision: Union[str, Sequence[str], None] = '8c2f6a9d3e14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # term rollovers record one event for all the lessons they copy
+    op.alter_column("audit_events", "lesson_id", existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM audit_events WHERE lesson_id IS NULL")
+    op.alter_column("audit_events", "lesson_id", existing_type=sa.Integer(), nullable=False)
@@ -0,0 +1,58 @@
+"""add user search indexes
+
+Revision ID: a1c4e9b2d3f0
+Revises: 7f3c771a0a6d
+Create Date: 2026-10-19 09:12:44.318201
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c4e9b2d3f0'
+down_revision: Union[str, Sequence[str], None] = '7f3c771a0a6d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.create_index(
+        "ix_users_org_name_id",
+        "users",
+        ["organisation_id", "name", "id"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_users_org_role_name_id",
+        "users",
+        ["organisation_id", "role", "name", "id"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_users_name_trgm",
+        "users",
+        ["name"],
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_users_email_trgm",
+        "users",
+        ["email"],
+        postgresql_using="gin",
+        postgresql_ops={"email": "gin_trgm_ops"},
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_email_trgm", table_name="users")
+    op.drop_index("ix_users_name_trgm", table_name="users")
+    op.drop_index("ix_users_org_role_name_id", table_name="users")
+    op.drop_index("ix_users_org_name_id", table_name="users")
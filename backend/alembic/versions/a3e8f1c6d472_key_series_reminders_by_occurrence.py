@@ -0,0 +1,54 @@
+"""key series reminders by occurrence
+
+Revision ID: a3e8f1c6d472
+Revises: 9d4a7e2c5b16
+Create Date: 2026-10-21 10:05:44.127903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e8f1c6d472'
+down_revision: Union[str, Sequence[str], None] = '9d4a7e2c5b16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "lesson_reminders",
+        sa.Column("series_id", sa.Integer(), sa.ForeignKey("lesson_series.id", ondelete="CASCADE"), nullable=True),
+    )
+    op.add_column("lesson_reminders", sa.Column("occurrence_date", sa.Date(), nullable=True))
+    op.alter_column("lesson_reminders", "lesson_id", existing_type=sa.Integer(), nullable=True)
+    # markers of stored series occurrences move to the occurrence key, which virtual occurrences share
+    op.execute(
+        "UPDATE lesson_reminders SET series_id = lessons.series_id, occurrence_date = lessons.occurrence_date, "
+        "lesson_id = NULL FROM lessons WHERE lessons.id = lesson_reminders.lesson_id AND lessons.series_id IS NOT NULL"
+    )
+    op.create_unique_constraint(
+        "uq_lesson_reminders_occurrence_user_start",
+        "lesson_reminders",
+        ["series_id", "occurrence_date", "user_id", "lesson_date", "lesson_time"],
+    )
+    op.create_check_constraint(
+        "ck_lesson_reminders_lesson_or_series", "lesson_reminders", "(lesson_id IS NULL) <> (series_id IS NULL)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("ck_lesson_reminders_lesson_or_series", "lesson_reminders", type_="check")
+    op.drop_constraint("uq_lesson_reminders_occurrence_user_start", "lesson_reminders", type_="unique")
+    op.execute(
+        "UPDATE lesson_reminders SET lesson_id = lessons.id FROM lessons "
+        "WHERE lessons.series_id = lesson_reminders.series_id AND lessons.occurrence_date = lesson_reminders.occurrence_date"
+    )
+    # reminders of occurrences that were never stored have no lesson to point at
+    op.execute("DELETE FROM lesson_reminders WHERE lesson_id IS NULL")
+    op.alter_column("lesson_reminders", "lesson_id", existing_type=sa.Integer(), nullable=False)
+    op.drop_column("lesson_reminders", "occurrence_date")
+    op.drop_column("lesson_reminders", "series_id")
@@ -0,0 +1,72 @@
+"""track series occurrences in changes and invoices
+
+Revision ID: b5d2f7a9c318
+Revises: a3e8f1c6d472
+Create Date: 2026-10-21 14:26:09.381547
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d2f7a9c318'
+down_revision: Union[str, Sequence[str], None] = 'a3e8f1c6d472'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "lesson_series_tombstones",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("series_id", sa.Integer(), nullable=False),
+        sa.Column("occurrence_date", sa.Date(), nullable=True),
+        sa.Column("organisation_id", sa.Integer(), sa.ForeignKey("organisations.id"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index(
+        "ix_lesson_series_tombstones_org_user_deleted",
+        "lesson_series_tombstones",
+        ["organisation_id", "user_id", "deleted_at"],
+    )
+
+    op.add_column("invoice_lines", sa.Column("series_id", sa.Integer(), nullable=True))
+    op.add_column("invoice_lines", sa.Column("occurrence_date", sa.Date(), nullable=True))
+    op.alter_column("invoice_lines", "lesson_id", existing_type=sa.Integer(), nullable=True)
+    # lines of stored series occurrences also get the occurrence key, so they are not billed again
+    op.execute(
+        "UPDATE invoice_lines SET series_id = lessons.series_id, occurrence_date = lessons.occurrence_date "
+        "FROM lessons WHERE lessons.id = invoice_lines.lesson_id AND lessons.series_id IS NOT NULL"
+    )
+    op.create_unique_constraint(
+        "uq_invoice_lines_occurrence_student",
+        "invoice_lines",
+        ["series_id", "occurrence_date", "student_id"],
+    )
+    op.create_check_constraint(
+        "ck_invoice_lines_lesson_or_series", "invoice_lines", "lesson_id IS NOT NULL OR series_id IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "UPDATE invoice_lines SET lesson_id = lessons.id FROM lessons "
+        "WHERE invoice_lines.lesson_id IS NULL AND lessons.series_id = invoice_lines.series_id "
+        "AND lessons.occurrence_date = invoice_lines.occurrence_date"
+    )
+    # billed lines are never dropped; store those occurrences before downgrading
+    unstored = op.get_bind().execute(sa.text("SELECT count(*) FROM invoice_lines WHERE lesson_id IS NULL")).scalar()
+    if unstored:
+        raise RuntimeError(f"{unstored} invoice lines bill series occurrences that are not stored as lessons")
+    op.drop_constraint("ck_invoice_lines_lesson_or_series", "invoice_lines", type_="check")
+    op.drop_constraint("uq_invoice_lines_occurrence_student", "invoice_lines", type_="unique")
+    op.alter_column("invoice_lines", "lesson_id", existing_type=sa.Integer(), nullable=False)
+    op.drop_column("invoice_lines", "occurrence_date")
+    op.drop_column("invoice_lines", "series_id")
+
+    op.drop_index("ix_lesson_series_tombstones_org_user_deleted", table_name="lesson_series_tombstones")
+    op.drop_table("lesson_series_tombstones")
@@ -0,0 +1,55 @@
+"""add lesson change tracking
+
+Revision ID: b7e2f05c9a14
+Revises: a1c4e9b2d3f0
+Create Date: 2026-10-19 10:03:17.552904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2f05c9a14'
+down_revision: Union[str, Sequence[str], None] = 'a1c4e9b2d3f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "lessons",
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now())
+    )
+    op.create_index("ix_lessons_updated_at", "lessons", ["updated_at"])
+
+    op.add_column(
+        "lesson_students",
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now())
+    )
+    op.create_index("ix_lesson_students_updated_at", "lesson_students", ["updated_at"])
+
+    op.create_table(
+        "lesson_tombstones",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("lesson_id", sa.Integer(), nullable=False),
+        sa.Column("organisation_id", sa.Integer(), sa.ForeignKey("organisations.id"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index(
+        "ix_lesson_tombstones_org_user_deleted",
+        "lesson_tombstones",
+        ["organisation_id", "user_id", "deleted_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lesson_tombstones_org_user_deleted", table_name="lesson_tombstones")
+    op.drop_table("lesson_tombstones")
+    op.drop_index("ix_lesson_students_updated_at", table_name="lesson_students")
+    op.drop_column("lesson_students", "updated_at")
+    op.drop_index("ix_lessons_updated_at", table_name="lessons")
+    op.drop_column("lessons", "updated_at")
@@ -0,0 +1,74 @@
+"""add invoices
+
+Revision ID: c3d81a6f4e27
+Revises: b7e2f05c9a14
+Create Date: 2026-10-19 11:26:05.104377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d81a6f4e27'
+down_revision: Union[str, Sequence[str], None] = 'b7e2f05c9a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_lessons_org_date", "lessons", ["organisation_id", "date"])
+
+    op.create_table(
+        "invoices",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("organisation_id", sa.Integer(), sa.ForeignKey("organisations.id"), nullable=False),
+        sa.Column("student_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("line_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("status", sa.String(), nullable=False, server_default="draft"),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint("organisation_id", "student_id", "period_start", name="uq_invoices_org_student_period"),
+    )
+    op.create_index("ix_invoices_student_id", "invoices", ["student_id"])
+
+    op.create_table(
+        "invoice_lines",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("invoice_id", sa.Integer(), sa.ForeignKey("invoices.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("lesson_id", sa.Integer(), nullable=False),
+        sa.Column("student_id", sa.Integer(), nullable=False),
+        sa.Column("lesson_date", sa.Date(), nullable=False),
+        sa.Column("subject", sa.String(), nullable=False),
+        sa.Column("amount", sa.Integer(), nullable=False),
+        sa.UniqueConstraint("lesson_id", "student_id", name="uq_invoice_lines_lesson_student"),
+    )
+    op.create_index("ix_invoice_lines_invoice_id", "invoice_lines", ["invoice_id"])
+
+    op.create_table(
+        "invoice_runs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("organisation_id", sa.Integer(), sa.ForeignKey("organisations.id"), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("stage", sa.String(), nullable=True),
+        sa.Column("invoices_created", sa.Integer(), nullable=False),
+        sa.Column("lines_created", sa.Integer(), nullable=False),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_invoice_runs_organisation_id", "invoice_runs", ["organisation_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_invoice_runs_organisation_id", table_name="invoice_runs")
+    op.drop_table("invoice_runs")
+    op.drop_index("ix_invoice_lines_invoice_id", table_name="invoice_lines")
+    op.drop_table("invoice_lines")
+    op.drop_index("ix_invoices_student_id", table_name="invoices")
+    op.drop_table("invoices")
+    op.drop_index("ix_lessons_org_date", table_name="lessons")
@@ -0,0 +1,26 @@
+"""add invoice_runs.retryable
+
+Revision ID: c8f4a2d6e913
+Revises: b5d2f7a9c318
+Create Date: 2026-10-21 16:48:31.902214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f4a2d6e913'
+down_revision: Union[str, Sequence[str], None] = 'b5d2f7a9c318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("invoice_runs", sa.Column("retryable", sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade() -> None:
+    op.drop_column("invoice_runs", "retryable")
@@ -0,0 +1,72 @@
+"""add partitioned lesson archive
+
+Revision ID: d5f3b8a1c692
+Revises: c3d81a6f4e27
+Create Date: 2026-10-19 12:48:39.660215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f3b8a1c692'
+down_revision: Union[str, Sequence[str], None] = 'c3d81a6f4e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # yearly partitions are created on demand by app.archive; the default
+    # partition only catches rows outside them
+    op.create_table(
+        "archive_lessons",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("time", sa.Time(), nullable=False),
+        sa.Column("subject", sa.String(), nullable=False),
+        sa.Column("duration", sa.Integer(), nullable=False),
+        sa.Column("location", sa.String(), nullable=False),
+        sa.Column("price", sa.Integer(), nullable=False),
+        sa.Column("organisation_id", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("archived_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("id", "date"),
+        postgresql_partition_by="RANGE (date)",
+    )
+    op.create_index("ix_archive_lessons_org_date", "archive_lessons", ["organisation_id", "date"])
+    op.execute("CREATE TABLE archive_lessons_default PARTITION OF archive_lessons DEFAULT")
+
+    op.create_table(
+        "archive_lesson_teachers",
+        sa.Column("lesson_id", sa.Integer(), nullable=False),
+        sa.Column("lesson_date", sa.Date(), nullable=False),
+        sa.Column("teacher_id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("lesson_id", "lesson_date", "teacher_id"),
+        postgresql_partition_by="RANGE (lesson_date)",
+    )
+    op.create_index("ix_archive_lesson_teachers_teacher_id", "archive_lesson_teachers", ["teacher_id"])
+    op.execute("CREATE TABLE archive_lesson_teachers_default PARTITION OF archive_lesson_teachers DEFAULT")
+
+    op.create_table(
+        "archive_lesson_students",
+        sa.Column("lesson_id", sa.Integer(), nullable=False),
+        sa.Column("lesson_date", sa.Date(), nullable=False),
+        sa.Column("student_id", sa.Integer(), nullable=False),
+        sa.Column("attendance_status", sa.String(), nullable=False),
+        sa.Column("payment_status", sa.String(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("lesson_id", "lesson_date", "student_id"),
+        postgresql_partition_by="RANGE (lesson_date)",
+    )
+    op.create_index("ix_archive_lesson_students_student_id", "archive_lesson_students", ["student_id"])
+    op.execute("CREATE TABLE archive_lesson_students_default PARTITION OF archive_lesson_students DEFAULT")
+
+
+def downgrade() -> None:
+    # dropping the parents drops every partition with them
+    op.drop_table("archive_lesson_students")
+    op.drop_table("archive_lesson_teachers")
+    op.drop_table("archive_lessons")
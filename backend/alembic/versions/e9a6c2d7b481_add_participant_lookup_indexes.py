@@ -0,0 +1,28 @@
+"""add participant lookup indexes
+
+Revision ID: e9a6c2d7b481
+Revises: d5f3b8a1c692
+Create Date: 2026-10-19 14:05:52.271940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e9a6c2d7b481'
+down_revision: Union[str, Sequence[str], None] = 'd5f3b8a1c692'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_lesson_teachers_teacher_id", "lesson_teachers", ["teacher_id"])
+    op.create_index("ix_lesson_students_student_id", "lesson_students", ["student_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lesson_students_student_id", table_name="lesson_students")
+    op.drop_index("ix_lesson_teachers_teacher_id", table_name="lesson_teachers")
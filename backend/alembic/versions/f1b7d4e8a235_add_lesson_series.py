@@ -0,0 +1,76 @@
+"""add lesson series
+
+Revision ID: f1b7d4e8a235
+Revises: e9a6c2d7b481
+Create Date: 2026-10-19 15:31:08.914722
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b7d4e8a235'
+down_revision: Union[str, Sequence[str], None] = 'e9a6c2d7b481'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "lesson_series",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("organisation_id", sa.Integer(), sa.ForeignKey("organisations.id"), nullable=False),
+        sa.Column("start_date", sa.Date(), nullable=False),
+        sa.Column("end_date", sa.Date(), nullable=False),
+        sa.Column("interval_weeks", sa.Integer(), nullable=False),
+        sa.Column("time", sa.Time(), nullable=False),
+        sa.Column("subject", sa.String(), nullable=False),
+        sa.Column("duration", sa.Integer(), nullable=False),
+        sa.Column("location", sa.String(), nullable=False),
+        sa.Column("price", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_lesson_series_organisation_id", "lesson_series", ["organisation_id"])
+
+    op.create_table(
+        "lesson_series_teachers",
+        sa.Column("series_id", sa.Integer(), sa.ForeignKey("lesson_series.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("teacher_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+    )
+    op.create_index("ix_lesson_series_teachers_teacher_id", "lesson_series_teachers", ["teacher_id"])
+
+    op.create_table(
+        "lesson_series_students",
+        sa.Column("series_id", sa.Integer(), sa.ForeignKey("lesson_series.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("student_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+    )
+    op.create_index("ix_lesson_series_students_student_id", "lesson_series_students", ["student_id"])
+
+    op.create_table(
+        "lesson_series_exdates",
+        sa.Column("series_id", sa.Integer(), sa.ForeignKey("lesson_series.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("occurrence_date", sa.Date(), primary_key=True),
+    )
+
+    op.add_column(
+        "lessons",
+        sa.Column("series_id", sa.Integer(), sa.ForeignKey("lesson_series.id", ondelete="SET NULL"), nullable=True)
+    )
+    op.add_column("lessons", sa.Column("occurrence_date", sa.Date(), nullable=True))
+    op.create_unique_constraint("uq_lessons_series_occurrence", "lessons", ["series_id", "occurrence_date"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_lessons_series_occurrence", "lessons", type_="unique")
+    op.drop_column("lessons", "occurrence_date")
+    op.drop_column("lessons", "series_id")
+    op.drop_table("lesson_series_exdates")
+    op.drop_index("ix_lesson_series_students_student_id", table_name="lesson_series_students")
+    op.drop_table("lesson_series_students")
+    op.drop_index("ix_lesson_series_teachers_teacher_id", table_name="lesson_series_teachers")
+    op.drop_table("lesson_series_teachers")
+    op.drop_index("ix_lesson_series_organisation_id", table_name="lesson_series")
+    op.drop_table("lesson_series")
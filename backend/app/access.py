@@ -0,0 +1,91 @@
+#lesson authorization decided in SQL, before any lesson graph or roster is loaded
+from functools import lru_cache
+from typing import List, Optional, Set
+
+from fastapi import HTTPException, status
+from sqlalchemy import bindparam, exists, null, select, true, union
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from app.models.archive import ArchivedLesson, ArchivedLessonStudent, archive_lesson_teachers
+from app.models.associations import LessonStudent, lesson_teachers
+from app.models.lesson import Lesson
+from app.models.user import User
+
+
+def roster_match(table, archived: bool):
+    if archived:
+        # matching the partition key lets the planner probe a single partition
+        return (table.c.lesson_id == ArchivedLesson.id) & (table.c.lesson_date == ArchivedLesson.date)
+    return table.c.lesson_id == Lesson.id
+
+
+def membership_clause(role: str, user_id, archived: bool = False):
+    """EXISTS on the roster row of user_id (a value or bind parameter) for the outer lesson; always true for admins."""
+    teachers = archive_lesson_teachers if archived else lesson_teachers
+    students = ArchivedLessonStudent.__table__ if archived else LessonStudent.__table__
+
+    if role == "teacher":
+        return exists().where(roster_match(teachers, archived), teachers.c.teacher_id == user_id)
+    if role == "student":
+        return exists().where(roster_match(students, archived), students.c.student_id == user_id)
+    return true()
+
+
+@lru_cache(maxsize=None)
+def lesson_access_statement(role: str, archived: bool, many: bool):
+    """(id, organisation_id, version, is_member) for a caller of this role, built once and run with
+    user_id and lesson_id (or lesson_ids when many) as bind parameters."""
+    model = ArchivedLesson if archived else Lesson
+    version = null() if archived else Lesson.version
+    statement = select(
+        model.id,
+        model.organisation_id,
+        version.label("version"),
+        membership_clause(role, bindparam("user_id"), archived).label("is_member"),
+    )
+    if many:
+        return statement.where(model.id.in_(bindparam("lesson_ids", expanding=True)))
+    return statement.where(model.id == bindparam("lesson_id"))
+
+
+def lesson_access(db: Session, lesson_id: int, current_user: User, archived: bool = False) -> Optional[Row]:
+    """(id, organisation_id, version, is_member) for one lesson in a single query; None if it doesn't exist.
+
+    Archived lessons have no version, so it is None for them.
+    """
+    statement = lesson_access_statement(current_user.role, archived, False)
+    return db.execute(statement, {"lesson_id": lesson_id, "user_id": current_user.id}).first()
+
+
+def lesson_access_many(db: Session, lesson_ids: List[int], current_user: User, archived: bool = False) -> List[Row]:
+    """lesson_access for many lessons in one query; lessons that don't exist have no row."""
+    statement = lesson_access_statement(current_user.role, archived, True)
+    return db.execute(statement, {"lesson_ids": list(lesson_ids), "user_id": current_user.id}).all()
+
+
+def can_view_lesson(access: Row, current_user: User) -> bool:
+    # same rules as visible_lesson_criteria: organisation, then teaching / attending
+    return access.organisation_id == current_user.organisation_id and bool(access.is_member)
+
+
+def check_lesson_access(access: Optional[Row], current_user: User) -> Row:
+    if access is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found")
+
+    if not can_view_lesson(access, current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view this lesson")
+
+    return access
+
+
+def require_lesson_access(db: Session, lesson_id: int, current_user: User, archived: bool = False) -> Row:
+    return check_lesson_access(lesson_access(db, lesson_id, current_user, archived), current_user)
+
+
+def lesson_member_ids_by_id(db: Session, lesson_id: int) -> Set[int]:
+    # teacher and student ids for event fan-out, without loading either roster
+    return set(db.execute(union(
+        select(lesson_teachers.c.teacher_id).where(lesson_teachers.c.lesson_id == lesson_id),
+        select(LessonStudent.student_id).where(LessonStudent.lesson_id == lesson_id),
+    )).scalars())
@@ -0,0 +1,64 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from typing import Literal, Optional
+
+from app.audit import audit_log
+from app.models.audit import AuditEvent
+from app.models.user import User
+from app.pagination import decode_cursor, encode_cursor
+from app.schemas.audit import AuditEventPage
+from app.utils import get_current_admin, get_tenant_db
+
+router = APIRouter(tags=["Audit"])
+
+
+# ✅ ADMIN: Audit trail of lesson changes in the organisation, newest first
+@router.get("/", response_model=AuditEventPage)
+def get_audit_events(
+    lesson_id: Optional[int] = None,
+    actor_id: Optional[int] = None,
+    action: Optional[Literal["lesson.created", "lesson.updated", "lesson.deleted", "lesson_student.updated", "lessons.rolled_over"]] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_tenant_db),
+    current_admin: User = Depends(get_current_admin),
+):
+    # include changes still waiting in this worker's buffer
+    audit_log.flush()
+
+    query = db.query(AuditEvent).filter(AuditEvent.organisation_id == current_admin.organisation_id)
+
+    if lesson_id is not None:
+        query = query.filter(AuditEvent.lesson_id == lesson_id)
+    if actor_id is not None:
+        query = query.filter(AuditEvent.actor_id == actor_id)
+    if action is not None:
+        query = query.filter(AuditEvent.action == action)
+    if since is not None:
+        query = query.filter(AuditEvent.occurred_at >= since)
+    if until is not None:
+        query = query.filter(AuditEvent.occurred_at < until)
+
+    if cursor:
+        before_occurred_at, before_id = decode_cursor(cursor, 2)
+        try:
+            before_occurred_at = datetime.fromisoformat(before_occurred_at)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if not isinstance(before_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(tuple_(AuditEvent.occurred_at, AuditEvent.id) < (before_occurred_at, before_id))
+
+    # fetch one extra row to know whether another page exists
+    events = query.order_by(AuditEvent.occurred_at.desc(), AuditEvent.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        next_cursor = encode_cursor(events[-1].occurred_at.isoformat(), events[-1].id)
+
+    return {"items": events, "next_cursor": next_cursor}
@@ -3,9 +3,11 @@ from sqlalchemy.orm import Session
 from app.schemas.auth import Token
 from app import utils
 from app.models.user import User  # assume you have a User model
-from app.database import get_db  # your db session
+from app.tenancy import OrganisationMoving, tenants
+from app.documents import bump_user_lesson_versions
 from fastapi.security import OAuth2PasswordRequestForm
 import os
+from contextlib import contextmanager
 from jose import jwt
 
 router = APIRouter(tags=["Auth"])
@@ -14,34 +16,46 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 
 @router.post("/login", response_model= Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not utils.verify_password(form_data.password, user.password):
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    
-    if not user.is_verified:
-        raise HTTPException(status_code=401, detail="Email not verified")
-
-    access_token = utils.create_access_token(data={"sub": str(user.id)})
+def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    # no organisation yet, so the user is looked up on every shard
+    with lookup_user_by_email(form_data.username) as (db, user):
+        if not user or not utils.verify_password(form_data.password, user.password):
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+
+        if not user.is_verified:
+            raise HTTPException(status_code=401, detail="Email not verified")
+
+        # "org" routes the caller's later requests to their organisation's shard
+        access_token = utils.create_access_token(data={"sub": str(user.id), "org": user.organisation_id})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/verify-email")
-def verify_email(token: str, db: Session = Depends(get_db)):
+def verify_email(token: str):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email = payload.get("sub")
     except jwt.JWTError:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    with lookup_user_by_email(email) as (db, user):
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
 
-    if user.is_verified:
-        return {"message": "Email already verified"}
+        if user.is_verified:
+            return {"message": "Email already verified"}
 
-    user.is_verified = True
-    db.commit()
+        user.is_verified = True
+        bump_user_lesson_versions(db, user.id)
+        db.commit()
 
     return {"message": "Email verification successful"}
+
+
+@contextmanager
+def lookup_user_by_email(email: str):
+    try:
+        with tenants.user_by_email(email) as found:
+            yield found
+    except OrganisationMoving:
+        raise HTTPException(status_code=503, detail="Organisation is being moved, try again shortly")
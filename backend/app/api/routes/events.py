@@ -0,0 +1,77 @@
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+
+from app.events import bus
+from app.models.user import User
+from app.utils import decode_access_token, tenant_session
+
+router = APIRouter(tags=["Events"])
+
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
+
+HEARTBEAT_SECONDS = 15
+
+
+def load_stream_user(token: str) -> User:
+    payload = decode_access_token(token)
+    user_id = payload.get("sub")
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Token missing user ID")
+
+    # short-lived session: an idle stream must not hold a pooled connection
+    db = tenant_session(payload.get("org"))
+    try:
+        user = db.query(User).filter(User.id == int(user_id)).first()
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        db.expunge(user)
+        return user
+    finally:
+        db.close()
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+#ALL: server-sent events for lessons the caller teaches, attends or (admins) administers
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    token: Optional[str] = None,  # EventSource cannot set headers, so allow ?token=
+    bearer: Optional[str] = Depends(optional_oauth2_scheme),
+):
+    access_token = bearer or token
+    if not access_token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    user = await run_in_threadpool(load_stream_user, access_token)
+    sub = bus.subscribe(user.id, user.organisation_id, is_admin=user.role == "admin")
+
+    async def event_stream():
+        try:
+            yield format_sse("ready", {"user_id": user.id})
+            while not await request.is_disconnected():
+                if sub.overflowed:
+                    sub.overflowed = False
+                    yield format_sse("resync", {})
+                try:
+                    message = await asyncio.wait_for(sub.queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(message["type"], {"lesson_id": message["lesson_id"]})
+        finally:
+            bus.unsubscribe(sub)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
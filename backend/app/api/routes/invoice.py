@@ -0,0 +1,87 @@
+from datetime import date
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.invoicing import run_invoice_generation
+from app.models.invoice import Invoice, InvoiceRun
+from app.models.user import User
+from app.schemas.invoice import InvoiceDetail, InvoiceRead, InvoiceRunCreate, InvoiceRunRead
+from app.utils import get_current_admin, get_tenant_db
+
+router = APIRouter(tags=["Invoices"])
+
+
+# ✅ ADMIN: Start invoice generation for a month (safe to re-run)
+@router.post("/runs", response_model=InvoiceRunRead, status_code=status.HTTP_202_ACCEPTED)
+def create_invoice_run(
+    run_data: InvoiceRunCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_tenant_db),
+    current_admin: User = Depends(get_current_admin),
+):
+    run = InvoiceRun(
+        organisation_id=current_admin.organisation_id,
+        period_start=date(run_data.year, run_data.month, 1),
+        status="pending",
+    )
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+
+    background_tasks.add_task(run_invoice_generation, run.id, run.organisation_id)
+    return run
+
+
+# ✅ ADMIN: Poll progress of an invoice run
+@router.get("/runs/{run_id}", response_model=InvoiceRunRead)
+def get_invoice_run(
+    run_id: int,
+    db: Session = Depends(get_tenant_db),
+    current_admin: User = Depends(get_current_admin),
+):
+    run = db.query(InvoiceRun).filter(
+        InvoiceRun.id == run_id,
+        InvoiceRun.organisation_id == current_admin.organisation_id,
+    ).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Invoice run not found")
+    return run
+
+
+# ✅ ADMIN: List invoices in organisation, optionally for one month
+@router.get("/", response_model=List[InvoiceRead])
+def get_invoices(
+    year: Optional[int] = Query(None, ge=2000, le=2100),
+    month: Optional[int] = Query(None, ge=1, le=12),
+    student_id: Optional[int] = None,
+    db: Session = Depends(get_tenant_db),
+    current_admin: User = Depends(get_current_admin),
+):
+    query = db.query(Invoice).filter(Invoice.organisation_id == current_admin.organisation_id)
+
+    if year is not None and month is not None:
+        query = query.filter(Invoice.period_start == date(year, month, 1))
+    elif year is not None or month is not None:
+        raise HTTPException(status_code=400, detail="year and month must be given together")
+
+    if student_id is not None:
+        query = query.filter(Invoice.student_id == student_id)
+
+    return query.order_by(Invoice.period_start.desc(), Invoice.student_id).all()
+
+
+# ✅ ADMIN: Get an invoice with its lines
+@router.get("/{invoice_id}", response_model=InvoiceDetail)
+def get_invoice(
+    invoice_id: int,
+    db: Session = Depends(get_tenant_db),
+    current_admin: User = Depends(get_current_admin),
+):
+    invoice = db.query(Invoice).filter(
+        Invoice.id == invoice_id,
+        Invoice.organisation_id == current_admin.organisation_id,
+    ).first()
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    return invoice
@@ -1,42 +1,66 @@
-from datetime import date
+from datetime import date, datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import bindparam, func, or_, select, union
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
 
-from app.database import get_db
 from app.models.lesson import Lesson
-from app.models.associations import LessonStudent
+from app.models.associations import LessonStudent, lesson_teachers
+from app.models.archive import ArchivedLesson, ArchivedLessonStudent
+from app.models.change import LessonSeriesTombstone, LessonTombstone
 from app.models.user import User
-from app.schemas.lesson import LessonCreate, LessonRead, LessonStudentRead, LessonStudentUpdate
-from app.utils import get_current_user, get_current_teacher, get_current_admin
+from app.schemas.lesson import FreeSlot, FreeSlotQuery, LessonArchiveRequest, LessonArchiveResult, LessonBatch, LessonChanges, LessonCreate, LessonRead, LessonRolloverRequest, LessonRolloverResult, LessonStudentRead, LessonStudentUpdate
+from app.utils import get_current_user, get_current_teacher, get_current_admin, get_tenant_db, users_by_ids
+from app.changes import add_lesson_tombstones, decode_change_cursor, encode_change_cursor, lesson_start, tombstone_criteria
+from app.events import bus
+from app.archive import archive_lessons_before
+from app.rollover import roll_over_lessons
+from app.scheduling import find_free_slots
+from app.series import exclude_occurrence, expand_series, visible_series_criteria
+from app.access import can_view_lesson, check_lesson_access, lesson_access, lesson_access_many, lesson_member_ids_by_id, require_lesson_access
+from app.documents import LESSON_ROW_COLUMNS, LessonFieldset, bump_lesson_versions, lesson_batch_response, lesson_document_response, lesson_documents, lesson_fieldset, lesson_list_response, lesson_rows_response, sparse_lesson_list_response
+from app.audit import audit_log, diff, lesson_snapshot, plain
+from app.pagination import batch_ids
+from app.models.series import LessonSeries
 
 router = APIRouter(tags=["Lessons"])
 
+# the my-lessons lists, prebuilt (see benchmarks/hot_queries.py)
+STUDENT_LESSON_ROWS = (
+    select(*LESSON_ROW_COLUMNS)
+    .join(LessonStudent, LessonStudent.lesson_id == Lesson.id)
+    .where(LessonStudent.student_id == bindparam("student_id"))
+)
+TEACHER_LESSON_ROWS = select(*LESSON_ROW_COLUMNS).where(Lesson.teachers.any(User.id == bindparam("teacher_id")))
+
 #FOR STUDENTS: GET UPCOMING LESSONS
 @router.get("/my-lessons-student", response_model=list[LessonRead])
 def get_my_lessons_as_student(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_tenant_db),
+    fieldset: Optional[LessonFieldset] = Depends(lesson_fieldset),
     current_user: User = Depends(get_current_user),
 ):
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Students only")
 
+    occurrences = expand_series(db, visible_series_criteria(current_user))
+    if fieldset is None:
+        rows = db.execute(STUDENT_LESSON_ROWS, {"student_id": current_user.id}).all()
+        return lesson_rows_response(db, rows, occurrences)
+
     lessons = (
         db.query(Lesson)
         .join(LessonStudent, LessonStudent.lesson_id == Lesson.id)
         .filter(LessonStudent.student_id == current_user.id)
-        .order_by(Lesson.date, Lesson.time)
-        .all()
     )
-
-    return lessons
+    return lesson_list_response(db, lessons, occurrences, fieldset)
 
 
 # ✅ TEACHER: Create a lesson (teacher auto-added)
 @router.post("/", response_model=LessonRead)
 def create_lesson(
     lesson_data: LessonCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_tenant_db),
     current_teacher: User = Depends(get_current_teacher),
 ):
     if lesson_data.organisation_id != current_teacher.organisation_id:
@@ -56,7 +80,7 @@ def create_lesson(
         teachers=[current_teacher]
     )
 
-    students = db.query(User).filter(User.id.in_(lesson_data.student_ids)).all()
+    students = users_by_ids(db, lesson_data.student_ids)
 
     if len(students) != len(set(lesson_data.student_ids)):
         raise HTTPException(
@@ -85,25 +109,172 @@ def create_lesson(
             )
         )
 
+    actor_id = current_teacher.id
     db.add(lesson)
     db.commit()
     db.refresh(lesson)
+    audit_log.record(lesson.organisation_id, actor_id, "lesson.created", lesson.id, diff(None, lesson_snapshot(lesson)))
+    bus.publish("lesson.created", lesson.id, lesson.organisation_id, lesson_member_ids(lesson))
     return lesson
 
 # ✅ TEACHER: Get all lessons taught by the current teacher
 @router.get("/my-lessons", response_model=List[LessonRead])
 def get_my_lessons(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_tenant_db),
+    fieldset: Optional[LessonFieldset] = Depends(lesson_fieldset),
     current_teacher: User = Depends(get_current_teacher),
 ):
-    return db.query(Lesson).filter(Lesson.teachers.any(id=current_teacher.id)).all()
+    occurrences = expand_series(db, visible_series_criteria(current_teacher))
+    if fieldset is None:
+        rows = db.execute(TEACHER_LESSON_ROWS, {"teacher_id": current_teacher.id}).all()
+        return lesson_rows_response(db, rows, occurrences)
+
+    lessons = db.query(Lesson).filter(Lesson.teachers.any(id=current_teacher.id))
+    return lesson_list_response(db, lessons, occurrences, fieldset)
+
+
+# teachers and students who should hear about changes to a lesson
+def lesson_member_ids(lesson: Lesson) -> set:
+    return {teacher.id for teacher in lesson.teachers} | {link.student_id for link in lesson.student_links}
+
+
+# same visibility rules as get_lesson, expressed as SQL criteria
+# (model may be Lesson or ArchivedLesson, which share the relationship names)
+def visible_lesson_criteria(current_user: User, model=Lesson) -> list:
+    criteria = [model.organisation_id == current_user.organisation_id]
+    if current_user.role == "teacher":
+        criteria.append(model.teachers.any(id=current_user.id))
+    elif current_user.role == "student":
+        criteria.append(model.student_links.any(student_id=current_user.id))
+    return criteria
+
+
+#ALL: lessons and statuses changed since a cursor (omit `since` for a full sync)
+#series occurrences that are not stored come with id None, keyed by (series_id, occurrence_date)
+@router.get("/changes", response_model=LessonChanges)
+def get_lesson_changes(
+    since: Optional[str] = None,
+    db: Session = Depends(get_tenant_db),
+    current_user: User = Depends(get_current_user),
+):
+    synced_at = db.query(func.now()).scalar()
+    visible = visible_lesson_criteria(current_user)
+    visible_series = visible_series_criteria(current_user)
+
+    lesson_query = db.query(Lesson).filter(*visible).options(
+        selectinload(Lesson.teachers),
+        selectinload(Lesson.student_links).selectinload(LessonStudent.student),
+    )
+    if not since:
+        lessons = lesson_query.all()
+        return {
+            "lessons": sorted([*lessons, *expand_series(db, visible_series)], key=lesson_start),
+            "statuses": [],
+            "deleted_lesson_ids": [],
+            "deleted_series_ids": [],
+            "deleted_occurrences": [],
+            "cursor": encode_change_cursor(synced_at),
+        }
+
+    since_at = decode_change_cursor(since)
+
+    lessons = lesson_query.filter(Lesson.updated_at > since_at).all()
+    # series created since the cursor; occurrences stored since then are among the lessons above
+    occurrences = expand_series(db, [*visible_series, LessonSeries.updated_at > since_at])
+
+    # status-only changes; lessons returned above already carry their roster
+    statuses = (
+        db.query(LessonStudent)
+        .join(Lesson, LessonStudent.lesson_id == Lesson.id)
+        .options(selectinload(LessonStudent.student))
+        .filter(
+            *visible,
+            LessonStudent.updated_at > since_at,
+            Lesson.updated_at <= since_at,
+        )
+        .all()
+    )
+
+    tombstones = db.query(LessonTombstone.lesson_id).filter(*tombstone_criteria(LessonTombstone, current_user, since_at))
+    changed_ids = {lesson.id for lesson in lessons}
+    deleted_ids = {lesson_id for (lesson_id,) in tombstones.all()} - changed_ids
+
+    series_tombstones = db.query(LessonSeriesTombstone.series_id, LessonSeriesTombstone.occurrence_date).filter(
+        *tombstone_criteria(LessonSeriesTombstone, current_user, since_at)
+    )
+    deleted_series_ids, deleted_occurrences = set(), set()
+    for series_id, occurrence_date in series_tombstones.all():
+        if occurrence_date is None:
+            deleted_series_ids.add(series_id)
+        else:
+            deleted_occurrences.add((series_id, occurrence_date))
+
+    return {
+        "lessons": sorted([*lessons, *occurrences], key=lesson_start),
+        "statuses": statuses,
+        "deleted_lesson_ids": sorted(deleted_ids),
+        "deleted_series_ids": sorted(deleted_series_ids),
+        "deleted_occurrences": [
+            {"series_id": series_id, "occurrence_date": occurrence_date}
+            for series_id, occurrence_date in sorted(deleted_occurrences)
+        ],
+        "cursor": encode_change_cursor(synced_at),
+    }
+
+#ALL: lessons from archived (closed) terms, same visibility as get_lesson
+@router.get("/archived", response_model=List[LessonRead])
+def get_archived_lessons(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_tenant_db),
+    fieldset: Optional[LessonFieldset] = Depends(lesson_fieldset),
+    current_user: User = Depends(get_current_user),
+):
+    query = db.query(ArchivedLesson).filter(*visible_lesson_criteria(current_user, ArchivedLesson))
+
+    # date bounds let the planner prune to the matching yearly partitions
+    if start is not None:
+        query = query.filter(ArchivedLesson.date >= start)
+    if end is not None:
+        query = query.filter(ArchivedLesson.date <= end)
+
+    if fieldset is not None:
+        return sparse_lesson_list_response(db, query, fieldset, model=ArchivedLesson)
+
+    return query.options(
+        selectinload(ArchivedLesson.teachers),
+        selectinload(ArchivedLesson.student_links).selectinload(ArchivedLessonStudent.student),
+    ).order_by(ArchivedLesson.date, ArchivedLesson.time).all()
+
+
+#ALL: several lessons by id, each checked like get_lesson; one access query (two if some are archived)
+@router.get("/batch", response_model=LessonBatch)
+def get_lessons_batch(
+    ids: List[int] = Depends(batch_ids),
+    db: Session = Depends(get_tenant_db),
+    current_user: User = Depends(get_current_user),
+):
+    rows = lesson_access_many(db, ids, current_user)
+    found = {row.id for row in rows}
+    missing = [lesson_id for lesson_id in ids if lesson_id not in found]
+    # ids are kept when a term is archived, so old ids keep resolving
+    archived_rows = lesson_access_many(db, missing, current_user, archived=True) if missing else []
+
+    versions = {row.id: row.version for row in rows if can_view_lesson(row, current_user)}
+    archived_ids = [row.id for row in archived_rows if can_view_lesson(row, current_user)]
+    allowed = set(versions) | set(archived_ids)
+    existing = found | {row.id for row in archived_rows}
+    forbidden = [lesson_id for lesson_id in ids if lesson_id in existing and lesson_id not in allowed]
+    not_found = [lesson_id for lesson_id in ids if lesson_id not in existing]
+
+    return lesson_batch_response(db, ids, versions, archived_ids, forbidden, not_found)
 
 # ✅ TEACHER: Update a lesson they are teaching
 @router.put("/{lesson_id}", response_model=LessonRead)
 def update_lesson(
     lesson_id: int,
     lesson_data: LessonCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_tenant_db),
     current_user: User = Depends(get_current_user),
 ):
     lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
@@ -127,6 +298,8 @@ def update_lesson(
             detail="You can only update lessons in your organisation"
         )
 
+    before = lesson_snapshot(lesson)
+
     # Update simple lesson fields
     lesson.date = lesson_data.date
     lesson.time = lesson_data.time
@@ -137,7 +310,7 @@ def update_lesson(
     lesson.organisation_id = current_user.organisation_id
 
     # Fetch teachers
-    teachers = db.query(User).filter(User.id.in_(lesson_data.teacher_ids)).all()
+    teachers = users_by_ids(db, lesson_data.teacher_ids)
 
     if len(teachers) != len(set(lesson_data.teacher_ids)):
         raise HTTPException(
@@ -158,11 +331,14 @@ def update_lesson(
                 detail="All selected teachers must have role of teacher"
             )
 
+    # Users dropped from the lesson need a tombstone for their change feed
+    removed_teacher_ids = {teacher.id for teacher in lesson.teachers} - {teacher.id for teacher in teachers}
+
     # Update lesson teachers
     lesson.teachers = teachers
 
     # Fetch students
-    students = db.query(User).filter(User.id.in_(lesson_data.student_ids)).all()
+    students = users_by_ids(db, lesson_data.student_ids)
 
     if len(students) != len(set(lesson_data.student_ids)):
         raise HTTPException(
@@ -185,6 +361,7 @@ def update_lesson(
 
     # Preserve existing student statuses where possible
     existing_links = {link.student_id: link for link in lesson.student_links}
+    removed_student_ids = set(existing_links) - {student.id for student in students}
 
     # Clear old student links
     lesson.student_links.clear()
@@ -201,8 +378,22 @@ def update_lesson(
             )
         )
 
+    add_lesson_tombstones(db, lesson.id, lesson.organisation_id, removed_teacher_ids | removed_student_ids)
+    # roster-only edits don't dirty any lesson column, so bump updated_at explicitly
+    lesson.updated_at = func.now()
+    lesson.version = Lesson.version + 1
+    actor_id = current_user.id
+
     db.commit()
     db.refresh(lesson)
+    audit_log.record(lesson.organisation_id, actor_id, "lesson.updated", lesson.id, diff(before, lesson_snapshot(lesson)))
+    # removed members are notified too so they drop the lesson
+    bus.publish(
+        "lesson.updated",
+        lesson.id,
+        lesson.organisation_id,
+        lesson_member_ids(lesson) | removed_teacher_ids | removed_student_ids,
+    )
     return lesson
 
 
@@ -210,48 +401,47 @@ def update_lesson(
 @router.delete("/{lesson_id}/own", status_code=status.HTTP_204_NO_CONTENT)
 def delete_own_lesson(
     lesson_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_tenant_db),
     current_teacher: User = Depends(get_current_teacher),
 ):
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
-    if not lesson:
+    access = lesson_access(db, lesson_id, current_teacher)
+    if not access:
         raise HTTPException(status_code=404, detail="Lesson not found")
 
-    if current_teacher not in lesson.teachers:
+    if not access.is_member:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only delete lessons you are teaching"
         )
 
+    lesson = db.get(Lesson, lesson_id)
+    organisation_id = access.organisation_id
+    member_ids = lesson_member_ids_by_id(db, lesson_id)
+    before, actor_id = lesson_snapshot(lesson), current_teacher.id
+    add_lesson_tombstones(db, lesson.id, organisation_id, member_ids, organisation_wide=True)
+    exclude_occurrence(db, lesson)
     db.delete(lesson)
     db.commit()
+    lesson_documents.discard(lesson_id)
+    audit_log.record(organisation_id, actor_id, "lesson.deleted", lesson_id, diff(before, None))
+    bus.publish("lesson.deleted", lesson_id, organisation_id, member_ids)
 
 #ALL: get specific lesson
 @router.get("/{lesson_id}", response_model=LessonRead)
 def get_lesson(
     lesson_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_tenant_db),
     current_user: User = Depends(get_current_user),
 ):
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
-
-    if not lesson:
-        raise HTTPException(status_code=404, detail="Lesson not found")
-
-    if current_user.organisation_id != lesson.organisation_id:
-        raise HTTPException(status_code=403, detail="Not authorized to view this lesson")
+    access = lesson_access(db, lesson_id, current_user)
 
-    if current_user.role == "teacher":
-        teacher_ids = [teacher.id for teacher in lesson.teachers]
-        if current_user.id not in teacher_ids:
-            raise HTTPException(status_code=403, detail="Not authorized to view this lesson")
+    if access is None:
+        # ids are kept when a term is archived, so old links keep resolving
+        require_lesson_access(db, lesson_id, current_user, archived=True)
+        return db.query(ArchivedLesson).filter(ArchivedLesson.id == lesson_id).first()
 
-    if current_user.role == "student":
-        student_ids = [link.student_id for link in lesson.student_links]
-        if current_user.id not in student_ids:
-            raise HTTPException(status_code=403, detail="Not authorized to view this lesson")
-
-    return lesson
+    check_lesson_access(access, current_user)
+    return lesson_document_response(db, access.id, access.version)
 
 #teacher: update student status per lesson
 @router.patch("/{lesson_id}/students/{student_id}", response_model=LessonStudentRead)
@@ -259,7 +449,7 @@ def update_lesson_student_status(
     lesson_id: int,
     student_id: int,
     update_data: LessonStudentUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_tenant_db),
     current_user: User = Depends(get_current_user),
 ):
     if current_user.role == "student":
@@ -268,37 +458,31 @@ def update_lesson_student_status(
             detail="Students cannot edit lesson student status",
         )
 
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
-    if not lesson:
+    access = lesson_access(db, lesson_id, current_user)
+    if not access:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Lesson not found",
         )
 
-    if lesson.organisation_id != current_user.organisation_id:
+    if access.organisation_id != current_user.organisation_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to update this lesson",
         )
 
-    lesson_student = (
-        db.query(LessonStudent)
-        .filter(
-            LessonStudent.lesson_id == lesson_id,
-            LessonStudent.student_id == student_id,
-        )
-        .first()
-    )
+    lesson_student = db.get(LessonStudent, (lesson_id, student_id))
     if not lesson_student:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Student is not assigned to this lesson",
         )
 
+    before = {"attendance_status": lesson_student.attendance_status, "payment_status": lesson_student.payment_status}
+
     # Teacher permissions
     if current_user.role == "teacher":
-        teacher_ids = [teacher.id for teacher in lesson.teachers]
-        if current_user.id not in teacher_ids:
+        if not access.is_member:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Only teachers assigned to this lesson can update attendance",
@@ -327,25 +511,34 @@ def update_lesson_student_status(
             detail="Invalid role for this action",
         )
 
+    after = {"attendance_status": lesson_student.attendance_status, "payment_status": lesson_student.payment_status}
+    actor_id = current_user.id
+    bump_lesson_versions(db, [lesson_id])
     db.commit()
     db.refresh(lesson_student)
+    audit_log.record(
+        access.organisation_id, actor_id, "lesson_student.updated", lesson_id, diff(before, after), student_id=student_id,
+    )
+    bus.publish("lesson_student.updated", lesson_id, access.organisation_id, lesson_member_ids_by_id(db, lesson_id))
     return lesson_student
 
 
 # ✅ ADMIN: Get all lessons in organisation
 @router.get("/", response_model=List[LessonRead])
 def get_lessons_by_organisation(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_tenant_db),
+    fieldset: Optional[LessonFieldset] = Depends(lesson_fieldset),
     current_admin: User = Depends(get_current_admin),
 ):
-    return db.query(Lesson).filter(Lesson.organisation_id == current_admin.organisation_id).all()
+    lessons = db.query(Lesson).filter(Lesson.organisation_id == current_admin.organisation_id)
+    return lesson_list_response(db, lessons, expand_series(db, visible_series_criteria(current_admin)), fieldset)
 
 
 # ✅ ADMIN: Get a specific lesson
 # @router.get("/admin/{lesson_id}", response_model=LessonRead)
 # def get_lesson_by_id(
 #     lesson_id: int,
-#     db: Session = Depends(get_db),
+#     db: Session = Depends(get_tenant_db),
 #     current_admin: User = Depends(get_current_admin),
 # ):
 #     lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
@@ -358,25 +551,161 @@ def get_lessons_by_organisation(
 @router.delete("/admin/{lesson_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_any_lesson(
     lesson_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_tenant_db),
     current_admin: User = Depends(get_current_admin),
 ):
     lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
     if not lesson or lesson.organisation_id != current_admin.organisation_id:
         raise HTTPException(status_code=404, detail="Lesson not found")
 
+    organisation_id = lesson.organisation_id
+    member_ids = lesson_member_ids(lesson)
+    before, actor_id = lesson_snapshot(lesson), current_admin.id
+    add_lesson_tombstones(db, lesson.id, organisation_id, member_ids, organisation_wide=True)
+    exclude_occurrence(db, lesson)
     db.delete(lesson)
     db.commit()
+    lesson_documents.discard(lesson_id)
+    audit_log.record(organisation_id, actor_id, "lesson.deleted", lesson_id, diff(before, None))
+    bus.publish("lesson.deleted", lesson_id, organisation_id, member_ids)
+
+# ✅ ADMIN: Move lessons before a date (closed terms) into the archive
+@router.post("/admin/archive", response_model=LessonArchiveResult)
+def archive_lessons(
+    archive_data: LessonArchiveRequest,
+    db: Session = Depends(get_tenant_db),
+    current_admin: User = Depends(get_current_admin),
+):
+    if archive_data.before > date.today():
+        raise HTTPException(status_code=400, detail="Only past terms can be archived")
+
+    organisation_id = current_admin.organisation_id
+    result = archive_lessons_before(db, organisation_id, archive_data.before)
+    db.commit()
+    if result["lessons"]:
+        # clients drop the archived lessons through the tombstones in /lessons/changes
+        bus.publish("lessons.archived", None, organisation_id, (), organisation_wide=True)
+    return result
+
+# ✅ ADMIN: Copy a term's timetable into a new date range (dry_run only reports what would be copied)
+@router.post("/admin/rollover", response_model=LessonRolloverResult)
+def rollover_lessons(
+    rollover_data: LessonRolloverRequest,
+    db: Session = Depends(get_tenant_db),
+    current_admin: User = Depends(get_current_admin),
+):
+    if rollover_data.source_end < rollover_data.source_start:
+        raise HTTPException(status_code=400, detail="source_end is before source_start")
+    target_end = rollover_data.target_start + (rollover_data.source_end - rollover_data.source_start)
+    if rollover_data.target_start <= rollover_data.source_end and target_end >= rollover_data.source_start:
+        raise HTTPException(status_code=400, detail="The target range overlaps the source range")
+
+    organisation_id, actor_id = current_admin.organisation_id, current_admin.id
+    result = roll_over_lessons(
+        db,
+        organisation_id,
+        rollover_data.source_start,
+        rollover_data.source_end,
+        rollover_data.target_start,
+        dry_run=rollover_data.dry_run,
+    )
+    if rollover_data.dry_run or not result["lessons"]:
+        return result
+
+    db.commit()
+    # one summary event rather than one per copied lesson, which would pull every copy into Python
+    summary = {
+        "source_start": plain(rollover_data.source_start),
+        "source_end": plain(rollover_data.source_end),
+        "target_start": plain(rollover_data.target_start),
+        **{key: result[key] for key in ("lessons", "lesson_teachers", "lesson_students")},
+    }
+    audit_log.record(organisation_id, actor_id, "lessons.rolled_over", None, diff(None, summary))
+    # clients pick up the copies through /lessons/changes
+    bus.publish("lessons.rolled_over", None, organisation_id, (), organisation_wide=True)
+    return result
+
+# ✅ ADMIN: Common free time slots for a set of teachers and students
+@router.post("/admin/free-slots", response_model=List[FreeSlot])
+def get_free_slots(
+    query: FreeSlotQuery,
+    db: Session = Depends(get_tenant_db),
+    current_admin: User = Depends(get_current_admin),
+):
+    if query.end_date < query.start_date or (query.end_date - query.start_date).days > 366:
+        raise HTTPException(status_code=400, detail="Date range must be between 1 and 367 days")
+
+    if query.day_end <= query.day_start or query.duration <= 0:
+        raise HTTPException(status_code=400, detail="Invalid day window or duration")
+
+    participant_ids = set(query.teacher_ids) | set(query.student_ids)
+    participants = db.execute(
+        select(User.id, User.role).where(
+            User.id.in_(participant_ids),
+            User.organisation_id == current_admin.organisation_id,
+        )
+    ).all()
+
+    if len(participants) != len(participant_ids):
+        raise HTTPException(status_code=400, detail="One or more user IDs are invalid")
+
+    roles = dict(participants)
+    if any(roles[teacher_id] != "teacher" for teacher_id in query.teacher_ids):
+        raise HTTPException(status_code=400, detail="All teacher IDs must have role of teacher")
+    if any(roles[student_id] != "student" for student_id in query.student_ids):
+        raise HTTPException(status_code=400, detail="All student IDs must have role of student")
+
+    # start a day early so lessons running past midnight still block the first morning
+    in_range = Lesson.date.between(query.start_date - timedelta(days=1), query.end_date)
+    busy_rows = db.execute(union(
+        select(Lesson.date, Lesson.time, Lesson.duration)
+        .join(lesson_teachers, lesson_teachers.c.lesson_id == Lesson.id)
+        .where(lesson_teachers.c.teacher_id.in_(query.teacher_ids), in_range),
+        select(Lesson.date, Lesson.time, Lesson.duration)
+        .join(LessonStudent, LessonStudent.lesson_id == Lesson.id)
+        .where(LessonStudent.student_id.in_(query.student_ids), in_range),
+    )).all()
+
+    # recurring lessons that are not materialised yet are busy too
+    occurrences = expand_series(
+        db,
+        [
+            LessonSeries.organisation_id == current_admin.organisation_id,
+            or_(
+                LessonSeries.teachers.any(User.id.in_(query.teacher_ids)),
+                LessonSeries.students.any(User.id.in_(query.student_ids)),
+            ),
+        ],
+        query.start_date - timedelta(days=1),
+        query.end_date,
+    )
+    busy_rows += [(occurrence["date"], occurrence["time"], occurrence["duration"]) for occurrence in occurrences]
+
+    busy = []
+    for lesson_date, lesson_time, duration in busy_rows:
+        start = datetime.combine(lesson_date, lesson_time)
+        busy.append((start, start + timedelta(minutes=duration)))
+
+    slots = find_free_slots(
+        busy,
+        query.start_date,
+        query.end_date,
+        query.day_start,
+        query.day_end,
+        timedelta(minutes=round(query.duration * 60)),
+    )
+
+    return [{"date": start.date(), "start": start.time(), "end": end.time()} for start, end in slots]
 
 # api/routes/lessons.py
 
 @router.post("/admin", response_model=LessonRead)
 def admin_create_lesson(
     lesson_data: LessonCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_tenant_db),
     current_admin: User = Depends(get_current_admin),
 ):
-    teachers = db.query(User).filter(User.id.in_(lesson_data.teacher_ids)).all()
+    teachers = users_by_ids(db, lesson_data.teacher_ids)
 
     if len(teachers) != len(set(lesson_data.teacher_ids)):
         raise HTTPException(
@@ -397,7 +726,7 @@ def admin_create_lesson(
                 detail="All teachers must have role of teacher"
             )
 
-    students = db.query(User).filter(User.id.in_(lesson_data.student_ids)).all()
+    students = users_by_ids(db, lesson_data.student_ids)
 
     if len(students) != len(set(lesson_data.student_ids)):
         raise HTTPException(
@@ -438,16 +767,20 @@ def admin_create_lesson(
             )
         )
 
+    actor_id = current_admin.id
     db.add(lesson)
     db.commit()
     db.refresh(lesson)
+    audit_log.record(lesson.organisation_id, actor_id, "lesson.created", lesson.id, diff(None, lesson_snapshot(lesson)))
+    bus.publish("lesson.created", lesson.id, lesson.organisation_id, lesson_member_ids(lesson))
     return lesson
 
 #admin: get all lessons for a specific student:
 @router.get("/admin/students/{student_id}/lessons", response_model=list[LessonRead])
 def get_lessons_for_student(
     student_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_tenant_db),
+    fieldset: Optional[LessonFieldset] = Depends(lesson_fieldset),
     current_admin: User = Depends(get_current_admin),
 ):
     student = db.query(User).filter(
@@ -465,17 +798,20 @@ def get_lessons_for_student(
         db.query(Lesson)
         .join(LessonStudent, LessonStudent.lesson_id == Lesson.id)
         .filter(LessonStudent.student_id == student_id)
-        .order_by(Lesson.date, Lesson.time)
-        .all()
     )
 
-    return lessons
+    occurrences = expand_series(db, [
+        LessonSeries.organisation_id == current_admin.organisation_id,
+        LessonSeries.students.any(id=student_id),
+    ])
+    return lesson_list_response(db, lessons, occurrences, fieldset)
 
 #admin: get all lessons for a specific teacher
 @router.get("/admin/teachers/{teacher_id}/lessons", response_model=List[LessonRead])
 def get_lessons_for_teacher(
     teacher_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_tenant_db),
+    fieldset: Optional[LessonFieldset] = Depends(lesson_fieldset),
     current_admin: User = Depends(get_current_admin),
 ):
     teacher = db.query(User).filter(
@@ -487,10 +823,14 @@ def get_lessons_for_teacher(
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
 
-    return (
+    lessons = (
         db.query(Lesson)
         .filter(Lesson.teachers.any(id=teacher_id))
-        .order_by(Lesson.date, Lesson.time)
-        .all()
     )
 
+    occurrences = expand_series(db, [
+        LessonSeries.organisation_id == current_admin.organisation_id,
+        LessonSeries.teachers.any(id=teacher_id),
+    ])
+    return lesson_list_response(db, lessons, occurrences, fieldset)
+
@@ -0,0 +1,34 @@
+from datetime import date
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Literal
+
+from app.models.user import User
+from app.payroll import payroll_csv, payroll_report
+from app.schemas.payroll import PayrollReport
+from app.utils import get_current_admin, get_tenant_db
+
+router = APIRouter(tags=["Payroll"])
+
+
+# ✅ ADMIN: Lessons and hours per teacher for a month (closed months are served from a snapshot)
+@router.get("/", response_model=PayrollReport)
+def get_payroll(
+    year: int = Query(..., ge=2000, le=2100),
+    month: int = Query(..., ge=1, le=12),
+    format: Literal["json", "csv"] = "json",
+    refresh: bool = False,
+    db: Session = Depends(get_tenant_db),
+    current_admin: User = Depends(get_current_admin),
+):
+    report = payroll_report(db, current_admin.organisation_id, date(year, month, 1), refresh)
+    db.commit()
+
+    if format == "csv":
+        return StreamingResponse(
+            payroll_csv(report),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="payroll-{year}-{month:02d}.csv"'},
+        )
+    return report
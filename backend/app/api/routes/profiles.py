@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import List
+
+from app.models.user import User
+from app.profiling import profiles
+from app.schemas.profile import ProfileRead
+from app.utils import get_current_admin
+
+router = APIRouter(tags=["Profiles"])
+
+
+# ✅ ADMIN: Profiles taken of the organisation's requests (send X-Profile: 1 to take one), newest first
+@router.get("/", response_model=List[ProfileRead])
+def get_profiles(current_admin: User = Depends(get_current_admin)):
+    return profiles.list(current_admin.organisation_id)
+
+
+# ✅ ADMIN: Download one as a speedscope file (open it at https://www.speedscope.app)
+@router.get("/{profile_id}")
+def download_profile(profile_id: str, current_admin: User = Depends(get_current_admin)):
+    document = profiles.load(current_admin.organisation_id, profile_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        content=document,
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'},
+    )
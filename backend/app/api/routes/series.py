@@ -0,0 +1,273 @@
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.models.invoice import InvoiceLine
+from app.models.lesson import Lesson
+from app.models.reminder import LessonReminder
+from app.models.series import LessonSeries, LessonSeriesExdate
+from app.models.user import User
+from app.schemas.lesson import LessonRead, LessonSeriesCreate, LessonSeriesRead, LessonStudentRead, LessonStudentUpdate
+from app.series import MAX_SERIES_DAYS, is_occurrence, materialise_occurrence, visible_series_criteria
+from app.utils import get_current_user, get_current_admin, get_tenant_db, users_by_ids
+from app.changes import add_lesson_tombstones, add_series_tombstones
+from app.events import bus
+from app.audit import audit_log, diff, lesson_snapshot
+from app.api.routes.lesson import lesson_member_ids, update_lesson_student_status
+
+router = APIRouter(tags=["Lesson Series"])
+
+
+def get_series_or_404(db: Session, series_id: int, current_user: User) -> LessonSeries:
+    series = db.query(LessonSeries).filter(
+        LessonSeries.id == series_id,
+        *visible_series_criteria(current_user),
+    ).first()
+    if not series:
+        raise HTTPException(status_code=404, detail="Lesson series not found")
+    return series
+
+
+# teachers and students who should hear about changes to a series
+def series_member_ids(series: LessonSeries) -> set:
+    return {teacher.id for teacher in series.teachers} | {student.id for student in series.students}
+
+
+def get_occurrence_lesson(db: Session, series: LessonSeries, occurrence_date: date) -> Lesson:
+    """The stored lesson for an occurrence, materialising it on first use."""
+    if not is_occurrence(series, occurrence_date):
+        raise HTTPException(status_code=404, detail="No occurrence of this series on that date")
+
+    lesson = db.query(Lesson).filter(
+        Lesson.series_id == series.id,
+        Lesson.occurrence_date == occurrence_date,
+    ).first()
+    if lesson:
+        return lesson
+
+    removed = db.query(LessonSeriesExdate).filter(
+        LessonSeriesExdate.series_id == series.id,
+        LessonSeriesExdate.occurrence_date == occurrence_date,
+    ).first()
+    if removed:
+        raise HTTPException(status_code=404, detail="This occurrence was removed from the series")
+
+    return materialise_occurrence(db, series, occurrence_date)
+
+
+# ✅ ADMIN: Create a recurring lesson series
+@router.post("/", response_model=LessonSeriesRead, status_code=status.HTTP_201_CREATED)
+def create_series(
+    series_data: LessonSeriesCreate,
+    db: Session = Depends(get_tenant_db),
+    current_admin: User = Depends(get_current_admin),
+):
+    if series_data.organisation_id != current_admin.organisation_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only create lessons in your organisation"
+        )
+
+    if series_data.end_date < series_data.start_date or (series_data.end_date - series_data.start_date).days > MAX_SERIES_DAYS:
+        raise HTTPException(status_code=400, detail=f"A series must end within {MAX_SERIES_DAYS} days of its start")
+
+    if series_data.interval_weeks < 1:
+        raise HTTPException(status_code=400, detail="interval_weeks must be at least 1")
+
+    teachers = users_by_ids(db, series_data.teacher_ids)
+
+    if len(teachers) != len(set(series_data.teacher_ids)):
+        raise HTTPException(status_code=400, detail="One or more teacher IDs are invalid")
+
+    for teacher in teachers:
+        if teacher.organisation_id != current_admin.organisation_id:
+            raise HTTPException(status_code=400, detail="All teachers must belong to your organisation")
+
+        if teacher.role != "teacher":
+            raise HTTPException(status_code=400, detail="All teachers must have role of teacher")
+
+    students = users_by_ids(db, series_data.student_ids)
+
+    if len(students) != len(set(series_data.student_ids)):
+        raise HTTPException(status_code=400, detail="One or more student IDs are invalid")
+
+    for student in students:
+        if student.organisation_id != current_admin.organisation_id:
+            raise HTTPException(status_code=400, detail="All students must belong to your organisation")
+
+        if student.role != "student":
+            raise HTTPException(status_code=400, detail="All students must have role of student")
+
+    series = LessonSeries(
+        organisation_id=current_admin.organisation_id,
+        start_date=series_data.start_date,
+        end_date=series_data.end_date,
+        interval_weeks=series_data.interval_weeks,
+        time=series_data.time,
+        subject=series_data.subject,
+        duration=int(series_data.duration * 60),
+        location=series_data.location,
+        price=series_data.price,
+        teachers=teachers,
+        students=students,
+    )
+
+    db.add(series)
+    db.commit()
+    db.refresh(series)
+    bus.publish("series.created", None, series.organisation_id, series_member_ids(series))
+    return series
+
+
+#ALL: series visible to the caller (admins: whole organisation)
+@router.get("/", response_model=List[LessonSeriesRead])
+def get_series_list(
+    db: Session = Depends(get_tenant_db),
+    current_user: User = Depends(get_current_user),
+):
+    return (
+        db.query(LessonSeries)
+        .filter(*visible_series_criteria(current_user))
+        .order_by(LessonSeries.start_date, LessonSeries.time)
+        .all()
+    )
+
+
+#ALL: get specific series
+@router.get("/{series_id}", response_model=LessonSeriesRead)
+def get_series(
+    series_id: int,
+    db: Session = Depends(get_tenant_db),
+    current_user: User = Depends(get_current_user),
+):
+    return get_series_or_404(db, series_id, current_user)
+
+
+# ✅ ADMIN: Delete a series; materialised occurrences stay as one-off lessons
+@router.delete("/{series_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_series(
+    series_id: int,
+    db: Session = Depends(get_tenant_db),
+    current_admin: User = Depends(get_current_admin),
+):
+    series = get_series_or_404(db, series_id, current_admin)
+    member_ids = series_member_ids(series)
+    organisation_id = series.organisation_id
+    # reminders already sent for stored occurrences now belong to the one-off lessons they become
+    db.execute(
+        update(LessonReminder)
+        .where(
+            LessonReminder.series_id == series.id,
+            Lesson.series_id == series.id,
+            Lesson.occurrence_date == LessonReminder.occurrence_date,
+        )
+        .values(lesson_id=Lesson.id, series_id=None, occurrence_date=None)
+        .execution_options(synchronize_session=False)
+    )
+    # and so do invoice lines billed before they were stored, so they are not billed again
+    db.execute(
+        update(InvoiceLine)
+        .where(
+            InvoiceLine.lesson_id.is_(None),
+            InvoiceLine.series_id == series.id,
+            Lesson.series_id == series.id,
+            Lesson.occurrence_date == InvoiceLine.occurrence_date,
+        )
+        .values(lesson_id=Lesson.id)
+        .execution_options(synchronize_session=False)
+    )
+    # stored occurrences reach change feed clients as updated one-off lessons; the rest go with the series
+    db.query(Lesson).filter(Lesson.series_id == series.id).update(
+        {Lesson.series_id: None, Lesson.occurrence_date: None},
+        synchronize_session=False,
+    )
+    add_series_tombstones(db, series.id, organisation_id, member_ids)
+    db.delete(series)
+    db.commit()
+
+    bus.publish("series.deleted", None, organisation_id, member_ids)
+
+
+# ✅ ADMIN/TEACHER: Materialise an occurrence so it can be edited through /lessons/{id}
+@router.post("/{series_id}/occurrences/{occurrence_date}", response_model=LessonRead)
+def materialise_series_occurrence(
+    series_id: int,
+    occurrence_date: date,
+    db: Session = Depends(get_tenant_db),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role == "student":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Students cannot edit lessons"
+        )
+
+    series = get_series_or_404(db, series_id, current_user)
+    lesson = get_occurrence_lesson(db, series, occurrence_date)
+    db.commit()
+    db.refresh(lesson)
+    return lesson
+
+
+# ✅ ADMIN: Remove a single occurrence from a series
+@router.delete("/{series_id}/occurrences/{occurrence_date}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_series_occurrence(
+    series_id: int,
+    occurrence_date: date,
+    db: Session = Depends(get_tenant_db),
+    current_admin: User = Depends(get_current_admin),
+):
+    series = get_series_or_404(db, series_id, current_admin)
+    if not is_occurrence(series, occurrence_date):
+        raise HTTPException(status_code=404, detail="No occurrence of this series on that date")
+
+    lesson = db.query(Lesson).filter(
+        Lesson.series_id == series.id,
+        Lesson.occurrence_date == occurrence_date,
+    ).first()
+
+    before = None
+    if lesson:
+        member_ids = lesson_member_ids(lesson)
+        before = lesson_snapshot(lesson)
+        add_lesson_tombstones(db, lesson.id, lesson.organisation_id, member_ids, organisation_wide=True)
+        db.delete(lesson)
+    else:
+        member_ids = series_member_ids(series)
+        add_series_tombstones(db, series.id, series.organisation_id, member_ids, occurrence_date)
+
+    db.merge(LessonSeriesExdate(series_id=series.id, occurrence_date=occurrence_date))
+    lesson_id = lesson.id if lesson else None
+    actor_id = current_admin.id
+    db.commit()
+
+    if lesson_id is not None:
+        audit_log.record(series.organisation_id, actor_id, "lesson.deleted", lesson_id, diff(before, None))
+        bus.publish("lesson.deleted", lesson_id, series.organisation_id, member_ids)
+    else:
+        bus.publish("series.occurrence_deleted", None, series.organisation_id, member_ids)
+
+
+#teacher/admin: status change on an occurrence (materialises it first)
+@router.patch("/{series_id}/occurrences/{occurrence_date}/students/{student_id}", response_model=LessonStudentRead)
+def update_series_occurrence_student_status(
+    series_id: int,
+    occurrence_date: date,
+    student_id: int,
+    update_data: LessonStudentUpdate,
+    db: Session = Depends(get_tenant_db),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role == "student":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Students cannot edit lesson student status",
+        )
+
+    series = get_series_or_404(db, series_id, current_user)
+    lesson = get_occurrence_lesson(db, series, occurrence_date)
+
+    # the regular route re-checks permissions and commits the new lesson with the status
+    return update_lesson_student_status(lesson.id, student_id, update_data, db, current_user)
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile, status
+from sqlalchemy import or_, tuple_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
 
 from app.models.user import User
-from app.schemas.user import UserCreate, UserRead, UserUpdate
-from app.database import get_db
-from app.utils import hash_password, get_current_user, get_current_admin
-from app.email import create_email_token, send_verification_email
+from app.schemas.user import UserCreate, UserImportRequest, UserBatch, UserImportResult, UserRead, UserSearchPage, UserUpdate
+from app.pagination import batch_ids, decode_cursor, encode_cursor, escape_like
+from app.tenancy import tenants
+from app.utils import hash_password, get_current_user, get_current_admin, get_tenant_db, tenant_session
+from app.email import create_email_token, send_verification_email, send_verification_emails
+from app.documents import bump_user_lesson_versions
+from app.user_import import MAX_IMPORT_ROWS, import_users, parse_csv_rows
 
 
 router = APIRouter(
@@ -33,23 +37,33 @@ router = APIRouter(
 #     db.refresh(new_user)
 #     return new_user
 
+# sign-up is unauthenticated, so the organisation in the body picks the shard
+def get_signup_db(user_data: UserCreate) -> Session:
+    db = tenant_session(user_data.organisation_id)
+    try:
+        yield db
+    finally:
+        db.close()
+
 @router.post("/", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def create_user(user_data: UserCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-
-    hashed_password = hash_password(user_data.password)
-    new_user = User(
-        name=user_data.name,
-        email=user_data.email,
-        password=hashed_password,
-        role=user_data.role,
-        organisation_id=user_data.organisation_id,
-        is_verified=False
-    )
-    db.add(new_user)
-    db.commit()
+def create_user(user_data: UserCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_signup_db)):
+    # the shard only knows its own users; the directory knows everyone's email
+    with tenants.claimed_emails([user_data.email], user_data.organisation_id) as claimed:
+        existing_user = db.query(User).filter(User.email == user_data.email).first()
+        if not claimed or existing_user:
+            raise HTTPException(status_code=400, detail="Email already registered")
+
+        hashed_password = hash_password(user_data.password)
+        new_user = User(
+            name=user_data.name,
+            email=user_data.email,
+            password=hashed_password,
+            role=user_data.role,
+            organisation_id=user_data.organisation_id,
+            is_verified=False
+        )
+        db.add(new_user)
+        db.commit()
     db.refresh(new_user)
 
     token = create_email_token(new_user.email)
@@ -58,6 +72,54 @@ def create_user(user_data: UserCreate, background_tasks: BackgroundTasks, db: Se
     return new_user
 
 
+# --- Bulk import users into own organisation (admin only) ---
+def run_user_import(raw_rows: list, background_tasks: BackgroundTasks, db: Session, admin: User) -> dict:
+    if len(raw_rows) > MAX_IMPORT_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_IMPORT_ROWS} users per import")
+
+    result = import_users(db, raw_rows, admin.organisation_id)
+    try:
+        # built before the commit: a response that fails validation must not leave users behind
+        response = UserImportResult(created=len(result["created"]), errors=result["errors"])
+        db.commit()
+    except BaseException:
+        # the users go first, so no one holds an email whose claim is released
+        db.rollback()
+        tenants.release_emails(result["created"])
+        raise
+
+    if result["created"]:
+        background_tasks.add_task(send_verification_emails, result["created"])
+
+    return response
+
+
+@router.post("/import", response_model=UserImportResult)
+def import_users_json(
+    import_data: UserImportRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_tenant_db),
+    admin: User = Depends(get_current_admin),
+):
+    return run_user_import(import_data.users, background_tasks, db, admin)
+
+
+# CSV columns: name,email,role,password
+@router.post("/import/csv", response_model=UserImportResult)
+def import_users_csv(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_tenant_db),
+    admin: User = Depends(get_current_admin),
+):
+    try:
+        raw_rows = parse_csv_rows(file.file.read())
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    return run_user_import(raw_rows, background_tasks, db, admin)
+
+
 # --- Get current user's profile ---
 @router.get("/me", response_model=UserRead)
 def get_my_user(current_user: User = Depends(get_current_user)):
@@ -66,9 +128,11 @@ def get_my_user(current_user: User = Depends(get_current_user)):
 
 # --- Update current user's profile ---
 @router.put("/me", response_model=UserRead)
-def update_my_user(update_data: UserUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def update_my_user(update_data: UserUpdate, db: Session = Depends(get_tenant_db), current_user: User = Depends(get_current_user)):
     if update_data.name:
         current_user.name = update_data.name
+        # the name is embedded in every cached lesson document they appear in
+        bump_user_lesson_versions(db, current_user.id)
     if update_data.password:
         current_user.password = hash_password(update_data.password)
     db.commit()
@@ -79,14 +143,14 @@ def update_my_user(update_data: UserUpdate, db: Session = Depends(get_db), curre
 
 # --- Get all users (all users) ---
 @router.get("/", response_model=List[UserRead])
-def get_all_users(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_all_users(db: Session = Depends(get_tenant_db), current_user: User = Depends(get_current_user)):
     return db.query(User).filter(User.organisation_id == current_user.organisation_id).all()
 
 
 # --- Get all teachers (all users) ---
 @router.get("/teachers", response_model=List[UserRead])
 def get_teachers(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_tenant_db),
     current_user: User = Depends(get_current_user),
 ):
     return db.query(User).filter(
@@ -97,13 +161,66 @@ def get_teachers(
 
 # --- Get all students (all users) ---
 @router.get("/students", response_model=List[UserRead])
-def get_students(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_students(db: Session = Depends(get_tenant_db), current_user: User = Depends(get_current_user)):
     return db.query(User).filter(User.role == "student", User.organisation_id == current_user.organisation_id).all()
 
 
+# --- Search users in own organisation (typeahead) ---
+@router.get("/search", response_model=UserSearchPage)
+def search_users(
+    q: str = Query("", max_length=100),
+    role: Optional[Literal["admin", "teacher", "student"]] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_tenant_db),
+    current_user: User = Depends(get_current_user),
+):
+    query = db.query(User).filter(User.organisation_id == current_user.organisation_id)
+
+    if role:
+        query = query.filter(User.role == role)
+
+    term = q.strip()
+    if term:
+        pattern = f"%{escape_like(term)}%"
+        query = query.filter(or_(
+            User.name.ilike(pattern, escape="\\"),
+            User.email.ilike(pattern, escape="\\"),
+        ))
+
+    if cursor:
+        after_name, after_id = decode_cursor(cursor, 2)
+        query = query.filter(tuple_(User.name, User.id) > (after_name, after_id))
+
+    # fetch one extra row to know whether another page exists
+    users = query.order_by(User.name, User.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1].name, users[-1].id)
+
+    return {"items": users, "next_cursor": next_cursor}
+
+
+# --- Get several users by ID in one query (all users; other organisations are forbidden) ---
+@router.get("/batch", response_model=UserBatch)
+def get_users_batch(
+    ids: List[int] = Depends(batch_ids),
+    db: Session = Depends(get_tenant_db),
+    current_user: User = Depends(get_current_user),
+):
+    users = {user.id: user for user in db.query(User).filter(User.id.in_(ids))}
+    return {
+        "items": [users[user_id] for user_id in ids if user_id in users and users[user_id].organisation_id == current_user.organisation_id],
+        "forbidden": [user_id for user_id in ids if user_id in users and users[user_id].organisation_id != current_user.organisation_id],
+        "not_found": [user_id for user_id in ids if user_id not in users],
+    }
+
+
 # --- Get user by ID (all users) ---
 @router.get("/{user_id}", response_model=UserRead)
-def get_user_by_id(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_user_by_id(user_id: int, db: Session = Depends(get_tenant_db), current_user: User = Depends(get_current_user)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -112,9 +229,10 @@ def get_user_by_id(user_id: int, db: Session = Depends(get_db), current_user: Us
 
 # --- Delete user by ID (admin only) ---
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(user_id: int, db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
+def delete_user(user_id: int, db: Session = Depends(get_tenant_db), admin: User = Depends(get_current_admin)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     db.delete(user)
     db.commit()
+    tenants.release_emails([user.email])
@@ -0,0 +1,154 @@
+#moves closed terms out of the hot lesson tables into the date-partitioned archive
+from datetime import date, timedelta
+from typing import Union
+
+from sqlalchemy import Integer, and_, cast, delete, func, literal, null, select, text, union, union_all
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models.archive import ARCHIVE_TABLES, ArchivedLesson, ArchivedLessonStudent, archive_lesson_teachers
+from app.models.associations import LessonStudent, lesson_teachers
+from app.models.change import LessonSeriesTombstone, LessonTombstone
+from app.models.lesson import Lesson
+from app.models.series import LessonSeries, LessonSeriesExdate
+from app.series import materialise_range, occurrence_dates
+
+
+def ensure_archive_partitions(db: Union[Session, Connection], first_year: int, last_year: int):
+    for year in range(first_year, last_year + 1):
+        for table in ARCHIVE_TABLES:
+            db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {table}_y{year} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+            ))
+
+
+def trim_series_before(db: Session, organisation_id: int, cutoff: date):
+    series_list = db.query(LessonSeries).filter(
+        LessonSeries.organisation_id == organisation_id,
+        LessonSeries.start_date < cutoff,
+    ).all()
+
+    for series in series_list:
+        remaining = occurrence_dates(series, cutoff, None)
+        if remaining:
+            series.start_date = remaining[0]
+        else:
+            db.delete(series)
+
+    db.query(LessonSeriesExdate).filter(
+        LessonSeriesExdate.series_id.in_([series.id for series in series_list]),
+        LessonSeriesExdate.occurrence_date < cutoff,
+    ).delete(synchronize_session=False)
+    db.flush()
+
+
+def tombstone_lessons_before(db: Session, organisation_id: int, cutoff: date):
+    """Tombstone every lesson dated before cutoff for its teachers, students and admins.
+
+    Change feed clients then drop archived lessons as they drop deleted ones.
+    Series occurrences are tombstoned by (series_id, occurrence_date) as well,
+    since clients may hold them as virtual occurrences without an id.
+    """
+    archived = and_(Lesson.organisation_id == organisation_id, Lesson.date < cutoff)
+    members = union(
+        select(lesson_teachers.c.lesson_id, lesson_teachers.c.teacher_id.label("user_id")),
+        select(LessonStudent.lesson_id, LessonStudent.student_id),
+    ).subquery()
+    # NULL is the organisation-wide row admins sync against
+    recipients = union_all(
+        select(Lesson.id.label("lesson_id"), members.c.user_id).join(members, members.c.lesson_id == Lesson.id).where(archived),
+        select(Lesson.id, cast(null(), Integer)).where(archived),
+    ).subquery()
+
+    db.execute(
+        LessonTombstone.__table__.insert().from_select(
+            ["lesson_id", "organisation_id", "user_id"],
+            select(recipients.c.lesson_id, literal(organisation_id, Integer), recipients.c.user_id),
+        )
+    )
+    db.execute(
+        LessonSeriesTombstone.__table__.insert().from_select(
+            ["series_id", "occurrence_date", "organisation_id", "user_id"],
+            select(Lesson.series_id, Lesson.occurrence_date, literal(organisation_id, Integer), recipients.c.user_id)
+            .join(Lesson, Lesson.id == recipients.c.lesson_id)
+            .where(Lesson.series_id.is_not(None)),
+        )
+    )
+
+
+def archive_lessons_before(db: Session, organisation_id: int, cutoff: date) -> dict:
+    """Move an organisation's lessons dated before cutoff, with their rosters, into the archive.
+
+    Runs as set-based INSERT ... SELECT / DELETE statements in the caller's
+    transaction; nothing is committed here. Series occurrences before the
+    cutoff are materialised first so they are archived with the rest, and the
+    series are trimmed to start at the cutoff. Every archived lesson gets its
+    tombstones (tombstone_lessons_before) in the same transaction.
+    """
+    materialise_range(db, organisation_id, None, cutoff - timedelta(days=1))
+    # before the trim, which can delete a series and with it its lessons' series_id
+    tombstone_lessons_before(db, organisation_id, cutoff)
+    trim_series_before(db, organisation_id, cutoff)
+
+    archived_ids = (
+        select(Lesson.id)
+        .where(Lesson.organisation_id == organisation_id, Lesson.date < cutoff)
+        .scalar_subquery()
+    )
+
+    first, last = db.execute(
+        select(func.min(Lesson.date), func.max(Lesson.date))
+        .where(Lesson.organisation_id == organisation_id, Lesson.date < cutoff)
+    ).one()
+    if first is None:
+        return {"lessons": 0, "lesson_teachers": 0, "lesson_students": 0}
+
+    ensure_archive_partitions(db, first.year, last.year)
+
+    teachers = db.execute(
+        archive_lesson_teachers.insert().from_select(
+            ["lesson_id", "lesson_date", "teacher_id"],
+            select(lesson_teachers.c.lesson_id, Lesson.date, lesson_teachers.c.teacher_id)
+            .join(Lesson, Lesson.id == lesson_teachers.c.lesson_id)
+            .where(Lesson.id.in_(archived_ids)),
+        )
+    ).rowcount
+
+    students = db.execute(
+        ArchivedLessonStudent.__table__.insert().from_select(
+            ["lesson_id", "lesson_date", "student_id", "attendance_status", "payment_status", "updated_at"],
+            select(
+                LessonStudent.lesson_id,
+                Lesson.date,
+                LessonStudent.student_id,
+                LessonStudent.attendance_status,
+                LessonStudent.payment_status,
+                LessonStudent.updated_at,
+            )
+            .join(Lesson, Lesson.id == LessonStudent.lesson_id)
+            .where(Lesson.id.in_(archived_ids)),
+        )
+    ).rowcount
+
+    lesson_columns = ["id", "date", "time", "subject", "duration", "location", "price", "organisation_id", "updated_at"]
+    lessons = db.execute(
+        ArchivedLesson.__table__.insert().from_select(
+            lesson_columns,
+            select(*[Lesson.__table__.c[name] for name in lesson_columns]).where(Lesson.id.in_(archived_ids)),
+        )
+    ).rowcount
+
+    db.execute(delete(lesson_teachers).where(lesson_teachers.c.lesson_id.in_(archived_ids)))
+    db.execute(
+        delete(LessonStudent)
+        .where(LessonStudent.lesson_id.in_(archived_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        delete(Lesson)
+        .where(Lesson.organisation_id == organisation_id, Lesson.date < cutoff)
+        .execution_options(synchronize_session=False)
+    )
+
+    return {"lessons": lessons, "lesson_teachers": teachers, "lesson_students": students}
@@ -0,0 +1,240 @@
+#audit trail for lesson writes: routes record into an in-memory buffer after they commit,
+#a background thread writes the buffer to audit_events in multi-row inserts
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, time, timezone
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.audit import AuditEvent
+from app.models.lesson import Lesson
+from app.tenancy import OrganisationMoving, tenants
+
+logger = logging.getLogger(__name__)
+
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "2"))
+# buffered events beyond this (database down) are spilled to the fallback file instead
+AUDIT_MAX_BUFFER = int(os.getenv("AUDIT_MAX_BUFFER", "50000"))
+# events that could not be written at shutdown; replayed on the next start. Workers share it,
+# so a relative path is resolved against the working directory once, at startup
+AUDIT_FALLBACK_PATH = os.getenv("AUDIT_FALLBACK_PATH", "audit-fallback.jsonl")
+
+LESSON_FIELDS = ("date", "time", "subject", "duration", "location", "price")
+
+
+def plain(value):
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return value
+
+
+def lesson_snapshot(lesson: Lesson) -> dict:
+    """The audited fields of a lesson, JSON-ready; take it before changing the lesson."""
+    snapshot = {field: plain(getattr(lesson, field)) for field in LESSON_FIELDS}
+    snapshot["teacher_ids"] = sorted(teacher.id for teacher in lesson.teachers)
+    snapshot["student_ids"] = sorted(link.student_id for link in lesson.student_links)
+    return snapshot
+
+
+def diff(before: Optional[dict], after: Optional[dict]) -> Dict[str, list]:
+    before, after = before or {}, after or {}
+    return {
+        field: [before.get(field), after.get(field)]
+        for field in {**before, **after}
+        if before.get(field) != after.get(field)
+    }
+
+
+class AuditLog:
+    """Buffers audit events and flushes them per shard when AUDIT_BATCH_SIZE
+    events are waiting or AUDIT_FLUSH_SECONDS have passed.
+
+    A crash loses at most one flush interval of events; a clean shutdown
+    flushes, and whatever still cannot be written goes to the fallback file.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_seconds: float = AUDIT_FLUSH_SECONDS,
+        fallback_path: str = AUDIT_FALLBACK_PATH,
+        session_for: Callable[[int], Session] = tenants.session_for,
+    ):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.fallback_path = os.path.abspath(fallback_path)
+        self.session_for = session_for
+        self._lock = threading.Lock()
+        # one flush at a time, so events of one organisation are written in order
+        self._flush_lock = threading.Lock()
+        self._buffer: List[dict] = []
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # the fallback file is shared by every worker: an exclusive lock file guards spilling and replaying,
+        # re-entrant within a process because a replay's flush can spill
+        self._fallback_mutex = threading.RLock()
+        self._fallback_lock_file = None
+        self._fallback_depth = 0
+
+    def record(
+        self,
+        organisation_id: int,
+        actor_id: Optional[int],
+        action: str,
+        lesson_id: Optional[int],
+        changes: dict,
+        student_id: Optional[int] = None,
+    ):
+        """Queue one event; call after the change has committed. Empty changes are skipped."""
+        if not changes:
+            return
+        event = {
+            "organisation_id": organisation_id,
+            "actor_id": actor_id,
+            "action": action,
+            "lesson_id": lesson_id,
+            "student_id": student_id,
+            "changes": changes,
+            "occurred_at": datetime.now(timezone.utc),
+        }
+        with self._lock:
+            self._buffer.append(event)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self) -> int:
+        """Write everything buffered; events that fail stay buffered. Returns how many were written."""
+        with self._flush_lock:
+            with self._lock:
+                events, self._buffer = self._buffer, []
+            if not events:
+                return 0
+
+            by_organisation: Dict[int, List[dict]] = {}
+            for event in events:
+                by_organisation.setdefault(event["organisation_id"], []).append(event)
+
+            written, failed = 0, []
+            for organisation_id, rows in by_organisation.items():
+                try:
+                    self._write(organisation_id, rows)
+                    written += len(rows)
+                except OrganisationMoving:
+                    failed.extend(rows)
+                except Exception:
+                    logger.exception("Writing %s audit events of organisation %s failed", len(rows), organisation_id)
+                    failed.extend(rows)
+
+            if failed:
+                with self._lock:
+                    self._buffer[:0] = failed
+                    overflow = len(self._buffer) - AUDIT_MAX_BUFFER
+                    spilled = self._buffer[:overflow] if overflow > 0 else []
+                    del self._buffer[:len(spilled)]
+                if spilled:
+                    self._spill(spilled)
+            return written
+
+    def _write(self, organisation_id: int, rows: List[dict]):
+        db = self.session_for(organisation_id)
+        try:
+            # executemany rather than one huge VALUES clause: compiling that costs more than the insert,
+            # and SQLAlchemy already sends executemany as multi-row INSERT pages on postgres
+            for start in range(0, len(rows), self.batch_size):
+                db.execute(insert(AuditEvent), rows[start:start + self.batch_size])
+            db.commit()
+        finally:
+            db.close()
+
+    @contextmanager
+    def _fallback_locked(self):
+        with self._fallback_mutex:
+            if self._fallback_depth == 0:
+                self._fallback_lock_file = open(self.fallback_path + ".lock", "a")
+                fcntl.flock(self._fallback_lock_file, fcntl.LOCK_EX)
+            self._fallback_depth += 1
+            try:
+                yield
+            finally:
+                self._fallback_depth -= 1
+                if self._fallback_depth == 0:
+                    fcntl.flock(self._fallback_lock_file, fcntl.LOCK_UN)
+                    self._fallback_lock_file.close()
+                    self._fallback_lock_file = None
+
+    def _spill(self, events: List[dict]):
+        with self._fallback_locked():
+            with open(self.fallback_path, "a", encoding="utf-8") as fallback:
+                for event in events:
+                    fallback.write(json.dumps({**event, "occurred_at": event["occurred_at"].isoformat()}) + "\n")
+                fallback.flush()
+                os.fsync(fallback.fileno())
+        logger.warning("Spilled %s audit events to %s", len(events), self.fallback_path)
+
+    def replay_fallback(self) -> int:
+        """Write the events a previous shutdown could not; any that fail again stay buffered.
+
+        Only one worker replays a given file: the others wait for the lock and then find it gone.
+        """
+        with self._fallback_locked():
+            replaying = self.fallback_path + ".replaying"
+            # a .replaying file still here under the lock is left from a worker that died mid-replay
+            if os.path.exists(self.fallback_path) and not os.path.exists(replaying):
+                os.replace(self.fallback_path, replaying)
+            if not os.path.exists(replaying):
+                return 0
+            with open(replaying, encoding="utf-8") as fallback:
+                events = [json.loads(line) for line in fallback if line.strip()]
+            for event in events:
+                event["occurred_at"] = datetime.fromisoformat(event["occurred_at"])
+            with self._lock:
+                self._buffer[:0] = events
+            # the file goes once the events are in the database or back in the buffer, which stop() spills again
+            self.flush()
+            os.remove(replaying)
+            return len(events)
+
+    def start(self):
+        replayed = self.replay_fallback()
+        if replayed:
+            logger.info("Replaying %s audit events from %s", replayed, self.fallback_path)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_seconds + 5)
+            self._thread = None
+        self.flush()
+        with self._lock:
+            remaining, self._buffer = self._buffer, []
+        if remaining:
+            self._spill(remaining)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Audit flush failed")
+
+
+audit_log = AuditLog()
@@ -0,0 +1,63 @@
+#helpers for the incremental lesson change feed (GET /lessons/changes)
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.models.change import LessonSeriesTombstone, LessonTombstone
+from app.models.user import User
+from app.pagination import decode_cursor, encode_cursor
+
+# updated_at is the writer's transaction start time, so a row can become visible
+# slightly after a reader's cursor passed it; re-read this window on every sync
+CHANGE_FEED_OVERLAP = timedelta(seconds=5)
+
+
+def encode_change_cursor(synced_at: datetime) -> str:
+    return encode_cursor(synced_at.isoformat())
+
+
+def decode_change_cursor(cursor: str) -> datetime:
+    (value,) = decode_cursor(cursor, 1)
+    try:
+        return datetime.fromisoformat(value) - CHANGE_FEED_OVERLAP
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def add_lesson_tombstones(db: Session, lesson_id: int, organisation_id: int, user_ids: Iterable[int], organisation_wide: bool = False):
+    """Record that lesson_id is gone for user_ids (and for admins if organisation_wide)."""
+    rows = [
+        LessonTombstone(lesson_id=lesson_id, organisation_id=organisation_id, user_id=user_id)
+        for user_id in set(user_ids)
+    ]
+    if organisation_wide:
+        rows.append(LessonTombstone(lesson_id=lesson_id, organisation_id=organisation_id, user_id=None))
+    db.add_all(rows)
+
+
+def add_series_tombstones(db: Session, series_id: int, organisation_id: int, user_ids: Iterable[int], occurrence_date: Optional[date] = None):
+    """Record that a series (or its occurrence on occurrence_date) is gone for user_ids and for admins."""
+    rows = [
+        LessonSeriesTombstone(series_id=series_id, occurrence_date=occurrence_date, organisation_id=organisation_id, user_id=user_id)
+        for user_id in [*set(user_ids), None]
+    ]
+    db.add_all(rows)
+
+
+def tombstone_criteria(model, current_user: User, since_at: datetime) -> list:
+    # admins sync against the organisation-wide rows, everyone else against their own
+    criteria = [model.organisation_id == current_user.organisation_id, model.deleted_at > since_at]
+    if current_user.role == "admin":
+        criteria.append(model.user_id.is_(None))
+    else:
+        criteria.append(model.user_id == current_user.id)
+    return criteria
+
+
+def lesson_start(lesson) -> tuple:
+    # stored lessons and virtual series occurrences (dicts) alike
+    if isinstance(lesson, dict):
+        return lesson["date"], lesson["time"]
+    return lesson.date, lesson.time
@@ -8,7 +8,17 @@ load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = 'postgresql+psycopg2://postgres:secret@db:5432/app_db' #os.getenv("DATABASE_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# psycopg 3 ("postgresql+psycopg://") turns a statement into a server-side prepared statement once
+# a connection has run it this many times ("none" never prepares); psycopg2 has no prepared statements
+DATABASE_PREPARE_THRESHOLD = os.getenv("DATABASE_PREPARE_THRESHOLD", "5")
+
+def driver_connect_args(url: str) -> dict:
+    if not url.startswith("postgresql+psycopg://"):
+        return {}
+    threshold = None if DATABASE_PREPARE_THRESHOLD.lower() == "none" else int(DATABASE_PREPARE_THRESHOLD)
+    return {"prepare_threshold": threshold}
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=driver_connect_args(SQLALCHEMY_DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
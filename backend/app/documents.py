@@ -0,0 +1,306 @@
+#precomputed LessonRead documents, cached per worker and checked against lessons.version,
+#and sparse lesson lists (?fields= / ?include=) built straight from row tuples
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException, Query as QueryParam, Response
+from sqlalchemy import null, select, union, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Query, Session, selectinload
+
+from app.models.archive import ArchivedLesson, ArchivedLessonStudent, archive_lesson_teachers
+from app.models.associations import LessonStudent, lesson_teachers
+from app.models.lesson import Lesson
+from app.models.user import User
+from app.schemas.lesson import LessonRead
+from app.schemas.user import UserRead
+
+LESSON_DOCUMENT_CACHE_SIZE = int(os.getenv("LESSON_DOCUMENT_CACHE_SIZE", "20000"))
+
+
+class LessonDocumentCache:
+    """Bounded LRU of serialised LessonRead documents keyed by lesson id.
+
+    An entry is only returned for the exact version it was rendered from, so a
+    write committed by any worker (which bumps lessons.version) makes every
+    worker's copy unreachable.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[int, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, lesson_id: int, version: int) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(lesson_id)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(lesson_id)
+            return entry[1]
+
+    def put(self, lesson_id: int, version: int, document: bytes):
+        with self._lock:
+            current = self._entries.get(lesson_id)
+            # never replace a newer rendering with an older one
+            if current is not None and current[0] > version:
+                return
+            self._entries[lesson_id] = (version, document)
+            self._entries.move_to_end(lesson_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, lesson_id: int):
+        with self._lock:
+            self._entries.pop(lesson_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+lesson_documents = LessonDocumentCache(LESSON_DOCUMENT_CACHE_SIZE)
+
+
+RELATIONSHIP_FIELDS = ("teachers", "student_links")
+SCALAR_FIELDS = tuple(name for name in LessonRead.model_fields if name not in RELATIONSHIP_FIELDS)
+# roster tables per lesson model: (teachers, students)
+ROSTER_TABLES = {
+    Lesson: (lesson_teachers, LessonStudent.__table__),
+    ArchivedLesson: (archive_lesson_teachers, ArchivedLessonStudent.__table__),
+}
+USER_COLUMNS = [User.__table__.c[name] for name in UserRead.model_fields]
+# what a full lesson list reads per lesson: enough to find or render its document, and to sort
+LESSON_ROW_COLUMNS = (Lesson.id, Lesson.version, Lesson.date, Lesson.time)
+
+
+@dataclass(frozen=True)
+class LessonFieldset:
+    fields: Tuple[str, ...]
+    relationships: Tuple[str, ...]
+
+
+def lesson_fieldset(
+    fields: Optional[str] = QueryParam(None, description="Comma-separated LessonRead fields, e.g. id,date,time,subject"),
+    include: Optional[str] = QueryParam(None, description="Rosters to include: teachers,student_links (empty for none)"),
+) -> Optional[LessonFieldset]:
+    """None (full LessonRead documents) unless fields or include was given."""
+    if fields is None and include is None:
+        return None
+
+    requested = [name.strip() for name in (fields or "").split(",") if name.strip()]
+    relationships = [name.strip() for name in (include or "").split(",") if name.strip()]
+    unknown = [name for name in requested + relationships if name not in LessonRead.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown lesson fields: {', '.join(unknown)} (choose from {', '.join(LessonRead.model_fields)})",
+        )
+
+    scalars = [name for name in requested if name in SCALAR_FIELDS] if fields is not None else list(SCALAR_FIELDS)
+    relationships += [name for name in requested if name in RELATIONSHIP_FIELDS]
+    return LessonFieldset(
+        tuple(dict.fromkeys(scalars)),
+        tuple(name for name in RELATIONSHIP_FIELDS if name in relationships),
+    )
+
+
+def render_lesson(lesson) -> bytes:
+    return orjson.dumps(LessonRead.model_validate(lesson, from_attributes=True).model_dump(mode="json"))
+
+
+def fetch_lesson_documents(db: Session, versions: Iterable[Tuple[int, int]]) -> Dict[int, bytes]:
+    """Documents for (lesson_id, version) pairs, rendering cache misses in one batched load."""
+    documents: Dict[int, bytes] = {}
+    missing = []
+    for lesson_id, version in versions:
+        document = lesson_documents.get(lesson_id, version)
+        if document is None:
+            missing.append(lesson_id)
+        else:
+            documents[lesson_id] = document
+
+    if missing:
+        lessons = (
+            db.query(Lesson)
+            .filter(Lesson.id.in_(missing))
+            .options(
+                selectinload(Lesson.teachers),
+                selectinload(Lesson.student_links).selectinload(LessonStudent.student),
+            )
+            .all()
+        )
+        for lesson in lessons:
+            document = render_lesson(lesson)
+            lesson_documents.put(lesson.id, lesson.version, document)
+            documents[lesson.id] = document
+
+    return documents
+
+
+def lesson_document_response(db: Session, lesson_id: int, version: int) -> Response:
+    documents = fetch_lesson_documents(db, [(lesson_id, version)])
+    return Response(content=documents[lesson_id], media_type="application/json")
+
+
+def lesson_list_response(
+    db: Session,
+    lesson_query: Query,
+    occurrences: List[dict] = (),
+    fieldset: Optional[LessonFieldset] = None,
+) -> Response:
+    """Serve a lesson list from cached documents, merged with virtual series occurrences by date and time."""
+    if fieldset is not None:
+        return sparse_lesson_list_response(db, lesson_query, fieldset, occurrences)
+    return lesson_rows_response(db, lesson_query.with_entities(*LESSON_ROW_COLUMNS).all(), occurrences)
+
+
+def lesson_rows_response(db: Session, rows: List[Row], occurrences: List[dict] = ()) -> Response:
+    """lesson_list_response for rows of LESSON_ROW_COLUMNS already fetched, e.g. by a prebuilt statement."""
+    documents = fetch_lesson_documents(db, [(row.id, row.version) for row in rows])
+
+    items = [((row.date, row.time), documents[row.id]) for row in rows if row.id in documents]
+    items += [((occurrence["date"], occurrence["time"]), render_lesson(occurrence)) for occurrence in occurrences]
+    items.sort(key=lambda item: item[0])
+
+    return Response(content=b"[" + b",".join(document for _, document in items) + b"]", media_type="application/json")
+
+
+def lesson_batch_response(
+    db: Session,
+    lesson_ids: List[int],
+    versions: Dict[int, int],
+    archived_ids: List[int],
+    forbidden: List[int],
+    not_found: List[int],
+) -> Response:
+    """Serve visible lessons (versions of live ones, ids of archived ones) in the order they were asked for."""
+    documents = fetch_lesson_documents(db, versions.items())
+    if archived_ids:
+        lessons = (
+            db.query(ArchivedLesson)
+            .filter(ArchivedLesson.id.in_(archived_ids))
+            .options(
+                selectinload(ArchivedLesson.teachers),
+                selectinload(ArchivedLesson.student_links).selectinload(ArchivedLessonStudent.student),
+            )
+            .all()
+        )
+        documents.update((lesson.id, render_lesson(lesson)) for lesson in lessons)
+
+    items = b",".join(documents[lesson_id] for lesson_id in lesson_ids if lesson_id in documents)
+    return Response(
+        content=b'{"items":[' + items + b'],"forbidden":' + orjson.dumps(forbidden) + b',"not_found":' + orjson.dumps(not_found) + b"}",
+        media_type="application/json",
+    )
+
+
+def load_rosters(db: Session, lesson_ids, model, relationships: Tuple[str, ...]) -> Dict[str, Dict[int, list]]:
+    """{relationship: {lesson_id: [rendered rows]}} for the lessons selected by lesson_ids (a subquery)."""
+    teachers_table, students_table = ROSTER_TABLES[model]
+    user_fields = list(UserRead.model_fields)
+    rosters: Dict[str, Dict[int, list]] = {name: {} for name in relationships}
+
+    if "teachers" in relationships:
+        rows = db.execute(
+            select(teachers_table.c.lesson_id, *USER_COLUMNS)
+            .join(User, User.id == teachers_table.c.teacher_id)
+            .where(teachers_table.c.lesson_id.in_(lesson_ids))
+        )
+        for lesson_id, *user in rows:
+            rosters["teachers"].setdefault(lesson_id, []).append(dict(zip(user_fields, user)))
+
+    if "student_links" in relationships:
+        rows = db.execute(
+            select(
+                students_table.c.lesson_id,
+                students_table.c.student_id,
+                students_table.c.attendance_status,
+                students_table.c.payment_status,
+                *USER_COLUMNS,
+            )
+            .join(User, User.id == students_table.c.student_id)
+            .where(students_table.c.lesson_id.in_(lesson_ids))
+        )
+        for lesson_id, student_id, attendance_status, payment_status, *user in rows:
+            rosters["student_links"].setdefault(lesson_id, []).append({
+                "lesson_id": lesson_id,
+                "student_id": student_id,
+                "attendance_status": attendance_status,
+                "payment_status": payment_status,
+                "student": dict(zip(user_fields, user)),
+            })
+
+    return rosters
+
+
+def sparse_lesson_list_response(
+    db: Session,
+    lesson_query: Query,
+    fieldset: LessonFieldset,
+    occurrences: List[dict] = (),
+    model=Lesson,
+) -> Response:
+    """Serve only the requested fields, read as row tuples; rosters cost one query each when included."""
+    table = model.__table__
+    columns = [
+        (table.c[name] if name in table.c else null()).label(name)
+        for name in fieldset.fields
+    ]
+    rows = lesson_query.with_entities(model.id, model.date, model.time, *columns).all()
+
+    rosters = {}
+    if fieldset.relationships and rows:
+        lesson_ids = lesson_query.with_entities(model.id).scalar_subquery()
+        rosters = load_rosters(db, lesson_ids, model, fieldset.relationships)
+
+    items = []
+    for lesson_id, lesson_date, lesson_time, *values in rows:
+        item = dict(zip(fieldset.fields, values))
+        if "duration" in item:
+            item["duration"] = float(item["duration"])  # LessonRead declares a float
+        for name in fieldset.relationships:
+            item[name] = rosters[name].get(lesson_id, [])
+        items.append(((lesson_date, lesson_time), item))
+
+    # occurrences of one series share its roster, so it is rendered once per series
+    series_rosters: Dict[int, dict] = {}
+    for occurrence in occurrences:
+        item = {name: occurrence[name] for name in fieldset.fields}
+        if "duration" in item:
+            item["duration"] = float(item["duration"])
+        if fieldset.relationships:
+            if occurrence["series_id"] not in series_rosters:
+                series_rosters[occurrence["series_id"]] = LessonRead.model_validate(occurrence, from_attributes=True).model_dump(
+                    mode="json", include=set(fieldset.relationships)
+                )
+            item.update(series_rosters[occurrence["series_id"]])
+        items.append(((occurrence["date"], occurrence["time"]), item))
+    items.sort(key=lambda item: item[0])
+
+    return Response(content=orjson.dumps([item for _, item in items]), media_type="application/json")
+
+
+def bump_lesson_versions(db: Session, lesson_ids):
+    """Invalidate cached documents for lessons whose rendered graph changed without a lesson row update.
+
+    updated_at is kept as is so the change feed still reports these as status-only changes.
+    """
+    db.execute(
+        update(Lesson)
+        .where(Lesson.id.in_(lesson_ids))
+        .values(version=Lesson.version + 1, updated_at=Lesson.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def bump_user_lesson_versions(db: Session, user_id: int):
+    # a user's name or verification state is embedded in every lesson they teach or attend
+    bump_lesson_versions(db, union(
+        select(lesson_teachers.c.lesson_id).where(lesson_teachers.c.teacher_id == user_id),
+        select(LessonStudent.lesson_id).where(LessonStudent.student_id == user_id),
+    ))
@@ -3,8 +3,11 @@ from jose import jwt
 from datetime import datetime, timedelta
 import os
 from email.message import EmailMessage
-from aiosmtplib import send
+from aiosmtplib import SMTP
 import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
@@ -12,8 +15,22 @@ EMAIL_TOKEN_EXPIRE_MINUTES = int(os.getenv("EMAIL_TOKEN_EXPIRE_MINUTES"))
 BACKEND = os.getenv("BACKEND_API_URL")
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASS = os.getenv("SMTP_PASS")
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_START_TLS = os.getenv("SMTP_START_TLS", "true").lower() == "true"
+# concurrent SMTP sessions used for bulk sends (reminders)
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
 
-async def send_verification_email_async(to_email: str, verification_link: str):
+def smtp_client() -> SMTP:
+    return SMTP(
+        hostname=SMTP_HOST,
+        port=SMTP_PORT,
+        username=SMTP_USER,
+        password=SMTP_PASS,
+        start_tls=SMTP_START_TLS,
+    )
+
+def build_verification_message(to_email: str, verification_link: str) -> EmailMessage:
     message = EmailMessage()
     message["From"] = "no-reply@yourdomain.com"
     message["To"] = to_email
@@ -23,15 +40,13 @@ async def send_verification_email_async(to_email: str, verification_link: str):
         f"Please verify your email by clicking the following link:\n{verification_link}\n\n"
         f"If you didn't sign up, please ignore this message."
     )
+    return message
 
-    await send(
-        message,
-        hostname="smtp.gmail.com",
-        port=587,
-        username="",
-        password="",
-        start_tls=True,
-    )
+async def send_verification_email_async(to_email: str, verification_link: str):
+    message = build_verification_message(to_email, verification_link)
+
+    async with smtp_client() as smtp:
+        await smtp.send_message(message)
 
 
 
@@ -46,5 +61,44 @@ def send_verification_email(to_email: str, token: str):
     # Replace print with real email sending logic.
     asyncio.run(send_verification_email_async(to_email, link))
 
+async def send_verification_emails_async(messages):
+    # one SMTP session for the whole batch instead of a connection per message
+    async with smtp_client() as smtp:
+        for message in messages:
+            try:
+                await smtp.send_message(message)
+            except Exception:
+                logger.exception("Failed to send verification email to %s", message["To"])
+
+def send_verification_emails(to_emails):
+    messages = []
+    for to_email in to_emails:
+        link = f"{BACKEND}/auth/verify-email?token={create_email_token(to_email)}"
+        messages.append(build_verification_message(to_email, link))
+    asyncio.run(send_verification_emails_async(messages))
+
+async def send_messages_pooled(messages, pool_size: int = SMTP_POOL_SIZE):
+    """Send messages over up to pool_size concurrent SMTP sessions; returns the ones that failed."""
+    queue = asyncio.Queue()
+    for message in messages:
+        queue.put_nowait(message)
+    failed = []
 
+    async def session():
+        try:
+            async with smtp_client() as smtp:
+                while not queue.empty():
+                    message = queue.get_nowait()
+                    try:
+                        await smtp.send_message(message)
+                    except Exception:
+                        logger.exception("Failed to send email to %s", message["To"])
+                        failed.append(message)
+        except Exception as exc:
+            # connection-level failure; whatever is left goes to the other sessions or is reported below
+            logger.warning("SMTP session failed: %s", exc)
 
+    await asyncio.gather(*(session() for _ in range(min(pool_size, len(messages)))))
+    while not queue.empty():
+        failed.append(queue.get_nowait())
+    return failed
@@ -0,0 +1,258 @@
+#in-process pub/sub for live lesson updates, with a pluggable cross-worker backend
+import asyncio
+import json
+import logging
+import os
+import queue
+import select
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Set
+
+
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+EVENT_BACKEND = os.getenv("EVENT_BACKEND", "memory")  # "memory" or "postgres"
+EVENT_CHANNEL = "lesson_events"
+SUBSCRIBER_QUEUE_SIZE = 100
+# events waiting for the postgres publisher thread; beyond this they are dropped (clients resync)
+PUBLISH_QUEUE_SIZE = 10000
+
+
+@dataclass(eq=False)
+class Subscription:
+    user_id: int
+    organisation_id: int
+    is_admin: bool
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE))
+    # set when events were dropped; the client should resync via /lessons/changes
+    overflowed: bool = False
+
+    def offer(self, message: dict):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class EventBus:
+    """Routes events to the subscriptions of this worker.
+
+    Publishing goes through the backend, which delivers to every worker's bus
+    (only this one for the in-memory backend).
+    """
+
+    def __init__(self, backend: "EventBackend"):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._by_user: Dict[int, Set[Subscription]] = {}
+        self._admins_by_org: Dict[int, Set[Subscription]] = {}
+
+    def subscribe(self, user_id: int, organisation_id: int, is_admin: bool) -> Subscription:
+        sub = Subscription(user_id, organisation_id, is_admin, asyncio.get_running_loop())
+        index = self._admins_by_org if is_admin else self._by_user
+        key = organisation_id if is_admin else user_id
+        with self._lock:
+            index.setdefault(key, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        index = self._admins_by_org if sub.is_admin else self._by_user
+        key = sub.organisation_id if sub.is_admin else sub.user_id
+        with self._lock:
+            subs = index.get(key)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del index[key]
+
+    def publish(
+        self,
+        event_type: str,
+        lesson_id: Optional[int],
+        organisation_id: int,
+        user_ids: Iterable[int],
+        organisation_wide: bool = False,
+    ):
+        """organisation_wide events (lesson_id None, a bulk change) go to everyone in the organisation."""
+        event = {
+            "type": event_type,
+            "lesson_id": lesson_id,
+            "organisation_id": organisation_id,
+            "user_ids": sorted(set(user_ids)),
+            "organisation_wide": organisation_wide,
+        }
+        try:
+            self.backend.publish(event)
+        except Exception:
+            # live updates are best effort; the write itself has already committed
+            logger.exception("Failed to publish %s for lesson %s", event_type, lesson_id)
+
+    def dispatch(self, event: dict):
+        """Deliver an event to matching local subscriptions. Safe to call from any thread."""
+        with self._lock:
+            targets = set(self._admins_by_org.get(event["organisation_id"], ()))
+            if event.get("organisation_wide"):
+                for subs in self._by_user.values():
+                    targets.update(sub for sub in subs if sub.organisation_id == event["organisation_id"])
+            for user_id in event["user_ids"]:
+                targets.update(self._by_user.get(user_id, ()))
+
+        message = {"type": event["type"], "lesson_id": event["lesson_id"]}
+        for sub in targets:
+            sub.loop.call_soon_threadsafe(sub.offer, message)
+
+    def start(self):
+        self.backend.start(self)
+
+    def stop(self):
+        self.backend.stop()
+
+
+class EventBackend(ABC):
+    def start(self, bus: EventBus):
+        pass
+
+    def stop(self):
+        pass
+
+    @abstractmethod
+    def publish(self, event: dict):
+        """Deliver event to every worker's bus; must not block the request for long."""
+
+
+class InMemoryBackend(EventBackend):
+    """Single-worker backend; also the stand-in used for tests."""
+
+    def __init__(self):
+        self.bus: Optional[EventBus] = None
+
+    def start(self, bus: EventBus):
+        self.bus = bus
+
+    def publish(self, event: dict):
+        if self.bus is not None:
+            self.bus.dispatch(event)
+
+
+class PostgresBackend(EventBackend):
+    """Fans events out across workers with LISTEN/NOTIFY.
+
+    NOTIFY is delivered back to the publishing worker too, so publish never
+    dispatches locally. publish only queues the event: a publisher thread sends
+    whatever is waiting as one NOTIFY statement on a connection it keeps open.
+    """
+
+    def __init__(self, channel: str = EVENT_CHANNEL, poll_interval: float = 5.0):
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._outbox: queue.Queue = queue.Queue(maxsize=PUBLISH_QUEUE_SIZE)
+        self._publisher: Optional[threading.Thread] = None
+
+    def start(self, bus: EventBus):
+        self.bus = bus
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._listen, name="lesson-events-listener", daemon=True)
+        self._thread.start()
+        self._publisher = threading.Thread(target=self._publish_loop, name="lesson-events-publisher", daemon=True)
+        self._publisher.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._publisher is not None:
+            # after the events already queued, so they still go out
+            try:
+                self._outbox.put(None, timeout=1)
+            except queue.Full:
+                pass
+            self._publisher.join(timeout=self.poll_interval + 1)
+            self._publisher = None
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+
+    def publish(self, event: dict):
+        try:
+            self._outbox.put_nowait(json.dumps(event))
+        except queue.Full:
+            logger.warning("Lesson event outbox full, dropping %s for lesson %s", event["type"], event["lesson_id"])
+
+    def _publish_loop(self):
+        conn = None
+        while True:
+            payloads = [self._outbox.get()]
+            while payloads[-1] is not None and len(payloads) < PUBLISH_QUEUE_SIZE:
+                try:
+                    payloads.append(self._outbox.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = payloads[-1] is None
+            payloads = [payload for payload in payloads if payload is not None]
+            try:
+                if payloads:
+                    if conn is None:
+                        conn = self._dedicated_connection()
+                    with conn.cursor() as cursor:
+                        cursor.execute(
+                            "SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload",
+                            (self.channel, payloads),
+                        )
+            except Exception:
+                # live updates are best effort: drop the batch and reconnect for the next one
+                logger.exception("Publishing %s lesson events failed", len(payloads))
+                if conn is not None:
+                    conn.close()
+                    conn = None
+            if stopping:
+                break
+        if conn is not None:
+            conn.close()
+
+    def _dedicated_connection(self):
+        # outside the pool and in autocommit, so each NOTIFY is sent straight away
+        raw = engine.raw_connection()
+        raw.detach()
+        conn = raw.dbapi_connection
+        conn.autocommit = True
+        return conn
+
+    def _listen(self):
+        while not self._stopping.is_set():
+            try:
+                self._listen_once()
+            except Exception:
+                logger.exception("Lesson event listener failed, reconnecting")
+                self._stopping.wait(self.poll_interval)
+
+    def _listen_once(self):
+        # held for the worker's lifetime
+        conn = self._dedicated_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+
+            while not self._stopping.is_set():
+                if select.select([conn], [], [], self.poll_interval) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    self.bus.dispatch(json.loads(notify.payload))
+        finally:
+            conn.close()
+
+
+def create_backend(name: str) -> EventBackend:
+    if name == "postgres":
+        return PostgresBackend()
+    if name == "memory":
+        return InMemoryBackend()
+    raise ValueError(f"Unknown EVENT_BACKEND: {name}")
+
+
+bus = EventBus(create_backend(EVENT_BACKEND))
@@ -1,5 +1,6 @@
-from app.database import Base, engine
-from app.models import user, lesson, associations, organisation
+from app.models import user, lesson, associations, organisation, change, invoice, archive, series, payroll, reminder, shard, audit
+from app.tenancy import prepare_shard, tenants
 
 def create_tables():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    for name in tenants.shards:
+        prepare_shard(name)
@@ -0,0 +1,246 @@
+#monthly invoice generation, done set-based inside the database
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import Date, and_, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.models.associations import LessonStudent
+from app.models.invoice import Invoice, InvoiceLine, InvoiceRun
+from app.models.lesson import Lesson
+from app.models.series import LessonSeries
+from app.series import expand_series
+from app.tenancy import OrganisationMoving, tenants
+
+logger = logging.getLogger(__name__)
+
+# rows per multi-row INSERT of occurrence lines (8 parameters each, well under the bind limit)
+INSERT_BATCH_SIZE = 1000
+
+
+def month_bounds(period_start: date) -> tuple:
+    if period_start.month == 12:
+        return period_start, date(period_start.year + 1, 1, 1)
+    return period_start, date(period_start.year, period_start.month + 1, 1)
+
+
+def billable_rows(organisation_id: int, period_start: date):
+    start, end = month_bounds(period_start)
+    # cancelled lessons are never billed
+    return and_(
+        Lesson.organisation_id == organisation_id,
+        Lesson.date >= start,
+        Lesson.date < end,
+        LessonStudent.payment_status == "unpaid",
+        LessonStudent.attendance_status != "cancelled",
+    )
+
+
+def occurrence_lines(db: Session, organisation_id: int, period_start: date) -> List[dict]:
+    """Invoice line values (less invoice_id) for series occurrences of the month that are not stored.
+
+    They still have every student assigned and unpaid, so every student is billed.
+    """
+    start, end = month_bounds(period_start)
+    occurrences = expand_series(db, [LessonSeries.organisation_id == organisation_id], start, end - timedelta(days=1))
+    return [
+        {
+            "series_id": occurrence["series_id"],
+            "occurrence_date": occurrence["occurrence_date"],
+            "student_id": link["student_id"],
+            "lesson_date": occurrence["date"],
+            "subject": occurrence["subject"],
+            "amount": occurrence["price"],
+        }
+        for occurrence in occurrences
+        for link in occurrence["student_links"]
+    ]
+
+
+def check_not_moving(organisation_id: int):
+    # a move copies the organisation once every worker has seen it as moving, so a run stops
+    # at its next commit rather than writing to the old shard after the copy
+    _, moving = tenants.placement(organisation_id)
+    if moving:
+        raise OrganisationMoving(organisation_id)
+
+
+def set_stage(db: Session, run: InvoiceRun, stage: str):
+    check_not_moving(run.organisation_id)
+    run.stage = stage
+    db.commit()
+
+
+def generate_invoices(db: Session, run: InvoiceRun):
+    """Bill every unpaid lesson-student row of the run's month.
+
+    Safe to re-run: invoices are unique per (organisation, student, month) and
+    lines per (lesson, student) and per (series occurrence, student), so rows
+    already billed are skipped and new lessons are appended to the existing
+    invoice. Series occurrences that are not stored are billed from their
+    series without storing them.
+    """
+    organisation_id, period_start = run.organisation_id, run.period_start
+    criteria = billable_rows(organisation_id, period_start)
+
+    set_stage(db, run, "occurrences")
+    virtual_lines = occurrence_lines(db, organisation_id, period_start)
+    virtual_students = sorted({line["student_id"] for line in virtual_lines})
+
+    set_stage(db, run, "invoices")
+    invoice_source = (
+        select(
+            Lesson.organisation_id,
+            LessonStudent.student_id,
+            literal(period_start, Date),
+        )
+        .join(Lesson, Lesson.id == LessonStudent.lesson_id)
+        .where(criteria)
+        .group_by(Lesson.organisation_id, LessonStudent.student_id)
+    )
+    result = db.execute(
+        pg_insert(Invoice)
+        .from_select(["organisation_id", "student_id", "period_start"], invoice_source)
+        .on_conflict_do_nothing(constraint="uq_invoices_org_student_period")
+    )
+    run.invoices_created = max(result.rowcount, 0)
+    if virtual_students:
+        result = db.execute(
+            pg_insert(Invoice)
+            .values([
+                {"organisation_id": organisation_id, "student_id": student_id, "period_start": period_start}
+                for student_id in virtual_students
+            ])
+            .on_conflict_do_nothing(constraint="uq_invoices_org_student_period")
+        )
+        run.invoices_created += max(result.rowcount, 0)
+
+    set_stage(db, run, "lines")
+    line_source = (
+        select(
+            Invoice.id,
+            LessonStudent.lesson_id,
+            Lesson.series_id,
+            Lesson.occurrence_date,
+            LessonStudent.student_id,
+            Lesson.date,
+            Lesson.subject,
+            Lesson.price,
+        )
+        .join(Lesson, Lesson.id == LessonStudent.lesson_id)
+        .join(
+            Invoice,
+            and_(
+                Invoice.organisation_id == Lesson.organisation_id,
+                Invoice.student_id == LessonStudent.student_id,
+                Invoice.period_start == period_start,
+            ),
+        )
+        .where(criteria)
+    )
+    # no conflict target: a stored occurrence may already be billed under its occurrence key
+    result = db.execute(
+        pg_insert(InvoiceLine)
+        .from_select(
+            ["invoice_id", "lesson_id", "series_id", "occurrence_date", "student_id", "lesson_date", "subject", "amount"],
+            line_source,
+        )
+        .on_conflict_do_nothing()
+    )
+    run.lines_created = max(result.rowcount, 0)
+    if virtual_lines:
+        invoice_ids = dict(db.execute(
+            select(Invoice.student_id, Invoice.id).where(
+                Invoice.organisation_id == organisation_id,
+                Invoice.period_start == period_start,
+                Invoice.student_id.in_(virtual_students),
+            )
+        ).all())
+        for start in range(0, len(virtual_lines), INSERT_BATCH_SIZE):
+            batch = virtual_lines[start:start + INSERT_BATCH_SIZE]
+            result = db.execute(
+                pg_insert(InvoiceLine)
+                .values([{**line, "invoice_id": invoice_ids[line["student_id"]]} for line in batch])
+                .on_conflict_do_nothing()
+            )
+            run.lines_created += max(result.rowcount, 0)
+
+    set_stage(db, run, "totals")
+    totals = (
+        select(
+            InvoiceLine.invoice_id,
+            func.sum(InvoiceLine.amount).label("total"),
+            func.count().label("line_count"),
+        )
+        .join(Invoice, Invoice.id == InvoiceLine.invoice_id)
+        .where(Invoice.organisation_id == organisation_id, Invoice.period_start == period_start)
+        .group_by(InvoiceLine.invoice_id)
+        .subquery()
+    )
+    db.execute(
+        update(Invoice)
+        .where(Invoice.id == totals.c.invoice_id)
+        .values(total=totals.c.total, line_count=totals.c.line_count)
+        .execution_options(synchronize_session=False)
+    )
+
+    check_not_moving(organisation_id)
+    run.status = "completed"
+    run.stage = None
+    run.finished_at = datetime.now(timezone.utc)
+    db.commit()
+
+
+def mark_run_failed(db: Optional[Session], run_id: int, organisation_id: int, exc: Exception):
+    """Record a failure on the run; retryable when running it again later can succeed (generation is idempotent)."""
+    if isinstance(exc, OrganisationMoving):
+        error = "Organisation is being moved, try again shortly"
+    else:
+        error = str(exc)[:500]
+    try:
+        # session_for refuses a moving organisation, but its run stays on the old shard until the copy
+        session = db if db is not None else tenants.session(tenants.placement(organisation_id)[0])
+        try:
+            session.rollback()
+            session.execute(
+                update(InvoiceRun)
+                .where(InvoiceRun.id == run_id)
+                .values(
+                    status="failed",
+                    error=error,
+                    retryable=isinstance(exc, (OrganisationMoving, OperationalError)),
+                    finished_at=datetime.now(timezone.utc),
+                )
+            )
+            session.commit()
+        finally:
+            if session is not db:
+                session.close()
+    except Exception:
+        logger.exception("Could not mark invoice run %s as failed", run_id)
+
+
+def run_invoice_generation(run_id: int, organisation_id: int):
+    """Background task entry point: owns its session (on the organisation's shard).
+
+    Never raises; failures are recorded on the run for GET /invoices/runs/{id}.
+    """
+    db = None
+    try:
+        db = tenants.session_for(organisation_id)
+        run = db.query(InvoiceRun).filter(InvoiceRun.id == run_id).first()
+        if run is None:
+            return
+        run.status = "running"
+        db.commit()
+        generate_invoices(db, run)
+    except Exception as exc:
+        if not isinstance(exc, OrganisationMoving):
+            logger.exception("Invoice run %s failed", run_id)
+        mark_run_failed(db, run_id, organisation_id, exc)
+    finally:
+        if db is not None:
+            db.close()
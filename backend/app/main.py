@@ -1,11 +1,17 @@
 from fastapi import FastAPI
 from app.api import routes
 # from app.database import Base, engine
-from app.api.routes import user, lesson, auth
+from app.api.routes import user, lesson, auth, events, invoice, series, payroll, audit, profiles
 
 # from app.models import user, lesson, associations, organisation
 from contextlib import asynccontextmanager
 from app.init_db import create_tables
+from app.events import bus
+from app.user_import import shutdown_hash_pool
+from app.compression import CompressionMiddleware
+from app.reminders import reminders
+from app.audit import audit_log
+from app.profiling import ProfilingMiddleware
 
 from fastapi.middleware.cors import CORSMiddleware
 import os
@@ -14,7 +20,15 @@ import os
 @asynccontextmanager
 async def lifespan(app : FastAPI):
     create_tables()
+    bus.start()
+    reminders.start()
+    audit_log.start()
     yield
+    # flushes the audit buffer (or spills it to the fallback file) before the pools go away
+    audit_log.stop()
+    reminders.stop()
+    bus.stop()
+    shutdown_hash_pool()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -30,14 +44,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],    # Allow all HTTP methods (GET, POST, etc)
     allow_headers=["*"],    # Allow all headers
+    expose_headers=["X-Profile-Id"],  # so the frontend can link to a profile it asked for
 )
 
+# gzip/brotli for large bodies (lesson lists, exports); small responses go out as is
+app.add_middleware(CompressionMiddleware)
+
+# outermost, so a profile covers the whole request including compression (see app.profiling)
+app.add_middleware(ProfilingMiddleware)
+
 
 
 #TODO Include routes
 app.include_router(user.router, prefix="/users", tags=["Users"])
 app.include_router(lesson.router, prefix="/lessons", tags=["Lessons"])
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
+app.include_router(events.router, prefix="/events", tags=["Events"])
+app.include_router(invoice.router, prefix="/invoices", tags=["Invoices"])
+app.include_router(series.router, prefix="/lesson-series", tags=["Lesson Series"])
+app.include_router(payroll.router, prefix="/payroll", tags=["Payroll"])
+app.include_router(audit.router, prefix="/audit", tags=["Audit"])
+app.include_router(profiles.router, prefix="/profiles", tags=["Profiles"])
 
 
 #TODO: INDCLUDE CORS CHECKING 
\ No newline at end of file
@@ -0,0 +1,84 @@
+from sqlalchemy import DDL, Column, Date, DateTime, Index, Integer, String, Table, Time, event, func
+from sqlalchemy.orm import relationship
+from app.database import Base
+from app.models.associations import attendance_status_enum, payment_status_enum
+
+# Cold storage for closed terms. Rows are moved here from lessons / lesson_teachers /
+# lesson_students by app.archive, keeping their ids. Each table is range-partitioned
+# by lesson date (one partition per year, created on demand) and has no foreign keys,
+# so archived history never constrains the hot tables.
+
+archive_lesson_teachers = Table(
+    "archive_lesson_teachers",
+    Base.metadata,
+    Column("lesson_id", Integer, primary_key=True),
+    Column("lesson_date", Date, primary_key=True),
+    Column("teacher_id", Integer, primary_key=True),
+    Index("ix_archive_lesson_teachers_teacher_id", "teacher_id"),
+    postgresql_partition_by="RANGE (lesson_date)",
+)
+
+
+class ArchivedLesson(Base):
+    __tablename__ = "archive_lessons"
+    __table_args__ = (
+        Index("ix_archive_lessons_org_date", "organisation_id", "date"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
+
+    # the partition key has to be part of the primary key
+    id = Column(Integer, primary_key=True)
+    date = Column(Date, primary_key=True)
+    time = Column(Time, nullable=False)
+    subject = Column(String, nullable=False)
+    duration = Column(Integer, nullable=False)
+    location = Column(String, nullable=False)
+    price = Column(Integer, nullable=False)
+    organisation_id = Column(Integer, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+    archived_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    teachers = relationship(
+        "User",
+        secondary=archive_lesson_teachers,
+        primaryjoin="and_(ArchivedLesson.id == archive_lesson_teachers.c.lesson_id, "
+                    "ArchivedLesson.date == archive_lesson_teachers.c.lesson_date)",
+        secondaryjoin="User.id == archive_lesson_teachers.c.teacher_id",
+        viewonly=True,
+    )
+
+    student_links = relationship(
+        "ArchivedLessonStudent",
+        primaryjoin="and_(ArchivedLesson.id == foreign(ArchivedLessonStudent.lesson_id), "
+                    "ArchivedLesson.date == foreign(ArchivedLessonStudent.lesson_date))",
+        viewonly=True,
+    )
+
+
+class ArchivedLessonStudent(Base):
+    __tablename__ = "archive_lesson_students"
+    __table_args__ = (
+        Index("ix_archive_lesson_students_student_id", "student_id"),
+        {"postgresql_partition_by": "RANGE (lesson_date)"},
+    )
+
+    lesson_id = Column(Integer, primary_key=True)
+    lesson_date = Column(Date, primary_key=True)
+    student_id = Column(Integer, primary_key=True)
+
+    attendance_status = Column(attendance_status_enum, nullable=False)
+    payment_status = Column(payment_status_enum, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+    student = relationship("User", primaryjoin="User.id == foreign(ArchivedLessonStudent.student_id)", viewonly=True)
+
+
+ARCHIVE_TABLES = ("archive_lessons", "archive_lesson_teachers", "archive_lesson_students")
+
+# rows outside any yearly partition land in the default one instead of failing
+for _table in (ArchivedLesson.__table__, archive_lesson_teachers, ArchivedLessonStudent.__table__):
+    event.listen(
+        _table,
+        "after_create",
+        DDL(f"CREATE TABLE IF NOT EXISTS {_table.name}_default PARTITION OF {_table.name} DEFAULT").execute_if(dialect="postgresql"),
+    )
@@ -1,22 +1,47 @@
-from sqlalchemy import Table, Column, Integer, ForeignKey, String
+from sqlalchemy import Table, Column, Enum, Index, Integer, ForeignKey, DateTime, func, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 
+# native enums: 4 bytes per value instead of repeated text, same strings in Python and the API
+# (keep in sync with AttendanceStatus / PaymentStatus in app/schemas/lesson.py)
+attendance_status_enum = Enum("assigned", "attended", "missed", "cancelled", name="attendance_status")
+payment_status_enum = Enum("unpaid", "paid", name="payment_status")
+
 lesson_teachers = Table(
     "lesson_teachers",
     Base.metadata,
     Column("lesson_id", Integer, ForeignKey("lessons.id")),
-    Column("teacher_id", Integer, ForeignKey("users.id"))
+    Column("teacher_id", Integer, ForeignKey("users.id")),
+    Index("ix_lesson_teachers_teacher_id", "teacher_id"),
+    # the table has no primary key; this serves roster loads and membership checks (app.access)
+    Index("ix_lesson_teachers_lesson_id_teacher_id", "lesson_id", "teacher_id"),
 )
 
 class LessonStudent(Base):
     __tablename__ = "lesson_students"
+    __table_args__ = (
+        # the primary key leads with lesson_id, so per-student lookups need their own index
+        Index("ix_lesson_students_student_id", "student_id"),
+        # partial indexes only hold the rows the hot billing / attendance queries look for
+        Index(
+            "ix_lesson_students_unpaid",
+            "student_id",
+            "lesson_id",
+            postgresql_where=text("payment_status = 'unpaid'"),
+        ),
+        Index(
+            "ix_lesson_students_assigned",
+            "lesson_id",
+            postgresql_where=text("attendance_status = 'assigned'"),
+        ),
+    )
 
     lesson_id = Column(Integer, ForeignKey("lessons.id"), primary_key=True)
     student_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
 
-    attendance_status = Column(String, nullable=False, default="assigned")
-    payment_status = Column(String, nullable=False, default="unpaid")
+    attendance_status = Column(attendance_status_enum, nullable=False, default="assigned")
+    payment_status = Column(payment_status_enum, nullable=False, default="unpaid")
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now(), index=True)
 
     lesson = relationship("Lesson", back_populates="student_links")
     student = relationship("User", back_populates="lesson_links")
@@ -0,0 +1,41 @@
+from sqlalchemy import DDL, JSON, Column, DateTime, ForeignKey, Index, Integer, String, event
+from app.database import Base
+
+# Who changed what on a lesson, written in batches by app.audit. Rows are only ever
+# inserted; actor, lesson and student ids carry no foreign keys so the trail outlives them.
+# changes maps each field to [before, after] (before is null on create, after on delete).
+# lesson_id is null for an event covering many lessons at once (a term rollover).
+class AuditEvent(Base):
+    __tablename__ = "audit_events"
+    __table_args__ = (
+        Index("ix_audit_events_org_occurred", "organisation_id", "occurred_at", "id"),
+        Index("ix_audit_events_org_lesson_occurred", "organisation_id", "lesson_id", "occurred_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    organisation_id = Column(Integer, ForeignKey("organisations.id"), nullable=False)
+    actor_id = Column(Integer, nullable=True)
+    action = Column(String, nullable=False)
+    lesson_id = Column(Integer, nullable=True)
+    student_id = Column(Integer, nullable=True)
+    changes = Column(JSON, nullable=False)
+    # when the change was made, not when the buffer reached the database
+    occurred_at = Column(DateTime(timezone=True), nullable=False)
+
+
+AUDIT_EVENTS_IMMUTABLE = """
+CREATE OR REPLACE FUNCTION audit_events_immutable() RETURNS trigger AS $$
+BEGIN
+    RAISE EXCEPTION 'audit_events rows cannot be updated';
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER audit_events_no_update BEFORE UPDATE ON audit_events
+FOR EACH ROW EXECUTE FUNCTION audit_events_immutable();
+"""
+
+event.listen(
+    AuditEvent.__table__,
+    "after_create",
+    DDL(AUDIT_EVENTS_IMMUTABLE).execute_if(dialect="postgresql"),
+)
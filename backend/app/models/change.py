@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Index, Integer, func
+from app.database import Base
+
+# A lesson that disappeared from someone's view (deleted, or the user was removed from it).
+# user_id is NULL for the organisation-wide row that admins sync against.
+class LessonTombstone(Base):
+    __tablename__ = "lesson_tombstones"
+    __table_args__ = (
+        Index("ix_lesson_tombstones_org_user_deleted", "organisation_id", "user_id", "deleted_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    lesson_id = Column(Integer, nullable=False)
+    organisation_id = Column(Integer, ForeignKey("organisations.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    deleted_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+# A series, or one occurrence of it (occurrence_date set), that disappeared. Occurrences that were
+# never stored have no lesson id, so clients drop them by series_id / (series_id, occurrence_date).
+class LessonSeriesTombstone(Base):
+    __tablename__ = "lesson_series_tombstones"
+    __table_args__ = (
+        Index("ix_lesson_series_tombstones_org_user_deleted", "organisation_id", "user_id", "deleted_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    series_id = Column(Integer, nullable=False)
+    occurrence_date = Column(Date, nullable=True)
+    organisation_id = Column(Integer, ForeignKey("organisations.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    deleted_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
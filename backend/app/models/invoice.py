@@ -0,0 +1,64 @@
+from sqlalchemy import Boolean, CheckConstraint, Column, Date, DateTime, ForeignKey, Integer, String, UniqueConstraint, false, func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class Invoice(Base):
+    __tablename__ = "invoices"
+    __table_args__ = (
+        # one invoice per student per billing month; generation relies on this for idempotency
+        UniqueConstraint("organisation_id", "student_id", "period_start", name="uq_invoices_org_student_period"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    organisation_id = Column(Integer, ForeignKey("organisations.id"), nullable=False)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    period_start = Column(Date, nullable=False)
+    total = Column(Integer, nullable=False, default=0, server_default="0")
+    line_count = Column(Integer, nullable=False, default=0, server_default="0")
+    status = Column(String, nullable=False, default="draft", server_default="draft")
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    organisation = relationship("Organisation", back_populates="invoices")
+    student = relationship("User")
+    lines = relationship("InvoiceLine", back_populates="invoice", cascade="all, delete-orphan")
+
+
+class InvoiceLine(Base):
+    __tablename__ = "invoice_lines"
+    __table_args__ = (
+        # a lesson-student row is billed at most once; a series occurrence once per student whether
+        # it was billed before or after being stored (lines of stored occurrences carry both keys)
+        UniqueConstraint("lesson_id", "student_id", name="uq_invoice_lines_lesson_student"),
+        UniqueConstraint("series_id", "occurrence_date", "student_id", name="uq_invoice_lines_occurrence_student"),
+        CheckConstraint("lesson_id IS NOT NULL OR series_id IS NOT NULL", name="ck_invoice_lines_lesson_or_series"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    invoice_id = Column(Integer, ForeignKey("invoices.id", ondelete="CASCADE"), nullable=False, index=True)
+    # no FKs: invoices must survive the lesson or series being deleted later
+    lesson_id = Column(Integer, nullable=True)
+    series_id = Column(Integer, nullable=True)
+    occurrence_date = Column(Date, nullable=True)
+    student_id = Column(Integer, nullable=False)
+    lesson_date = Column(Date, nullable=False)
+    subject = Column(String, nullable=False)
+    amount = Column(Integer, nullable=False)
+
+    invoice = relationship("Invoice", back_populates="lines")
+
+
+class InvoiceRun(Base):
+    __tablename__ = "invoice_runs"
+
+    id = Column(Integer, primary_key=True)
+    organisation_id = Column(Integer, ForeignKey("organisations.id"), nullable=False, index=True)
+    period_start = Column(Date, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, running, completed, failed
+    stage = Column(String, nullable=True)
+    invoices_created = Column(Integer, nullable=False, default=0)
+    lines_created = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    # failed for a passing reason (organisation being moved, lost connection): start a new run later
+    retryable = Column(Boolean, nullable=False, default=False, server_default=false())
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
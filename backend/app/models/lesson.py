@@ -1,10 +1,19 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Date, Time
+from sqlalchemy import Column, ForeignKey, Index, Integer, String, Date, Time, DateTime, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.associations import lesson_teachers
 
 class Lesson(Base):
     __tablename__ = "lessons"
+    __table_args__ = (
+        Index("ix_lessons_org_date", "organisation_id", "date"),
+        # range scans on start time across organisations (reminders)
+        Index("ix_lessons_date_time", "date", "time"),
+        # at most one materialised lesson per series occurrence
+        UniqueConstraint("series_id", "occurrence_date", name="uq_lessons_series_occurrence"),
+        # finds the copies a term rollover already made (app.rollover)
+        Index("ix_lessons_copied_from_id", "copied_from_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     date = Column(Date, nullable=False)
@@ -14,6 +23,13 @@ class Lesson(Base):
     location = Column(String, nullable=False)
     price = Column(Integer, nullable=False)
     organisation_id = Column(Integer, ForeignKey("organisations.id"), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now(), index=True)
+    # bumped whenever the rendered LessonRead changes; guards cached documents (app.documents)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    series_id = Column(Integer, ForeignKey("lesson_series.id", ondelete="SET NULL"), nullable=True)
+    occurrence_date = Column(Date, nullable=True)
+    # the lesson this one was rolled over from; no foreign key, the source may be archived or deleted
+    copied_from_id = Column(Integer, nullable=True)
 
     
     organisation = relationship("Organisation", back_populates="lessons")
@@ -10,4 +10,4 @@ class Organisation(Base):
 
     users = relationship("User", back_populates="organisation", cascade="all, delete-orphan")
     lessons = relationship("Lesson", back_populates="organisation")
-    # invoices = relationship("Invoice", back_populates="organisation")
+    invoices = relationship("Invoice", back_populates="organisation")
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Integer, String, UniqueConstraint, func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class PayrollSnapshot(Base):
+    """Frozen payroll of a closed month; served instead of re-aggregating the lessons."""
+    __tablename__ = "payroll_snapshots"
+    __table_args__ = (
+        UniqueConstraint("organisation_id", "period_start", name="uq_payroll_snapshots_org_period"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    organisation_id = Column(Integer, ForeignKey("organisations.id"), nullable=False)
+    period_start = Column(Date, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    lines = relationship(
+        "PayrollSnapshotLine",
+        back_populates="snapshot",
+        cascade="all, delete-orphan",
+        order_by="PayrollSnapshotLine.teacher_name",
+    )
+
+
+class PayrollSnapshotLine(Base):
+    __tablename__ = "payroll_snapshot_lines"
+
+    id = Column(Integer, primary_key=True)
+    snapshot_id = Column(Integer, ForeignKey("payroll_snapshots.id", ondelete="CASCADE"), nullable=False, index=True)
+    # no FK and a copied name: the payroll record must outlive teacher renames and deletions
+    teacher_id = Column(Integer, nullable=False)
+    teacher_name = Column(String, nullable=False)
+    lesson_count = Column(Integer, nullable=False)
+    minutes = Column(Integer, nullable=False)
+
+    snapshot = relationship("PayrollSnapshot", back_populates="lines")
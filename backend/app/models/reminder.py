@@ -0,0 +1,30 @@
+from sqlalchemy import CheckConstraint, Column, Date, DateTime, ForeignKey, Integer, Time, UniqueConstraint, func
+from app.database import Base
+
+# Sent-marker for lesson reminders. A row is claimed (inserted) before the email goes out,
+# so however many workers run the scheduler, each participant is reminded at most once per
+# lesson start; moving the lesson to a new date/time makes it due again.
+# One-off lessons are keyed by lesson_id. Series occurrences are keyed by series_id and
+# occurrence_date whether or not they are stored, so materialising an occurrence after its
+# reminder went out doesn't send it again, and virtual occurrences are never stored for it.
+class LessonReminder(Base):
+    __tablename__ = "lesson_reminders"
+    __table_args__ = (
+        UniqueConstraint("lesson_id", "user_id", "lesson_date", "lesson_time", name="uq_lesson_reminders_lesson_user_start"),
+        UniqueConstraint(
+            "series_id", "occurrence_date", "user_id", "lesson_date", "lesson_time",
+            name="uq_lesson_reminders_occurrence_user_start",
+        ),
+        CheckConstraint("(lesson_id IS NULL) <> (series_id IS NULL)", name="ck_lesson_reminders_lesson_or_series"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), nullable=True)
+    series_id = Column(Integer, ForeignKey("lesson_series.id", ondelete="CASCADE"), nullable=True)
+    occurrence_date = Column(Date, nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    lesson_date = Column(Date, nullable=False)
+    lesson_time = Column(Time, nullable=False)
+    claimed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # NULL while the send is in flight; claims whose send failed are deleted so they are retried
+    sent_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,49 @@
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Integer, String, Table, Time, func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+series_teachers = Table(
+    "lesson_series_teachers",
+    Base.metadata,
+    Column("series_id", Integer, ForeignKey("lesson_series.id", ondelete="CASCADE"), primary_key=True),
+    Column("teacher_id", Integer, ForeignKey("users.id"), primary_key=True, index=True),
+)
+
+series_students = Table(
+    "lesson_series_students",
+    Base.metadata,
+    Column("series_id", Integer, ForeignKey("lesson_series.id", ondelete="CASCADE"), primary_key=True),
+    Column("student_id", Integer, ForeignKey("users.id"), primary_key=True, index=True),
+)
+
+
+# A recurring lesson: one occurrence every interval_weeks from start_date through end_date.
+# Occurrences are expanded on read (app.series) and only stored as Lesson rows
+# (series_id + occurrence_date) once they are overridden or get a status change, or before
+# jobs that only read stored lessons (archiving).
+class LessonSeries(Base):
+    __tablename__ = "lesson_series"
+
+    id = Column(Integer, primary_key=True)
+    organisation_id = Column(Integer, ForeignKey("organisations.id"), nullable=False, index=True)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    interval_weeks = Column(Integer, nullable=False, default=1)
+    time = Column(Time, nullable=False)
+    subject = Column(String, nullable=False)
+    duration = Column(Integer, nullable=False)
+    location = Column(String, nullable=False)
+    price = Column(Integer, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+
+    teachers = relationship("User", secondary=series_teachers)
+    students = relationship("User", secondary=series_students)
+    exdates = relationship("LessonSeriesExdate", cascade="all, delete-orphan")
+
+
+# An occurrence removed from its series
+class LessonSeriesExdate(Base):
+    __tablename__ = "lesson_series_exdates"
+
+    series_id = Column(Integer, ForeignKey("lesson_series.id", ondelete="CASCADE"), primary_key=True)
+    occurrence_date = Column(Date, primary_key=True)
@@ -0,0 +1,23 @@
+from sqlalchemy import Boolean, Column, Integer, String, false
+from app.database import Base
+
+# Directory of which shard holds each organisation. Only the default database's copy is
+# read; organisations without a row live on the default shard.
+class OrganisationShard(Base):
+    __tablename__ = "organisation_shards"
+
+    # no FK: the organisation row lives on the shard, not necessarily next to this table
+    organisation_id = Column(Integer, primary_key=True)
+    shard = Column(String, nullable=False)
+    # set while app.tenancy moves the organisation; its requests get a 503 until the move ends
+    moving = Column(Boolean, nullable=False, default=False, server_default=false())
+
+
+# Every user's email and organisation, also only read on the default database. The primary key
+# keeps an email unique across shards, which each shard's own unique index on users can't.
+class UserEmail(Base):
+    __tablename__ = "user_emails"
+
+    email = Column(String, primary_key=True)
+    # the organisation (and so the shard) the user lives in; moves don't have to touch this
+    organisation_id = Column(Integer, nullable=True)
@@ -1,10 +1,18 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.associations import lesson_teachers
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # keyset pagination for org-scoped user search
+        Index("ix_users_org_name_id", "organisation_id", "name", "id"),
+        Index("ix_users_org_role_name_id", "organisation_id", "role", "name", "id"),
+        # trigram indexes back ILIKE '%term%' matching (requires pg_trgm)
+        Index("ix_users_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_users_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
@@ -0,0 +1,47 @@
+#opaque keyset cursors and query parameters shared by list endpoints
+import base64
+import json
+from typing import List
+
+from fastapi import HTTPException, Query
+
+# most ids one batch request may ask for; they all go into a single IN (...)
+MAX_BATCH_IDS = 500
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return values
+
+
+def escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def batch_ids(ids: List[str] = Query(..., description="ids=1,2,3 or ids=1&ids=2")) -> List[int]:
+    """Requested ids in order, without duplicates."""
+    try:
+        values = [int(value) for part in ids for value in part.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be integers")
+
+    values = list(dict.fromkeys(values))
+    if not values:
+        raise HTTPException(status_code=400, detail="No ids given")
+    if len(values) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+
+    return values
@@ -0,0 +1,180 @@
+#teacher payroll: one aggregate over hot and archived lessons, frozen once a month has closed
+import csv
+import io
+from datetime import date, timedelta
+from typing import Iterator, List, Optional
+
+from sqlalchemy import exists, func, select, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+
+from app.invoicing import month_bounds
+from app.models.archive import ArchivedLesson, ArchivedLessonStudent, archive_lesson_teachers
+from app.models.associations import LessonStudent, lesson_teachers
+from app.models.lesson import Lesson
+from app.models.payroll import PayrollSnapshot, PayrollSnapshotLine
+from app.models.series import LessonSeries
+from app.models.user import User
+from app.series import expand_series
+
+CSV_COLUMNS = ["teacher_id", "teacher_name", "lesson_count", "minutes", "hours"]
+
+
+def payable_lessons(organisation_id: int, start: date, end: date):
+    """(teacher_id, duration) per taught lesson in [start, end), hot and archived.
+
+    A lesson is payable when at least one of its students was not cancelled.
+    """
+    hot = (
+        select(lesson_teachers.c.teacher_id, Lesson.duration)
+        .join(Lesson, Lesson.id == lesson_teachers.c.lesson_id)
+        .where(
+            Lesson.organisation_id == organisation_id,
+            Lesson.date >= start,
+            Lesson.date < end,
+            exists().where(
+                LessonStudent.lesson_id == Lesson.id,
+                LessonStudent.attendance_status != "cancelled",
+            ),
+        )
+    )
+    archived = (
+        select(archive_lesson_teachers.c.teacher_id, ArchivedLesson.duration)
+        .join(
+            ArchivedLesson,
+            (ArchivedLesson.id == archive_lesson_teachers.c.lesson_id)
+            & (ArchivedLesson.date == archive_lesson_teachers.c.lesson_date),
+        )
+        .where(
+            ArchivedLesson.organisation_id == organisation_id,
+            ArchivedLesson.date >= start,
+            ArchivedLesson.date < end,
+            exists().where(
+                ArchivedLessonStudent.lesson_id == ArchivedLesson.id,
+                ArchivedLessonStudent.lesson_date == ArchivedLesson.date,
+                ArchivedLessonStudent.attendance_status != "cancelled",
+            ),
+        )
+    )
+    return union_all(hot, archived).subquery()
+
+
+def aggregate_payroll(db: Session, organisation_id: int, period_start: date) -> List[dict]:
+    start, end = month_bounds(period_start)
+    lessons = payable_lessons(organisation_id, start, end)
+
+    rows = db.execute(
+        select(
+            lessons.c.teacher_id,
+            func.coalesce(User.name, "Deleted user"),
+            func.count(),
+            func.sum(lessons.c.duration),
+        )
+        .outerjoin(User, User.id == lessons.c.teacher_id)
+        .group_by(lessons.c.teacher_id, User.name)
+    ).all()
+
+    lines = {
+        teacher_id: {"teacher_id": teacher_id, "teacher_name": name, "lesson_count": count, "minutes": minutes}
+        for teacher_id, name, count, minutes in rows
+    }
+
+    # occurrences not stored yet have every student assigned, so they are payable if they have students
+    occurrences = expand_series(db, [LessonSeries.organisation_id == organisation_id], start, end - timedelta(days=1))
+    for occurrence in occurrences:
+        if not occurrence["student_links"]:
+            continue
+        for teacher in occurrence["teachers"]:
+            line = lines.setdefault(
+                teacher.id,
+                {"teacher_id": teacher.id, "teacher_name": teacher.name, "lesson_count": 0, "minutes": 0},
+            )
+            line["lesson_count"] += 1
+            line["minutes"] += occurrence["duration"]
+
+    return sorted(lines.values(), key=lambda line: (line["teacher_name"], line["teacher_id"]))
+
+
+def get_snapshot(db: Session, organisation_id: int, period_start: date) -> Optional[PayrollSnapshot]:
+    return (
+        db.query(PayrollSnapshot)
+        .options(selectinload(PayrollSnapshot.lines))
+        .filter(
+            PayrollSnapshot.organisation_id == organisation_id,
+            PayrollSnapshot.period_start == period_start,
+        )
+        .first()
+    )
+
+
+def snapshot_payroll(db: Session, organisation_id: int, period_start: date, refresh: bool = False) -> PayrollSnapshot:
+    """The stored payroll of a closed month, aggregating it on first use (not committed)."""
+    snapshot = get_snapshot(db, organisation_id, period_start)
+    if snapshot is not None and not refresh:
+        return snapshot
+
+    if snapshot is not None:
+        db.delete(snapshot)
+        db.flush()
+
+    snapshot = PayrollSnapshot(
+        organisation_id=organisation_id,
+        period_start=period_start,
+        lines=[PayrollSnapshotLine(**line) for line in aggregate_payroll(db, organisation_id, period_start)],
+    )
+    try:
+        with db.begin_nested():
+            db.add(snapshot)
+    except IntegrityError:
+        # a concurrent request stored the same month first
+        return get_snapshot(db, organisation_id, period_start)
+    return snapshot
+
+
+def payroll_report(db: Session, organisation_id: int, period_start: date, refresh: bool = False) -> dict:
+    start, end = month_bounds(period_start)
+    closed = end <= date.today()
+
+    if closed:
+        snapshot = snapshot_payroll(db, organisation_id, start, refresh)
+        snapshot_at = snapshot.created_at
+        lines = [
+            {
+                "teacher_id": line.teacher_id,
+                "teacher_name": line.teacher_name,
+                "lesson_count": line.lesson_count,
+                "minutes": line.minutes,
+            }
+            for line in snapshot.lines
+        ]
+    else:
+        snapshot_at = None
+        lines = aggregate_payroll(db, organisation_id, start)
+
+    for line in lines:
+        line["hours"] = round(line["minutes"] / 60, 2)
+
+    return {
+        "period_start": start,
+        "period_end": end - timedelta(days=1),
+        "closed": closed,
+        "snapshot_at": snapshot_at,
+        "teachers": lines,
+    }
+
+
+def payroll_csv(report: dict) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+    for line in report["teachers"]:
+        writer.writerow([line[column] for column in CSV_COLUMNS])
+        yield flush()
@@ -0,0 +1,286 @@
+#opt-in profiling of single requests: an admin adds "X-Profile: 1" (or ?profile=1) and the request
+#runs under a sampling profiler with its SQL timed; the result is a speedscope file
+#(https://www.speedscope.app) kept in PROFILE_DIR and downloadable from /profiles/{id}
+#requests without the flag only pay for looking at the header and query string
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import anyio.to_thread
+import orjson
+from fastapi import HTTPException
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.models.user import User
+from app.query_budget import QueryCounter
+from app.utils import decode_access_token, tenant_session
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# oldest profiles are deleted beyond this many
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+
+PROFILE_ID = re.compile(r"[0-9a-f]{32}")
+# a thread whose innermost frame is in one of these is waiting, not working
+IDLE_FILES = ("selectors.py", "threading.py", "queue.py")
+
+# id of the profile the current request (and the threads it hands work to) belongs to
+active_profile: ContextVar[Optional[str]] = ContextVar("active_profile", default=None)
+
+
+class StackSampler:
+    """Samples the stacks of every thread each interval_ms from a thread of its own."""
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.frames: List[dict] = []
+        self._frame_index: Dict[object, int] = {}
+        # thread id -> [(frame indexes root first, seconds)]
+        self.samples: Dict[int, List[Tuple[Tuple[int, ...], float]]] = {}
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stack(self, frame) -> Optional[Tuple[int, ...]]:
+        if frame.f_code.co_filename.endswith(IDLE_FILES):
+            return None
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            index = self._frame_index.get(code)
+            if index is None:
+                index = self._frame_index[code] = len(self.frames)
+                self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+            stack.append(index)
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def _run(self):
+        me = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stopping.wait(self.interval):
+            now = time.perf_counter()
+            weight, last = now - last, now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = self._stack(frame)
+                if stack is not None:
+                    self.samples.setdefault(thread_id, []).append((stack, weight))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def speedscope(name: str, sampler: StackSampler, thread_ids: List[int], queries: QueryCounter) -> dict:
+    """A speedscope document: one sampled profile per thread the request ran on, plus its SQL as a timeline."""
+    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+    frames = list(sampler.frames)
+    profiles = []
+    for thread_id in thread_ids:
+        samples = sampler.samples.get(thread_id)
+        if not samples:
+            continue
+        weights = [round(weight * 1000, 3) for _, weight in samples]
+        profiles.append({
+            "type": "sampled",
+            "name": thread_names.get(thread_id, str(thread_id)),
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": round(sum(weights), 3),
+            "samples": [list(stack) for stack, _ in samples],
+            "weights": weights,
+        })
+
+    if queries.timings:
+        events, at = [], 0.0
+        for statement, started, seconds in sorted(queries.timings, key=lambda timing: timing[1]):
+            frames.append({"name": "SQL " + " ".join(statement.split())[:300]})
+            # statements from different threads may overlap; a timeline needs them nested
+            opened = max(started * 1000, at)
+            at = opened + seconds * 1000
+            events.append({"type": "O", "frame": len(frames) - 1, "at": round(opened, 3)})
+            events.append({"type": "C", "frame": len(frames) - 1, "at": round(at, 3)})
+        profiles.append({
+            "type": "evented",
+            "name": f"SQL ({len(queries.timings)} statements, {sum(t[2] for t in queries.timings) * 1000:.1f} ms)",
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": round(at, 3),
+            "events": events,
+        })
+
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "managementapp",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": profiles,
+    }
+
+
+class ProfileStore:
+    """Speedscope files on disk, named by organisation so admins only see their own."""
+
+    def __init__(self, directory: str = PROFILE_DIR, keep: int = PROFILE_KEEP):
+        self.directory = directory
+        self.keep = keep
+
+    def _path(self, organisation_id: Optional[int], profile_id: str) -> str:
+        return os.path.join(self.directory, f"{organisation_id}-{profile_id}.speedscope.json")
+
+    def save(self, organisation_id: Optional[int], profile_id: str, document: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(organisation_id, profile_id), "wb") as profile:
+            profile.write(orjson.dumps(document))
+
+        stored = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".speedscope.json")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in stored[:max(len(stored) - self.keep, 0)]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass  # pruned by another worker
+
+    def load(self, organisation_id: Optional[int], profile_id: str) -> Optional[bytes]:
+        if not PROFILE_ID.fullmatch(profile_id):
+            return None
+        try:
+            with open(self._path(organisation_id, profile_id), "rb") as profile:
+                return profile.read()
+        except FileNotFoundError:
+            return None
+
+    def list(self, organisation_id: Optional[int]) -> List[dict]:
+        if not os.path.isdir(self.directory):
+            return []
+        prefix = f"{organisation_id}-"
+        profiles = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(prefix) and entry.name.endswith(".speedscope.json"):
+                stat = entry.stat()
+                profiles.append({
+                    "id": entry.name[len(prefix):-len(".speedscope.json")],
+                    "created_at": datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+                    "size": stat.st_size,
+                })
+        return sorted(profiles, key=lambda profile: profile["created_at"], reverse=True)
+
+
+profiles = ProfileStore()
+
+
+def profile_requested(scope: Scope) -> bool:
+    query = scope["query_string"]
+    if b"profile" in query and b"profile=1" in query.split(b"&"):
+        return True
+    return any(name == b"x-profile" and value.strip() == b"1" for name, value in scope["headers"])
+
+
+def profiling_admin(scope: Scope) -> Optional[Tuple[int, Optional[int]]]:
+    """(user id, organisation id) when the request comes from an admin, else None."""
+    scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = decode_access_token(token)
+        user_id = int(payload.get("sub", 0))
+    except (HTTPException, TypeError, ValueError):
+        return None
+    # any failure here (an organisation being moved, an unreachable shard) leaves the request unprofiled;
+    # the request itself then runs into it and answers as it would have anyway
+    try:
+        db = tenant_session(payload.get("org"))
+    except Exception:
+        return None
+    try:
+        user = db.get(User, user_id)
+        if user is None or user.role != "admin":
+            return None
+        return user.id, user.organisation_id
+    except Exception:
+        return None
+    finally:
+        db.close()
+
+
+class ProfilingMiddleware:
+    """Profiles flagged admin requests, one at a time per worker; the rest pass straight through.
+
+    The response carries X-Profile-Id, and the profile is stored before the
+    last body chunk goes out, so it can be downloaded as soon as the response
+    has arrived. A flag from anyone else, or while another profile runs, is ignored.
+    """
+
+    def __init__(self, app: ASGIApp, store: ProfileStore = profiles):
+        self.app = app
+        self.store = store
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        admin = await anyio.to_thread.run_sync(profiling_admin, scope)
+        if admin is None or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send, admin[1])
+        finally:
+            self._busy.release()
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send, organisation_id: Optional[int]):
+        profile_id = uuid.uuid4().hex
+        last_body: List[Message] = []
+
+        async def send_with_id(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                last_body.append(message)
+                return
+            await send(message)
+
+        token = active_profile.set(profile_id)
+        sampler = StackSampler()
+        queries = QueryCounter(Engine, include=lambda: active_profile.get() == profile_id)
+        started = time.perf_counter()
+        try:
+            with queries:
+                sampler.start()
+                try:
+                    await self.app(scope, receive, send_with_id)
+                finally:
+                    sampler.stop()
+        finally:
+            active_profile.reset(token)
+
+        elapsed = time.perf_counter() - started
+        target = scope["path"] + ("?" + scope["query_string"].decode("latin-1") if scope["query_string"] else "")
+        name = f"{scope['method']} {target} ({elapsed * 1000:.0f} ms)"
+        # this thread (the event loop) plus the pool threads the request's SQL ran on
+        thread_ids = [threading.get_ident(), *sorted(queries.thread_ids - {threading.get_ident()})]
+        document = speedscope(name, sampler, thread_ids, queries)
+        await anyio.to_thread.run_sync(self.store.save, organisation_id, profile_id, document)
+
+        for message in last_body:
+            await send(message)
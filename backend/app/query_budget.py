@@ -0,0 +1,69 @@
+#counts the SQL statements an engine executes, for query budgets and profiling
+import threading
+import time
+from typing import Callable, List, Optional, Set, Tuple, Type, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    """Records every statement sent to the database while active.
+
+        with QueryCounter(engine) as queries:
+            client.get("/lessons/")
+        queries.check(6, "GET /lessons/")
+
+    Pass the Engine class to watch every engine (all shards). include, when
+    given, is asked before each statement and skips those it returns False for.
+    """
+
+    def __init__(self, engine: Union[Engine, Type[Engine]], include: Optional[Callable[[], bool]] = None):
+        self.engine = engine
+        self.include = include
+        self.statements: List[str] = []
+        # (statement, started, seconds), started relative to __enter__
+        self.timings: List[Tuple[str, float, float]] = []
+        # threads the recorded statements ran on
+        self.thread_ids: Set[int] = set()
+        self.started = 0.0
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.include is not None and not self.include():
+            return
+        self.statements.append(statement)
+        self.thread_ids.add(threading.get_ident())
+        context.__dict__.setdefault("query_counters", {})[self] = time.perf_counter()
+
+    def _finish(self, conn, cursor, statement, parameters, context, executemany):
+        started = context.__dict__.get("query_counters", {}).pop(self, None)
+        if started is not None:
+            self.timings.append((statement, started - self.started, time.perf_counter() - started))
+
+    def __enter__(self) -> "QueryCounter":
+        self.statements, self.timings, self.thread_ids = [], [], set()
+        self.started = time.perf_counter()
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        event.listen(self.engine, "after_cursor_execute", self._finish)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+        event.remove(self.engine, "after_cursor_execute", self._finish)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def report(self) -> str:
+        return "\n".join(f"  {index}. {' '.join(statement.split())}" for index, statement in enumerate(self.statements, 1))
+
+    def check(self, budget: int, label: Optional[str] = None):
+        if self.count > budget:
+            raise QueryBudgetExceeded(
+                f"{label or 'block'} ran {self.count} statements (budget {budget}):\n{self.report()}"
+            )
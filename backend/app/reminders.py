@@ -0,0 +1,271 @@
+#lesson reminders: claim sent-markers in the database, then fan out through the pooled SMTP sender
+import asyncio
+import logging
+import os
+import threading
+from datetime import date, datetime, time, timedelta
+from email.message import EmailMessage
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import and_, delete, exists, func, or_, select, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.email import send_messages_pooled
+from app.models.associations import LessonStudent, lesson_teachers
+from app.models.lesson import Lesson
+from app.models.reminder import LessonReminder
+from app.models.user import User
+from app.series import expand_series
+from app.tenancy import tenants
+
+logger = logging.getLogger(__name__)
+
+REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "false").lower() == "true"
+# how long before a lesson starts its participants are reminded
+REMINDER_LEAD = timedelta(minutes=int(os.getenv("REMINDER_LEAD_MINUTES", "1440")))
+REMINDER_INTERVAL_SECONDS = int(os.getenv("REMINDER_INTERVAL_SECONDS", "60"))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+
+
+class Recipient(NamedTuple):
+    lesson_id: Optional[int]
+    series_id: Optional[int]
+    occurrence_date: Optional[date]
+    date: date
+    time: time
+    subject: str
+    location: str
+    user_id: int
+    name: str
+    email: str
+
+
+def reminder_key(lesson_id: Optional[int], series_id: Optional[int], occurrence_date: Optional[date], user_id: int) -> tuple:
+    # series occurrences are one reminder whether stored or virtual, one-off lessons go by id
+    if series_id is not None:
+        return ("occurrence", series_id, occurrence_date, user_id)
+    return ("lesson", lesson_id, user_id)
+
+
+def due_stored_recipients(db: Session, start: datetime, end: datetime, limit: int) -> List[Recipient]:
+    starts_at = tuple_(Lesson.date, Lesson.time)
+    in_window = and_(starts_at >= (start.date(), start.time()), starts_at < (end.date(), end.time()))
+    columns = (
+        Lesson.id.label("lesson_id"),
+        Lesson.series_id,
+        Lesson.occurrence_date,
+        Lesson.date,
+        Lesson.time,
+        Lesson.subject,
+        Lesson.location,
+        User.id.label("user_id"),
+        User.name,
+        User.email,
+    )
+
+    teachers = (
+        select(*columns)
+        .join(lesson_teachers, lesson_teachers.c.lesson_id == Lesson.id)
+        .join(User, User.id == lesson_teachers.c.teacher_id)
+        .where(in_window, User.is_verified)
+    )
+    students = (
+        select(*columns)
+        .join(LessonStudent, LessonStudent.lesson_id == Lesson.id)
+        .join(User, User.id == LessonStudent.student_id)
+        .where(in_window, User.is_verified, LessonStudent.attendance_status != "cancelled")
+    )
+    recipients = union_all(teachers, students).subquery()
+
+    claimed = exists().where(
+        LessonReminder.user_id == recipients.c.user_id,
+        LessonReminder.lesson_date == recipients.c.date,
+        LessonReminder.lesson_time == recipients.c.time,
+        or_(
+            and_(recipients.c.series_id.is_(None), LessonReminder.lesson_id == recipients.c.lesson_id),
+            and_(
+                LessonReminder.series_id == recipients.c.series_id,
+                LessonReminder.occurrence_date == recipients.c.occurrence_date,
+            ),
+        ),
+    )
+    rows = db.execute(
+        select(recipients)
+        .where(~claimed)
+        .order_by(recipients.c.date, recipients.c.time, recipients.c.lesson_id, recipients.c.user_id)
+        .limit(limit)
+    ).mappings()
+    return [Recipient(**row) for row in rows]
+
+
+def due_virtual_recipients(db: Session, start: datetime, end: datetime) -> List[Recipient]:
+    """Participants of series occurrences in [start, end) that are not stored, read off the series itself."""
+    occurrences = [
+        occurrence
+        for occurrence in expand_series(db, [], start.date(), end.date())
+        if start <= datetime.combine(occurrence["date"], occurrence["time"]) < end
+    ]
+    if not occurrences:
+        return []
+
+    claimed = {
+        reminder_key(None, *row[:3]) + tuple(row[3:])
+        for row in db.execute(
+            select(
+                LessonReminder.series_id, LessonReminder.occurrence_date, LessonReminder.user_id,
+                LessonReminder.lesson_date, LessonReminder.lesson_time,
+            ).where(
+                LessonReminder.series_id.in_({occurrence["series_id"] for occurrence in occurrences}),
+                LessonReminder.occurrence_date.between(start.date(), end.date()),
+            )
+        )
+    }
+
+    recipients = []
+    for occurrence in occurrences:
+        # a virtual occurrence has every student assigned, so nobody is cancelled
+        participants = list(occurrence["teachers"]) + [link["student"] for link in occurrence["student_links"]]
+        for user in participants:
+            key = reminder_key(None, occurrence["series_id"], occurrence["occurrence_date"], user.id)
+            if user.is_verified and key + (occurrence["date"], occurrence["time"]) not in claimed:
+                recipients.append(Recipient(
+                    None, occurrence["series_id"], occurrence["occurrence_date"], occurrence["date"],
+                    occurrence["time"], occurrence["subject"], occurrence["location"], user.id, user.name, user.email,
+                ))
+    return recipients
+
+
+def due_recipients(db: Session, start: datetime, end: datetime, limit: int) -> List[Recipient]:
+    """Unclaimed (lesson or occurrence, participant) pairs starting in [start, end), at most limit.
+
+    Lesson date/time are local wall-clock values, so start and end are naive too.
+    Series occurrences that are not stored are expanded from their series, not materialised.
+    """
+    recipients = due_stored_recipients(db, start, end, limit) + due_virtual_recipients(db, start, end)
+    recipients.sort(key=lambda recipient: (recipient.date, recipient.time, recipient.series_id or 0, recipient.lesson_id or 0, recipient.user_id))
+    return recipients[:limit]
+
+
+def claim_reminders(db: Session, recipients: List[Recipient]) -> dict:
+    """Insert sent-markers; returns {reminder_key: reminder_id} for the rows this worker won."""
+    insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else pg_insert
+    rows = db.execute(
+        insert(LessonReminder)
+        .values([
+            {
+                "lesson_id": None if recipient.series_id is not None else recipient.lesson_id,
+                "series_id": recipient.series_id,
+                "occurrence_date": recipient.occurrence_date,
+                "user_id": recipient.user_id,
+                "lesson_date": recipient.date,
+                "lesson_time": recipient.time,
+            }
+            for recipient in recipients
+        ])
+        # no conflict target: one-off lessons and occurrences have a unique constraint each
+        .on_conflict_do_nothing()
+        .returning(
+            LessonReminder.id, LessonReminder.lesson_id, LessonReminder.series_id,
+            LessonReminder.occurrence_date, LessonReminder.user_id,
+        )
+    ).all()
+    return {reminder_key(*row[1:]): row[0] for row in rows}
+
+
+def build_reminder_message(recipient) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = "no-reply@yourdomain.com"
+    message["To"] = recipient.email
+    message["Subject"] = f"Reminder: {recipient.subject} on {recipient.date:%a %d %b} at {recipient.time:%H:%M}"
+    message.set_content(
+        f"Hi {recipient.name},\n\n"
+        f"This is a reminder of your {recipient.subject} lesson on "
+        f"{recipient.date:%A %d %B} at {recipient.time:%H:%M} in {recipient.location}.\n"
+    )
+    return message
+
+
+def dispatch_due_reminders(db: Session, now: Optional[datetime] = None, sender=send_messages_pooled) -> dict:
+    """Send every reminder due in the next REMINDER_LEAD, batch by batch, series occurrences included.
+
+    Claims are committed before sending, so a crash mid-send can drop a reminder
+    but never repeats one. Failed sends release their claim and are retried on
+    the next pass.
+    """
+    now = now or datetime.now()
+    sent = failed = 0
+
+    while True:
+        recipients = due_recipients(db, now, now + REMINDER_LEAD, REMINDER_BATCH_SIZE)
+        if not recipients:
+            break
+
+        claims = claim_reminders(db, recipients)
+        db.commit()
+
+        # rows another worker claimed between our select and insert are theirs to send
+        keys = [reminder_key(recipient.lesson_id, recipient.series_id, recipient.occurrence_date, recipient.user_id) for recipient in recipients]
+        batch = [
+            (claims[key], build_reminder_message(recipient))
+            for key, recipient in zip(keys, recipients)
+            if key in claims
+        ]
+        failed_messages = {id(message) for message in asyncio.run(sender([message for _, message in batch]))}
+
+        sent_ids = [reminder_id for reminder_id, message in batch if id(message) not in failed_messages]
+        failed_ids = [reminder_id for reminder_id, message in batch if id(message) in failed_messages]
+        if sent_ids:
+            db.execute(update(LessonReminder).where(LessonReminder.id.in_(sent_ids)).values(sent_at=func.now()))
+        if failed_ids:
+            db.execute(delete(LessonReminder).where(LessonReminder.id.in_(failed_ids)))
+        db.commit()
+
+        sent += len(sent_ids)
+        failed += len(failed_ids)
+        if failed_ids:
+            # leave retries to the next pass instead of hammering a failing server
+            break
+
+    return {"sent": sent, "failed": failed}
+
+
+class ReminderScheduler:
+    """Runs dispatch_due_reminders on every shard each interval, on a background thread of each worker."""
+
+    def __init__(self, interval: float = REMINDER_INTERVAL_SECONDS):
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if not REMINDERS_ENABLED:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="lesson-reminders", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.is_set():
+            for shard in tenants.shards:
+                db = tenants.session(shard)
+                try:
+                    result = dispatch_due_reminders(db)
+                    if result["sent"] or result["failed"]:
+                        logger.info("Lesson reminders on %s: %s sent, %s failed", shard, result["sent"], result["failed"])
+                except Exception:
+                    logger.exception("Lesson reminder pass on %s failed", shard)
+                    db.rollback()
+                finally:
+                    db.close()
+            self._stopping.wait(self.interval)
+
+
+reminders = ReminderScheduler()
@@ -0,0 +1,202 @@
+#term rollover: copies an organisation's timetable from one date range into another with
+#set-based INSERT ... SELECT statements, so no lesson passes through Python
+from datetime import date, timedelta
+
+from sqlalchemy import Date, Integer, and_, case, cast, column, exists, func, literal, or_, select, values
+from sqlalchemy.orm import Session
+
+from app.models.associations import LessonStudent, attendance_status_enum, lesson_teachers, payment_status_enum
+from app.models.lesson import Lesson
+from app.models.organisation import Organisation
+from app.models.series import LessonSeries, series_students, series_teachers
+from app.series import expand_series
+
+# how many conflicting lessons a rollover lists (all of them are counted)
+CONFLICT_SAMPLE_SIZE = 100
+
+LESSON_COLUMNS = ["time", "subject", "duration", "location", "price", "organisation_id"]
+
+
+def shifted_date(column, days: int, dialect: str):
+    # sqlite keeps dates as text, postgres adds days to a date directly
+    if dialect == "sqlite":
+        return func.date(column, f"{days:+d} days")
+    return column + days
+
+
+def minute_of_day(column, dialect: str):
+    # sqlite keeps times as text, postgres takes the epoch of a time directly
+    if dialect == "sqlite":
+        return cast(func.strftime("%H", column), Integer) * 60 + cast(func.strftime("%M", column), Integer)
+    return cast(func.extract("epoch", column), Integer) / 60
+
+
+def roll_over_lessons(
+    db: Session,
+    organisation_id: int,
+    source_start: date,
+    source_end: date,
+    target_start: date,
+    dry_run: bool = False,
+) -> dict:
+    """Copy the lessons dated source_start..source_end, moved by target_start - source_start days.
+
+    Teachers and students come along, with statuses reset to assigned / unpaid.
+    Series occurrences, stored or not, are left out and counted as skipped
+    (extend the series to carry it on). So are lessons already copied to the
+    target date by an earlier rollover, and lessons whose copy would overlap a
+    lesson or series occurrence sharing a teacher or student. Runs in the
+    caller's transaction; nothing is committed here, and nothing is written at
+    all for a dry run.
+    """
+    offset = (target_start - source_start).days
+    target_end = source_end + timedelta(days=offset)
+    dialect = db.get_bind().dialect.name
+    source = Lesson.__table__.alias("source")
+    existing = Lesson.__table__.alias("existing")
+    target_date = shifted_date(source.c.date, offset, dialect)
+    starts = minute_of_day(source.c.time, dialect)
+    ends = starts + source.c.duration
+
+    # occurrences that are not stored, of both ranges in one expansion (the ranges don't overlap)
+    occurrences = expand_series(
+        db, [LessonSeries.organisation_id == organisation_id], min(source_start, target_start), max(source_end, target_end)
+    )
+    virtual_sources = sum(source_start <= occurrence["date"] <= source_end for occurrence in occurrences)
+    booked = [
+        (occurrence["date"], minutes, minutes + occurrence["duration"], occurrence["series_id"])
+        for occurrence in occurrences
+        for minutes in [occurrence["time"].hour * 60 + occurrence["time"].minute]
+        if target_start <= occurrence["date"] <= target_end and (occurrence["teachers"] or occurrence["student_links"])
+    ]
+
+    in_range = and_(
+        source.c.organisation_id == organisation_id,
+        source.c.date >= source_start,
+        source.c.date <= source_end,
+    )
+    from_series = source.c.series_id.is_not(None)
+    already_copied = exists().where(existing.c.copied_from_id == source.c.id, existing.c.date == target_date)
+
+    source_teachers, existing_teachers = lesson_teachers.alias("source_teachers"), lesson_teachers.alias("existing_teachers")
+    source_students, existing_students = LessonStudent.__table__.alias("source_students"), LessonStudent.__table__.alias("existing_students")
+    # source sits two levels up, which auto-correlation doesn't reach
+    existing_starts = minute_of_day(existing.c.time, dialect)
+    clash = exists().where(
+        existing.c.organisation_id == organisation_id,
+        existing.c.date == target_date,
+        existing_starts < ends,
+        starts < existing_starts + existing.c.duration,
+        or_(
+            exists().where(
+                source_teachers.c.lesson_id == source.c.id,
+                existing_teachers.c.lesson_id == existing.c.id,
+                existing_teachers.c.teacher_id == source_teachers.c.teacher_id,
+            ).correlate_except(source_teachers, existing_teachers),
+            exists().where(
+                source_students.c.lesson_id == source.c.id,
+                existing_students.c.lesson_id == existing.c.id,
+                existing_students.c.student_id == source_students.c.student_id,
+            ).correlate_except(source_students, existing_students),
+        ),
+    )
+    # occurrences in the target range that are not stored are booked too
+    if booked:
+        booking = values(
+            column("date", Date), column("starts", Integer), column("ends", Integer), column("series_id", Integer),
+            name="booking",
+        ).data(booked).cte("booking", nesting=True)
+        clash = or_(clash, exists().where(
+            booking.c.date == target_date,
+            booking.c.starts < ends,
+            starts < booking.c.ends,
+            or_(
+                exists().where(
+                    source_teachers.c.lesson_id == source.c.id,
+                    series_teachers.c.series_id == booking.c.series_id,
+                    series_teachers.c.teacher_id == source_teachers.c.teacher_id,
+                ).correlate_except(source_teachers, series_teachers),
+                exists().where(
+                    source_students.c.lesson_id == source.c.id,
+                    series_students.c.series_id == booking.c.series_id,
+                    series_students.c.student_id == source_students.c.student_id,
+                ).correlate_except(source_students, series_students),
+            ),
+        ))
+    copyable = and_(in_range, ~from_series, ~already_copied, ~clash)
+
+    # one rollover per organisation at a time (a no-op on sqlite, which serialises writers anyway)
+    db.execute(select(Organisation.id).where(Organisation.id == organisation_id).with_for_update())
+
+    counts = db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(case((from_series, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((and_(~from_series, already_copied), 1), else_=0)), 0),
+            func.coalesce(func.sum(case((and_(~from_series, ~already_copied, clash), 1), else_=0)), 0),
+        ).select_from(source).where(in_range)
+    ).one()
+    conflicts = db.execute(
+        select(source.c.id.label("lesson_id"), target_date.label("date"), source.c.time)
+        .where(in_range, ~from_series, ~already_copied, clash)
+        .order_by(source.c.date, source.c.time, source.c.id)
+        .limit(CONFLICT_SAMPLE_SIZE)
+    ).mappings().all()
+
+    result = {
+        "dry_run": dry_run,
+        "offset_days": offset,
+        "source_lessons": counts[0] + virtual_sources,
+        "skipped_series_lessons": counts[1] + virtual_sources,
+        "skipped_already_copied": counts[2],
+        "conflict_count": counts[3],
+        "conflicts": [dict(conflict) for conflict in conflicts],
+    }
+    copies = counts[0] - counts[1] - counts[2] - counts[3]
+
+    if dry_run:
+        students = db.execute(
+            select(func.count()).select_from(LessonStudent.__table__.join(source, source.c.id == LessonStudent.lesson_id)).where(copyable)
+        ).scalar()
+        teachers = db.execute(
+            select(func.count()).select_from(lesson_teachers.join(source, source.c.id == lesson_teachers.c.lesson_id)).where(copyable)
+        ).scalar()
+        return {**result, "lessons": copies, "lesson_teachers": teachers, "lesson_students": students}
+
+    # copies get ids above this, which tells them apart from earlier rollovers into the same range
+    last_id = db.execute(select(func.coalesce(func.max(Lesson.id), 0))).scalar()
+
+    lessons = db.execute(
+        Lesson.__table__.insert().from_select(
+            ["date", *LESSON_COLUMNS, "copied_from_id"],
+            select(target_date, *[source.c[name] for name in LESSON_COLUMNS], source.c.id).where(copyable),
+        )
+    ).rowcount
+
+    copy = Lesson.__table__.alias("copy")
+    new_copies = and_(copy.c.organisation_id == organisation_id, copy.c.id > last_id, copy.c.copied_from_id.is_not(None))
+
+    teachers = db.execute(
+        lesson_teachers.insert().from_select(
+            ["lesson_id", "teacher_id"],
+            select(copy.c.id, lesson_teachers.c.teacher_id)
+            .join(lesson_teachers, lesson_teachers.c.lesson_id == copy.c.copied_from_id)
+            .where(new_copies),
+        )
+    ).rowcount
+
+    students = db.execute(
+        LessonStudent.__table__.insert().from_select(
+            ["lesson_id", "student_id", "attendance_status", "payment_status"],
+            select(
+                copy.c.id,
+                LessonStudent.student_id,
+                literal("assigned", attendance_status_enum),
+                literal("unpaid", payment_status_enum),
+            )
+            .join(LessonStudent, LessonStudent.lesson_id == copy.c.copied_from_id)
+            .where(new_copies),
+        )
+    ).rowcount
+
+    return {**result, "lessons": lessons, "lesson_teachers": teachers, "lesson_students": students}
@@ -0,0 +1,59 @@
+#interval helpers for timetabling
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Tuple
+
+Interval = Tuple[datetime, datetime]
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def find_free_slots(
+    busy: Iterable[Interval],
+    start_date: date,
+    end_date: date,
+    day_start: time,
+    day_end: time,
+    min_length: timedelta,
+) -> List[Interval]:
+    """Maximal free windows of at least min_length inside the daily [day_start, day_end) hours.
+
+    Busy intervals are merged once and walked with a single pointer across all
+    days, so the cost is O(n log n) for the sort plus O(n + days).
+    """
+    merged = merge_intervals(busy)
+    slots: List[Interval] = []
+    i = 0
+
+    day = start_date
+    while day <= end_date:
+        window_start = datetime.combine(day, day_start)
+        window_end = datetime.combine(day, day_end)
+
+        # intervals that ended before today's window can never matter again
+        while i < len(merged) and merged[i][1] <= window_start:
+            i += 1
+
+        cursor = window_start
+        j = i
+        while j < len(merged) and merged[j][0] < window_end:
+            busy_start, busy_end = merged[j]
+            if busy_start - cursor >= min_length:
+                slots.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+            j += 1
+
+        if window_end - cursor >= min_length:
+            slots.append((cursor, window_end))
+
+        day += timedelta(days=1)
+
+    return slots
@@ -0,0 +1,21 @@
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class AuditEventRead(BaseModel):
+    id: int
+    actor_id: Optional[int]
+    action: str
+    lesson_id: Optional[int]
+    student_id: Optional[int]
+    changes: Dict[str, List[Any]]
+    occurred_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class AuditEventPage(BaseModel):
+    items: List[AuditEventRead]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,57 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+
+
+class InvoiceRunCreate(BaseModel):
+    year: int = Field(..., ge=2000, le=2100)
+    month: int = Field(..., ge=1, le=12)
+
+
+class InvoiceRunRead(BaseModel):
+    id: int
+    organisation_id: int
+    period_start: date
+    status: str
+    stage: Optional[str]
+    invoices_created: int
+    lines_created: int
+    error: Optional[str]
+    retryable: bool
+    created_at: datetime
+    finished_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+
+
+class InvoiceLineRead(BaseModel):
+    id: int
+    lesson_id: Optional[int]  # None for a series occurrence billed before it was stored
+    series_id: Optional[int]
+    occurrence_date: Optional[date]
+    student_id: int
+    lesson_date: date
+    subject: str
+    amount: int
+
+    class Config:
+        orm_mode = True
+
+
+class InvoiceRead(BaseModel):
+    id: int
+    organisation_id: int
+    student_id: int
+    period_start: date
+    total: int
+    line_count: int
+    status: str
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class InvoiceDetail(InvoiceRead):
+    lines: List[InvoiceLineRead]
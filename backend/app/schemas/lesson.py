@@ -23,7 +23,7 @@ class LessonCreate(LessonBase):
 
 
 class LessonStudentRead(BaseModel):
-    lesson_id: int
+    lesson_id: Optional[int]  # None for an occurrence of a series that is not materialised yet
     student_id: int
     attendance_status: AttendanceStatus
     payment_status: PaymentStatus
@@ -39,9 +39,109 @@ class LessonStudentUpdate(BaseModel):
 
 
 class LessonRead(LessonBase):
-    id: int
+    id: Optional[int]  # None for an occurrence of a series that is not materialised yet
+    series_id: Optional[int] = None
+    occurrence_date: Optional[date] = None
     teachers: List[UserRead]
     student_links: List[LessonStudentRead]
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class SeriesOccurrenceKey(BaseModel):
+    series_id: int
+    occurrence_date: date
+
+
+class LessonChanges(BaseModel):
+    lessons: List[LessonRead]
+    statuses: List[LessonStudentRead]
+    deleted_lesson_ids: List[int]
+    # occurrences that were never stored have no id: they go with their series, or one by one
+    deleted_series_ids: List[int]
+    deleted_occurrences: List[SeriesOccurrenceKey]
+    cursor: str
+
+
+class LessonBatch(BaseModel):
+    items: List[LessonRead]
+    forbidden: List[int]
+    not_found: List[int]
+
+
+class LessonArchiveRequest(BaseModel):
+    before: date
+
+
+class LessonArchiveResult(BaseModel):
+    lessons: int
+    lesson_teachers: int
+    lesson_students: int
+
+
+class LessonRolloverRequest(BaseModel):
+    source_start: date
+    source_end: date
+    target_start: date  # the copy of a lesson on source_start lands here
+    dry_run: bool = False
+
+
+class LessonRolloverConflict(BaseModel):
+    lesson_id: int
+    date: date  # where the copy would have gone
+    time: time
+
+
+class LessonRolloverResult(BaseModel):
+    dry_run: bool
+    offset_days: int
+    source_lessons: int
+    lessons: int
+    lesson_teachers: int
+    lesson_students: int
+    skipped_series_lessons: int
+    skipped_already_copied: int
+    conflict_count: int
+    conflicts: List[LessonRolloverConflict]
+
+
+class FreeSlotQuery(BaseModel):
+    teacher_ids: List[int] = []
+    student_ids: List[int] = []
+    start_date: date
+    end_date: date
+    duration: float  # hours, like LessonCreate.duration
+    day_start: time = time(8, 0)
+    day_end: time = time(20, 0)
+
+
+class FreeSlot(BaseModel):
+    date: date
+    start: time
+    end: time
+
+
+class LessonSeriesBase(BaseModel):
+    start_date: date
+    end_date: date
+    interval_weeks: int = 1
+    time: time
+    subject: str
+    duration: float
+    location: str
+    price: int
+    organisation_id: int
+
+
+class LessonSeriesCreate(LessonSeriesBase):
+    teacher_ids: List[int]
+    student_ids: List[int]
+
+
+class LessonSeriesRead(LessonSeriesBase):
+    id: int
+    teachers: List[UserRead]
+    students: List[UserRead]
+
+    class Config:
+        orm_mode = True
@@ -0,0 +1,19 @@
+from typing import List, Optional
+from pydantic import BaseModel
+from datetime import date, datetime
+
+
+class PayrollLine(BaseModel):
+    teacher_id: int
+    teacher_name: str
+    lesson_count: int
+    minutes: int
+    hours: float
+
+
+class PayrollReport(BaseModel):
+    period_start: date
+    period_end: date
+    closed: bool
+    snapshot_at: Optional[datetime]
+    teachers: List[PayrollLine]
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class ProfileRead(BaseModel):
+    id: str
+    created_at: datetime
+    size: int
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, EmailStr
 
 # Shared fields between Create & Read
@@ -26,3 +26,33 @@ class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
     role: Optional[str] = None
     password: Optional[str] = None
+
+# Keyset-paginated search results
+class UserSearchPage(BaseModel):
+    items: List[UserRead]
+    next_cursor: Optional[str] = None
+
+# Batch lookup: only users of the caller's organisation are returned
+class UserBatch(BaseModel):
+    items: List[UserRead]
+    forbidden: List[int]
+    not_found: List[int]
+
+# Bulk import (admin only); rows stay raw so each one is validated and reported separately
+class UserImportRow(BaseModel):
+    name: str
+    email: EmailStr
+    role: Literal["teacher", "student"]
+    password: str
+
+class UserImportRequest(BaseModel):
+    users: List[dict]
+
+class UserImportError(BaseModel):
+    row: int
+    email: Optional[str] = None
+    detail: str
+
+class UserImportResult(BaseModel):
+    created: int
+    errors: List[UserImportError]
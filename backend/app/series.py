@@ -0,0 +1,189 @@
+#expansion and materialisation of recurring lesson series
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.associations import LessonStudent
+from app.models.lesson import Lesson
+from app.models.series import LessonSeries, LessonSeriesExdate
+from app.models.user import User
+
+MAX_SERIES_DAYS = 2 * 366
+
+
+def occurrence_dates(series: LessonSeries, start: Optional[date] = None, end: Optional[date] = None) -> List[date]:
+    step = timedelta(weeks=series.interval_weeks)
+    first, last = series.start_date, series.end_date
+    if end is not None and end < last:
+        last = end
+
+    current = first
+    if start is not None and start > first:
+        # jump straight to the first occurrence on or after start
+        periods = -(-(start - first).days // step.days)
+        current = first + periods * step
+
+    dates = []
+    while current <= last:
+        dates.append(current)
+        current += step
+    return dates
+
+
+def is_occurrence(series: LessonSeries, occurrence_date: date) -> bool:
+    offset = (occurrence_date - series.start_date).days
+    return (
+        series.start_date <= occurrence_date <= series.end_date
+        and offset % (7 * series.interval_weeks) == 0
+    )
+
+
+# same visibility rules as visible_lesson_criteria, for series
+def visible_series_criteria(current_user: User) -> list:
+    criteria = [LessonSeries.organisation_id == current_user.organisation_id]
+    if current_user.role == "teacher":
+        criteria.append(LessonSeries.teachers.any(id=current_user.id))
+    elif current_user.role == "student":
+        criteria.append(LessonSeries.students.any(id=current_user.id))
+    return criteria
+
+
+def load_series(db: Session, criteria: Iterable, start: Optional[date] = None, end: Optional[date] = None) -> List[LessonSeries]:
+    query = (
+        db.query(LessonSeries)
+        .filter(*criteria)
+        .options(selectinload(LessonSeries.teachers), selectinload(LessonSeries.students))
+    )
+    if start is not None:
+        query = query.filter(LessonSeries.end_date >= start)
+    if end is not None:
+        query = query.filter(LessonSeries.start_date <= end)
+    return query.all()
+
+
+def taken_occurrences(db: Session, series_ids: List[int]) -> Dict[int, Set[date]]:
+    """Occurrence dates that must not be expanded: materialised or removed."""
+    taken: Dict[int, Set[date]] = {series_id: set() for series_id in series_ids}
+    if not series_ids:
+        return taken
+
+    rows = db.execute(
+        select(Lesson.series_id, Lesson.occurrence_date)
+        .where(Lesson.series_id.in_(series_ids))
+        .union_all(
+            select(LessonSeriesExdate.series_id, LessonSeriesExdate.occurrence_date)
+            .where(LessonSeriesExdate.series_id.in_(series_ids))
+        )
+    ).all()
+    for series_id, occurrence_date in rows:
+        taken[series_id].add(occurrence_date)
+    return taken
+
+
+def virtual_occurrence(series: LessonSeries, occurrence_date: date) -> dict:
+    # shaped like LessonRead; id and lesson_id stay None until materialised
+    return {
+        "id": None,
+        "series_id": series.id,
+        "occurrence_date": occurrence_date,
+        "date": occurrence_date,
+        "time": series.time,
+        "subject": series.subject,
+        "duration": series.duration,
+        "location": series.location,
+        "price": series.price,
+        "organisation_id": series.organisation_id,
+        "teachers": series.teachers,
+        "student_links": [
+            {
+                "lesson_id": None,
+                "student_id": student.id,
+                "attendance_status": "assigned",
+                "payment_status": "unpaid",
+                "student": student,
+            }
+            for student in series.students
+        ],
+    }
+
+
+def expand_series(
+    db: Session,
+    criteria: Iterable,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> List[dict]:
+    """Virtual occurrences of every series matching criteria, within [start, end]."""
+    series_list = load_series(db, criteria, start, end)
+    taken = taken_occurrences(db, [series.id for series in series_list])
+
+    occurrences = []
+    for series in series_list:
+        for occurrence_date in occurrence_dates(series, start, end):
+            if occurrence_date not in taken[series.id]:
+                occurrences.append(virtual_occurrence(series, occurrence_date))
+    return occurrences
+
+
+def build_occurrence(series: LessonSeries, occurrence_date: date) -> Lesson:
+    lesson = Lesson(
+        date=occurrence_date,
+        time=series.time,
+        subject=series.subject,
+        duration=series.duration,
+        location=series.location,
+        price=series.price,
+        organisation_id=series.organisation_id,
+        series_id=series.id,
+        occurrence_date=occurrence_date,
+        teachers=list(series.teachers),
+    )
+    for student in series.students:
+        lesson.student_links.append(
+            LessonStudent(
+                student=student,
+                attendance_status="assigned",
+                payment_status="unpaid"
+            )
+        )
+    return lesson
+
+
+def materialise_occurrence(db: Session, series: LessonSeries, occurrence_date: date) -> Lesson:
+    """Store one occurrence as a Lesson with the series' default roster (flushed, not committed)."""
+    lesson = build_occurrence(series, occurrence_date)
+    db.add(lesson)
+    db.flush()
+    return lesson
+
+
+def exclude_occurrence(db: Session, lesson: Lesson):
+    # deleting a materialised occurrence must not bring the virtual one back
+    if lesson.series_id is not None:
+        db.merge(LessonSeriesExdate(series_id=lesson.series_id, occurrence_date=lesson.occurrence_date))
+
+
+def materialise_series_range(db: Session, criteria: Iterable, start: Optional[date], end: date) -> int:
+    """Materialise every pending occurrence in [start, end] of the series matching criteria (flushed, not committed)."""
+    series_list = load_series(db, criteria, start, end)
+    taken = taken_occurrences(db, [series.id for series in series_list])
+
+    lessons = [
+        build_occurrence(series, occurrence_date)
+        for series in series_list
+        for occurrence_date in occurrence_dates(series, start, end)
+        if occurrence_date not in taken[series.id]
+    ]
+    db.add_all(lessons)
+    db.flush()
+    return len(lessons)
+
+
+def materialise_range(db: Session, organisation_id: int, start: Optional[date], end: date) -> int:
+    """Materialise every pending occurrence in [start, end] for an organisation.
+
+    Used before set-based jobs (archiving) that only see stored rows.
+    """
+    return materialise_series_range(db, [LessonSeries.organisation_id == organisation_id], start, end)
@@ -0,0 +1,429 @@
+#routes each organisation to the database (or postgres schema) that holds its data
+#shards come from DATABASE_SHARDS, e.g.
+#  {"big-schools": {"url": "postgresql+psycopg2://...", "id_offset": 100000000},
+#   "eu-2": {"url": "postgresql+psycopg2://...", "schema": "tenants_eu2", "id_offset": 200000000}}
+#the default shard is app.database's engine unless DATABASE_SHARDS names "default" itself.
+#every other shard needs its own id_offset: ids run from its offset up to the next shard's,
+#and the default shard's from 1 up to the lowest offset, so no two tenants share an id.
+#which organisation lives where is kept in organisation_shards on the default database.
+#user_emails on the default database keeps emails unique across shards and tells login where to look.
+#usage: python -m app.tenancy shards | prepare <shard> | move <organisation_id> <shard> | index-emails
+import argparse
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import create_engine, delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database import Base, SQLALCHEMY_DATABASE_URL, driver_connect_args, engine as default_engine
+from app.models import user, lesson, associations, organisation, change, invoice, archive, series, payroll, reminder, shard, audit  # noqa: F401 (every table must be known to move an organisation)
+from app.archive import ensure_archive_partitions
+from app.models.shard import OrganisationShard, UserEmail
+from app.models.user import User
+
+DEFAULT_SHARD = "default"
+# how long a worker trusts its cached placement; a move waits this long before copying
+TENANT_CACHE_SECONDS = float(os.getenv("TENANT_CACHE_SECONDS", "30"))
+MOVE_CHUNK_SIZE = 1000
+
+# tables that are neither keyed by organisation_id nor have a foreign key to one that is
+UNLINKED_CHILDREN = {
+    "archive_lesson_teachers": ("lesson_id", "archive_lessons"),
+    "archive_lesson_students": ("lesson_id", "archive_lessons"),
+}
+DIRECTORY_TABLES = {"organisation_shards", "user_emails"}
+
+
+class OrganisationMoving(Exception):
+    """The organisation is being copied to another shard; retry once the move is done."""
+
+
+@dataclass(frozen=True)
+class Shard:
+    name: str
+    url: str
+    schema: Optional[str] = None
+    # primary keys are kept when moving organisations, and per-worker caches (lesson documents,
+    # event subscriptions) are keyed by bare ids, so each shard hands out ids from its own range
+    id_offset: int = 0
+
+
+def load_shards(raw: Optional[str] = None) -> Dict[str, Shard]:
+    config = json.loads(raw if raw is not None else os.getenv("DATABASE_SHARDS", "{}"))
+    shards = {DEFAULT_SHARD: Shard(DEFAULT_SHARD, SQLALCHEMY_DATABASE_URL)}
+    for name, options in config.items():
+        if isinstance(options, str):
+            options = {"url": options}
+        shards[name] = Shard(name, options["url"], options.get("schema"), int(options.get("id_offset", 0)))
+
+    offsets = {shards[DEFAULT_SHARD].id_offset: DEFAULT_SHARD}
+    for name, shard in shards.items():
+        if name == DEFAULT_SHARD:
+            continue
+        if shard.id_offset <= 0:
+            raise ValueError(f"Shard {name} needs a positive id_offset, or its ids collide with the default shard's")
+        if shard.id_offset in offsets:
+            raise ValueError(f"Shards {offsets[shard.id_offset]} and {name} have the same id_offset")
+        offsets[shard.id_offset] = name
+    return shards
+
+
+class TenantRouter:
+    def __init__(self, shards: Dict[str, Shard], cache_seconds: float = TENANT_CACHE_SECONDS):
+        self.shards = shards
+        self.cache_seconds = cache_seconds
+        self._lock = threading.Lock()
+        self._engines: Dict[str, Engine] = {}
+        self._sessionmakers: Dict[str, sessionmaker] = {}
+        # organisation_id -> (shard, moving, expires at)
+        self._placements: Dict[int, Tuple[str, bool, float]] = {}
+
+    def engine(self, name: str) -> Engine:
+        with self._lock:
+            if name not in self._engines:
+                self._engines[name] = self._create_engine(name)
+            return self._engines[name]
+
+    def _create_engine(self, name: str) -> Engine:
+        if name not in self.shards:
+            raise ValueError(f"Unknown shard: {name}")
+        config = self.shards[name]
+        if config.url == SQLALCHEMY_DATABASE_URL and config.schema is None:
+            return default_engine
+        if config.url.startswith("sqlite"):
+            if config.schema:
+                raise ValueError(f"Shard {name}: schemas need postgres")
+            return create_engine(config.url, connect_args={"check_same_thread": False})
+        # a schema shard is a search_path, so raw SQL (partitions, sequences) lands in it too
+        connect_args = {"options": f"-csearch_path={config.schema}"} if config.schema else {}
+        return create_engine(config.url, connect_args={**driver_connect_args(config.url), **connect_args})
+
+    def session(self, name: str) -> Session:
+        if name not in self._sessionmakers:
+            self._sessionmakers[name] = sessionmaker(autocommit=False, autoflush=False, bind=self.engine(name))
+        return self._sessionmakers[name]()
+
+    def placement(self, organisation_id: Optional[int]) -> Tuple[str, bool]:
+        """(shard, moving) for an organisation, cached for cache_seconds."""
+        # users without an organisation are on the default shard
+        if organisation_id is None:
+            return DEFAULT_SHARD, False
+        now = time.monotonic()
+        cached = self._placements.get(organisation_id)
+        if cached is not None and cached[2] > now:
+            return cached[0], cached[1]
+
+        with self.session(DEFAULT_SHARD) as db:
+            row = db.get(OrganisationShard, organisation_id)
+            placement = (row.shard, row.moving) if row is not None else (DEFAULT_SHARD, False)
+        self._placements[organisation_id] = (*placement, now + self.cache_seconds)
+        return placement
+
+    def forget(self, organisation_id: int):
+        self._placements.pop(organisation_id, None)
+
+    def session_for(self, organisation_id: Optional[int]) -> Session:
+        # tokens issued before sharding carry no organisation; those users are on the default shard
+        if organisation_id is None:
+            return self.session(DEFAULT_SHARD)
+        name, moving = self.placement(organisation_id)
+        if moving:
+            raise OrganisationMoving(organisation_id)
+        return self.session(name)
+
+    def claim_emails(self, emails: Iterable[str], organisation_id: Optional[int]) -> Set[str]:
+        """Reserve emails for new users of an organisation; returns those no other user (on any shard) has."""
+        values = [{"email": email, "organisation_id": organisation_id} for email in emails]
+        if not values:
+            return set()
+        engine = self.engine(DEFAULT_SHARD)
+        insert = pg_insert if engine.dialect.name == "postgresql" else sqlite_insert
+        # committed straight away, so a concurrent signup on another shard sees the claim
+        with engine.begin() as conn:
+            return set(conn.execute(
+                insert(UserEmail).values(values).on_conflict_do_nothing(index_elements=["email"]).returning(UserEmail.email)
+            ).scalars())
+
+    def release_emails(self, emails: Iterable[str]):
+        emails = list(emails)
+        if emails:
+            with self.engine(DEFAULT_SHARD).begin() as conn:
+                conn.execute(delete(UserEmail).where(UserEmail.email.in_(emails)))
+
+    @contextmanager
+    def claimed_emails(self, emails: Iterable[str], organisation_id: Optional[int]) -> Iterator[Set[str]]:
+        """claim_emails around creating the users; the claims are released if the block raises."""
+        claimed = self.claim_emails(emails, organisation_id)
+        try:
+            yield claimed
+        except BaseException:
+            self.release_emails(claimed)
+            raise
+
+    def email_shards(self, email: str) -> List[str]:
+        # straight to the user's shard when the directory knows them, every shard otherwise
+        with self.session(DEFAULT_SHARD) as db:
+            entry = db.get(UserEmail, email)
+        if entry is None:
+            return list(self.shards)
+        name, moving = self.placement(entry.organisation_id)
+        if moving:
+            raise OrganisationMoving(entry.organisation_id)
+        return [name]
+
+    @contextmanager
+    def user_by_email(self, email: str) -> Iterator[Tuple[Optional[Session], Optional[User]]]:
+        """(session, user) for a login or verification link, which come without an organisation.
+
+        Looks the email up in user_emails, falling back to asking each shard in
+        turn for users the directory doesn't have yet; a copy left on a shard the
+        organisation no longer lives on is ignored.
+        """
+        for name in self.email_shards(email):
+            db = self.session(name)
+            try:
+                found = db.query(User).filter(User.email == email).first()
+                if found is not None:
+                    shard_name, moving = self.placement(found.organisation_id)
+                    if shard_name == name:
+                        if moving:
+                            raise OrganisationMoving(found.organisation_id)
+                        yield db, found
+                        return
+            finally:
+                db.close()
+        yield None, None
+
+
+tenants = TenantRouter(load_shards())
+
+
+def id_tables() -> list:
+    return [table for table in Base.metadata.sorted_tables if "id" in table.c and table.c.id.autoincrement]
+
+
+@contextmanager
+def sqlite_autoincrement(tables: list) -> Iterator[None]:
+    # only AUTOINCREMENT tables take their next id from sqlite_sequence, where the offset can be set
+    for table in tables:
+        table.dialect_options["sqlite"]["autoincrement"] = True
+    try:
+        yield
+    finally:
+        for table in tables:
+            table.dialect_options["sqlite"]["autoincrement"] = False
+
+
+def prepare_shard(name: str, router: TenantRouter = tenants):
+    """Create the schema and tables of a shard and start its id sequences at its offset."""
+    config = router.shards[name]
+    engine = router.engine(name)
+    is_postgres = engine.dialect.name == "postgresql"
+
+    if is_postgres:
+        with engine.begin() as conn:
+            if config.schema:
+                conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{config.schema}"'))
+            # trigram indexes on users need the extension before create_all
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        Base.metadata.create_all(bind=engine)
+    elif config.id_offset:
+        with sqlite_autoincrement(id_tables()):
+            Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            for table in id_tables():
+                # a table gets its sqlite_sequence row with its first id, so this skips tables in use
+                conn.execute(
+                    text(
+                        "INSERT INTO sqlite_sequence (name, seq) SELECT :table, :offset - 1 "
+                        "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :table)"
+                    ),
+                    {"table": table.name, "offset": config.id_offset},
+                )
+    else:
+        Base.metadata.create_all(bind=engine)
+
+    if is_postgres and config.id_offset:
+        with engine.begin() as conn:
+            for table in id_tables():
+                # only sequences that never handed out an id, so re-running is harmless
+                conn.execute(
+                    text(
+                        "SELECT setval(s.seq, :offset, false) FROM "
+                        "(SELECT pg_get_serial_sequence(:table, 'id')::regclass AS seq) s "
+                        "JOIN pg_sequences p ON format('%I.%I', p.schemaname, p.sequencename)::regclass = s.seq "
+                        "WHERE p.last_value IS NULL"
+                    ),
+                    {"table": table.name, "offset": config.id_offset},
+                )
+
+
+def index_emails(router: TenantRouter = tenants) -> dict:
+    """Add every shard's users to user_emails (for users created before it existed).
+
+    Returns {"added": count, "conflicts": [emails a user of another organisation already has]};
+    those have to be resolved by hand, only the user the directory points at can log in.
+    """
+    added, conflicts = 0, []
+    for name in router.shards:
+        by_organisation: Dict[Optional[int], List[str]] = {}
+        with router.session(name) as db:
+            for email, organisation_id in db.execute(select(User.email, User.organisation_id)):
+                by_organisation.setdefault(organisation_id, []).append(email)
+
+        for organisation_id, emails in by_organisation.items():
+            # copies a failed move left behind belong to the other shard
+            if router.placement(organisation_id)[0] != name:
+                continue
+            for start in range(0, len(emails), MOVE_CHUNK_SIZE):
+                chunk = emails[start:start + MOVE_CHUNK_SIZE]
+                claimed = router.claim_emails(chunk, organisation_id)
+                added += len(claimed)
+                taken = [email for email in chunk if email not in claimed]
+                if taken:
+                    with router.session(DEFAULT_SHARD) as db:
+                        conflicts += db.execute(
+                            select(UserEmail.email)
+                            .where(UserEmail.email.in_(taken), UserEmail.organisation_id.is_distinct_from(organisation_id))
+                        ).scalars().all()
+    return {"added": added, "conflicts": sorted(conflicts)}
+
+
+def ownership_filters(organisation_id: int) -> dict:
+    """{table: where clause selecting the organisation's rows}, in foreign key order."""
+    filters = {}
+    # nothing references the unlinked children, so they can simply go last
+    tables = sorted(Base.metadata.sorted_tables, key=lambda table: table.name in UNLINKED_CHILDREN)
+    for table in tables:
+        if table.name in DIRECTORY_TABLES:
+            continue
+        if table.name == "organisations":
+            filters[table] = table.c.id == organisation_id
+        elif "organisation_id" in table.c:
+            filters[table] = table.c.organisation_id == organisation_id
+        elif table.name in UNLINKED_CHILDREN:
+            column, parent_name = UNLINKED_CHILDREN[table.name]
+            parent = Base.metadata.tables[parent_name]
+            filters[table] = table.c[column].in_(select(parent.c.id).where(filters[parent]))
+        else:
+            foreign_key = next((fk for fk in table.foreign_keys if fk.column.table in filters), None)
+            if foreign_key is None:
+                raise ValueError(f"Cannot tell which organisation owns rows of {table.name}")
+            parent = foreign_key.column.table
+            filters[table] = foreign_key.parent.in_(select(foreign_key.column).where(filters[parent]))
+    return filters
+
+
+def move_organisation(
+    organisation_id: int,
+    target: str,
+    router: TenantRouter = tenants,
+    drain_seconds: Optional[float] = None,
+) -> dict:
+    """Copy an organisation's rows to another shard, switch the directory, then delete the originals.
+
+    Requests for the organisation get a 503 from the moment it is marked as
+    moving until the directory points at the target. If the copy fails the
+    organisation stays where it was. Ids are kept; shards hand out ids from
+    separate ranges (see Shard.id_offset and load_shards), so they stay unique.
+    """
+    if target not in router.shards:
+        raise ValueError(f"Unknown shard: {target}")
+    router.forget(organisation_id)
+    source, _ = router.placement(organisation_id)
+    if source == target:
+        return {}
+
+    def set_directory(shard_name: str, moving: bool):
+        with router.session(DEFAULT_SHARD) as db:
+            if shard_name == DEFAULT_SHARD and not moving:
+                db.execute(delete(OrganisationShard).where(OrganisationShard.organisation_id == organisation_id))
+            else:
+                db.merge(OrganisationShard(organisation_id=organisation_id, shard=shard_name, moving=moving))
+            db.commit()
+        router.forget(organisation_id)
+
+    set_directory(source, moving=True)
+    # let other workers' cached placements expire and their in-flight requests finish
+    time.sleep(router.cache_seconds if drain_seconds is None else drain_seconds)
+
+    filters = ownership_filters(organisation_id)
+    copied = {}
+    try:
+        with router.engine(source).connect() as src, router.engine(target).begin() as dst:
+            if dst.dialect.name == "postgresql":
+                # rows of a year without its partition would land in the default one, after
+                # which that year's partition can't be created any more
+                archived = Base.metadata.tables["archive_lessons"]
+                first, last = src.execute(
+                    select(func.min(archived.c.date), func.max(archived.c.date)).where(filters[archived])
+                ).one()
+                if first is not None:
+                    ensure_archive_partitions(dst, first.year, last.year)
+            for table, where in filters.items():
+                result = src.execution_options(yield_per=MOVE_CHUNK_SIZE).execute(select(table).where(where))
+                count = 0
+                for chunk in result.mappings().partitions():
+                    dst.execute(table.insert(), [dict(row) for row in chunk])
+                    count += len(chunk)
+                if count:
+                    copied[table.name] = count
+    except Exception:
+        set_directory(source, moving=False)
+        raise
+
+    set_directory(target, moving=False)
+
+    with router.engine(source).begin() as conn:
+        for table, where in reversed(list(filters.items())):
+            conn.execute(delete(table).where(where))
+
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.tenancy")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("shards", help="list shards and how many organisations each holds")
+    prepare = commands.add_parser("prepare", help="create a shard's tables")
+    prepare.add_argument("shard")
+    move = commands.add_parser("move", help="move an organisation to another shard")
+    move.add_argument("organisation_id", type=int)
+    move.add_argument("shard")
+    move.add_argument("--drain-seconds", type=float, default=None)
+    commands.add_parser("index-emails", help="add users created before user_emails existed to it")
+    args = parser.parse_args()
+
+    if args.command == "shards":
+        with tenants.session(DEFAULT_SHARD) as db:
+            placed = dict(db.execute(
+                select(OrganisationShard.shard, func.count()).group_by(OrganisationShard.shard)
+            ).all())
+        # organisations without a directory row are on the default shard and not counted here
+        for name, config in tenants.shards.items():
+            print(f"{name:<20}{placed.get(name, 0):>6} placed  schema={config.schema or '-'}  id_offset={config.id_offset}")
+    elif args.command == "prepare":
+        prepare_shard(args.shard)
+        print(f"prepared {args.shard}")
+    elif args.command == "move":
+        copied = move_organisation(args.organisation_id, args.shard, drain_seconds=args.drain_seconds)
+        for table_name, count in copied.items():
+            print(f"{table_name:<28}{count:>8}")
+        print(f"organisation {args.organisation_id} is on {args.shard}")
+    elif args.command == "index-emails":
+        indexed = index_emails()
+        print(f"added {indexed['added']} emails")
+        for email in indexed["conflicts"]:
+            print(f"registered in more than one organisation: {email}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#bulk user import: one claim on the email directory, process-pool hashing, batched inserts
+import csv
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.schemas.user import UserImportRow
+from app.tenancy import tenants
+from app.utils import hash_password
+
+MAX_IMPORT_ROWS = 10000
+INSERT_BATCH_SIZE = 1000
+HASH_WORKERS = os.cpu_count() or 1
+
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    # bcrypt is CPU bound, so spread it over every core instead of the request thread.
+    # Workers come from a fork server: forking the app itself would copy locks held by its
+    # background threads (reminders, audit flush, events) into children that never release them.
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+    return _hash_pool
+
+
+def shutdown_hash_pool():
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    if not passwords:
+        return []
+    chunksize = max(1, len(passwords) // (HASH_WORKERS * 4))
+    return list(get_hash_pool().map(hash_password, passwords, chunksize=chunksize))
+
+
+def parse_csv_rows(content: bytes) -> List[dict]:
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("CSV must be UTF-8 encoded")
+
+    reader = csv.DictReader(io.StringIO(text))
+    missing = {"name", "email", "role", "password"} - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(sorted(missing))}")
+
+    return [row for row in reader]
+
+
+def reported_email(value) -> Optional[str]:
+    # whatever a rejected row had in its email column, as UserImportError can hold it
+    if isinstance(value, (str, int, float)):
+        return str(value)
+    return None
+
+
+def import_users(db: Session, raw_rows: List[dict], organisation_id: int) -> dict:
+    """Validate and create users in bulk; returns created users and per-row errors.
+
+    Rows are numbered from 1 in the order given. Nothing is committed here, apart
+    from the created users' claims in user_emails (release them if the commit fails).
+    """
+    errors = []
+    rows = []
+    seen_emails = set()
+
+    for index, raw in enumerate(raw_rows, start=1):
+        try:
+            row = UserImportRow(**raw)
+        except ValidationError as exc:
+            errors.append({"row": index, "email": reported_email(raw.get("email")), "detail": exc.errors()[0]["msg"]})
+            continue
+
+        if row.email in seen_emails:
+            errors.append({"row": index, "email": row.email, "detail": "Duplicate email in import"})
+            continue
+        seen_emails.add(row.email)
+        rows.append((index, row))
+
+    # one statement claims every email across all shards, instead of a query per row
+    claimed = tenants.claim_emails([row.email for _, row in rows], organisation_id)
+    try:
+        new_rows = []
+        for index, row in rows:
+            if row.email not in claimed:
+                errors.append({"row": index, "email": row.email, "detail": "Email already registered"})
+            else:
+                new_rows.append((index, row))
+
+        hashed = hash_passwords([row.password for _, row in new_rows])
+
+        created = []
+        for start in range(0, len(new_rows), INSERT_BATCH_SIZE):
+            batch = new_rows[start:start + INSERT_BATCH_SIZE]
+            values = [
+                {
+                    "name": row.name,
+                    "email": row.email,
+                    "password": password,
+                    "role": row.role,
+                    "organisation_id": organisation_id,
+                    "is_verified": False,
+                }
+                for (_, row), password in zip(batch, hashed[start:start + INSERT_BATCH_SIZE])
+            ]
+            # users from before the directory existed may not be in it yet
+            inserted = set(db.execute(
+                pg_insert(User)
+                .values(values)
+                .on_conflict_do_nothing(index_elements=["email"])
+                .returning(User.email)
+            ).scalars())
+
+            for index, row in batch:
+                if row.email in inserted:
+                    created.append(row.email)
+                else:
+                    errors.append({"row": index, "email": row.email, "detail": "Email already registered"})
+    except BaseException:
+        db.rollback()
+        tenants.release_emails(claimed)
+        raise
+    tenants.release_emails(claimed.difference(created))
+
+    errors.sort(key=lambda error: error["row"])
+    return {"created": created, "errors": errors}
@@ -1,11 +1,12 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Iterable, List, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from app.models.user import User  # adjust if your path is different
-from app.database import get_db
+from app.tenancy import OrganisationMoving, tenants
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -48,16 +49,44 @@ def decode_access_token(token: str) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+# --- TENANT DATABASE ---
+
+def tenant_session(organisation_id: Optional[int]) -> Session:
+    try:
+        return tenants.session_for(organisation_id)
+    except OrganisationMoving:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Organisation is being moved, try again shortly",
+            headers={"Retry-After": str(int(tenants.cache_seconds))},
+        )
+
+# session on the shard of the caller's organisation (the "org" claim of the access token)
+def get_tenant_db(token: str = Depends(oauth2_scheme)) -> Session:
+    db = tenant_session(decode_access_token(token).get("org"))
+    try:
+        yield db
+    finally:
+        db.close()
+
 # --- GET CURRENT USER DEPENDENCY ---
 
+# hot lookups built once: executing a prebuilt statement skips rebuilding it per request, and its
+# compiled form stays in the engine's statement cache (benchmarks/hot_queries.py measures both)
+USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
+USERS_BY_IDS = select(User).where(User.id.in_(bindparam("user_ids", expanding=True)))
+
+def users_by_ids(db: Session, user_ids: Iterable[int]) -> List[User]:
+    return db.execute(USERS_BY_IDS, {"user_ids": list(user_ids)}).scalars().all()
+
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_tenant_db)) -> User:
     payload = decode_access_token(token)
     user_id: str = payload.get("sub")
     if user_id is None:
         raise HTTPException(status_code=401, detail="Token missing user ID")
     
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = db.execute(USER_BY_ID, {"user_id": int(user_id)}).scalar_one_or_none()
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
 
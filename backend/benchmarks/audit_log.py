@@ -0,0 +1,212 @@
+#buffered audit log against a local SQLite file: what recording costs a write request compared
+#with a synchronous audit insert, batch flush throughput, the shutdown fallback file, and paging
+#run from backend/: python -m benchmarks.audit_log   (needs httpx for the test client; exits 1 on a failure)
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from datetime import time as clock
+
+os.environ.setdefault("SECRET_KEY", "audit-log")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("EMAIL_TOKEN_EXPIRE_MINUTES", "60")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.audit import AuditLog, audit_log
+from app.database import Base
+from app.main import app
+from app.models.associations import LessonStudent
+from app.models.audit import AuditEvent
+from app.models.lesson import Lesson
+from app.models.organisation import Organisation
+from app.models.user import User
+from app.pagination import encode_cursor
+from app.utils import create_access_token, get_tenant_db
+
+EVENTS = 20000
+REQUESTS = 300
+failures = []
+
+
+def check(condition: bool, message: str):
+    print(("ok    " if condition else "FAIL  ") + message)
+    if not condition:
+        failures.append(message)
+
+
+def sample_event(organisation_id: int, index: int) -> dict:
+    return {
+        "organisation_id": organisation_id,
+        "actor_id": 1,
+        "action": "lesson_student.updated",
+        "lesson_id": 1_000_000 + index,
+        "changes": {"attendance_status": ["assigned", "attended"]},
+        "student_id": 2,
+    }
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    engine = create_engine(f"sqlite:///{directory}/audit.db", connect_args={"check_same_thread": False})
+    Session = sessionmaker(bind=engine, autoflush=False)
+    Base.metadata.create_all(engine)
+
+    with Session() as db:
+        organisation = Organisation(name="Audit School")
+        db.add(organisation)
+        db.flush()
+        admin = User(name="Admin", email="admin@example.com", password="x", role="admin",
+                     organisation_id=organisation.id, is_verified=True)
+        student = User(name="Student", email="student@example.com", password="x", role="student",
+                       organisation_id=organisation.id, is_verified=True)
+        db.add_all([admin, student])
+        db.flush()
+        lesson = Lesson(date=date(2026, 1, 5), time=clock(10), subject="Piano", duration=60, location="Room 1",
+                        price=40, organisation_id=organisation.id)
+        lesson.student_links.append(LessonStudent(student=student, attendance_status="assigned", payment_status="unpaid"))
+        db.add(lesson)
+        db.commit()
+        organisation_id, admin_id, student_id, lesson_id = organisation.id, admin.id, student.id, lesson.id
+
+    def session_for(_organisation_id: int):
+        return Session()
+
+    # what the request path pays: a buffer append, or an insert and commit of its own
+    record_log = AuditLog(session_for=session_for)
+    started = time.perf_counter()
+    for index in range(EVENTS):
+        record_log.record(**sample_event(organisation_id, index))
+    record_us = (time.perf_counter() - started) / EVENTS * 1e6
+
+    sync_timings = []
+    for index in range(REQUESTS):
+        started = time.perf_counter()
+        with Session() as db:
+            db.add(AuditEvent(**sample_event(organisation_id, index), occurred_at=func.now()))
+            db.commit()
+        sync_timings.append(time.perf_counter() - started)
+    print(f"      record(): {record_us:.1f} us per event; synchronous insert+commit: "
+          f"{statistics.median(sync_timings) * 1000:.2f} ms median")
+
+    started = time.perf_counter()
+    written = record_log.flush()
+    elapsed = time.perf_counter() - started
+    print(f"      flushed {written} events in {elapsed * 1000:.0f} ms ({written / elapsed:.0f}/s, "
+          f"{record_log.batch_size} rows per batch)")
+    check(written == EVENTS and record_log.pending() == 0, "a flush writes the whole buffer")
+
+    # shutdown with the database unreachable: the buffer goes to the fallback file, the next start replays it
+    fallback_path = f"{directory}/audit-fallback.jsonl"
+
+    def unreachable(_organisation_id: int):
+        raise ConnectionError("database unreachable")
+
+    down = AuditLog(fallback_path=fallback_path, session_for=unreachable)
+    for index in range(100):
+        down.record(**sample_event(organisation_id, index))
+    down.stop()
+    check(os.path.exists(fallback_path) and down.pending() == 0, "stop() spills unwritable events to the fallback file")
+    with Session() as db:
+        before = db.scalar(select(func.count()).select_from(AuditEvent))
+    restarted = AuditLog(fallback_path=fallback_path, session_for=session_for)
+    restarted.start()
+    restarted.stop()
+    with Session() as db:
+        after = db.scalar(select(func.count()).select_from(AuditEvent))
+    check(after - before == 100 and not os.path.exists(fallback_path), "the next start writes the fallback events")
+
+    # a worker starting while another is still replaying (slow database) and a third has just spilled:
+    # the second start waits for the first instead of taking over its file
+    def spill(count: int):
+        down = AuditLog(fallback_path=fallback_path, session_for=unreachable)
+        for index in range(count):
+            down.record(**sample_event(organisation_id, index))
+        down.stop()
+
+    def slow_session_for(organisation_id: int):
+        time.sleep(0.5)
+        return session_for(organisation_id)
+
+    spill(100)
+    replayed, errors = [], []
+
+    def start(worker: AuditLog):
+        try:
+            replayed.append(worker.replay_fallback())
+        except Exception as exc:
+            errors.append(exc)
+
+    first = threading.Thread(target=start, args=(AuditLog(fallback_path=fallback_path, session_for=slow_session_for),))
+    first.start()
+    time.sleep(0.1)
+    spill(50)
+    start(AuditLog(fallback_path=fallback_path, session_for=session_for))
+    first.join()
+    with Session() as db:
+        concurrent = db.scalar(select(func.count()).select_from(AuditEvent))
+    check(
+        not errors and sorted(replayed) == [50, 100] and concurrent - after == 150 and not os.path.exists(fallback_path),
+        "a start during another worker's replay waits for it, and every event is written once",
+    )
+
+    # end to end: status changes through the API, then page through the trail
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_tenant_db] = override_get_db
+    audit_log.session_for = session_for
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": str(admin_id)})}
+
+    timings = []
+    statuses = ["attended", "missed"]
+    for index in range(REQUESTS):
+        started = time.perf_counter()
+        response = client.patch(f"/lessons/{lesson_id}/students/{student_id}", headers=headers,
+                                json={"attendance_status": statuses[index % 2]})
+        timings.append(time.perf_counter() - started)
+        response.raise_for_status()
+    print(f"      PATCH status with buffered audit: {statistics.median(timings) * 1000:.2f} ms median, "
+          f"{audit_log.pending()} events waiting")
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"lesson_id": lesson_id, "action": "lesson_student.updated", "limit": 50}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/audit/", headers=headers, params=params).json()
+        seen.extend(page["items"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    ids = [event["id"] for event in seen]
+    check(len(ids) == REQUESTS and len(set(ids)) == REQUESTS, f"paging returns every PATCH once ({pages} pages)")
+    check(
+        seen[0]["changes"]["attendance_status"] == ["attended", "missed"]
+        and seen[-1]["changes"]["attendance_status"] == ["assigned", "attended"],
+        "newest first, with before and after values",
+    )
+    bad_cursors = [encode_cursor("yesterday", 1), encode_cursor(None, 1), encode_cursor(seen[0]["occurred_at"], "1")]
+    check(
+        all(client.get("/audit/", headers=headers, params={"cursor": cursor}).status_code == 400 for cursor in bad_cursors),
+        "a malformed cursor is a 400",
+    )
+    app.dependency_overrides.pop(get_tenant_db, None)
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#Python-side cost of the hot-path queries, as they were built per request and as prebuilt statements
+#run with bind parameters, on an in-memory SQLite database (so the SQL itself costs next to nothing)
+#run from backend/: python -m benchmarks.hot_queries [--lessons 50] [--calls 2000]   (exits 1 if results differ)
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("SECRET_KEY", "hot-queries")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("EMAIL_TOKEN_EXPIRE_MINUTES", "60")
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import init_db  # noqa: F401 (registers every mapper)
+from app.access import lesson_access, membership_clause
+from app.api.routes.lesson import TEACHER_LESSON_ROWS
+from app.database import Base
+from app.documents import LESSON_ROW_COLUMNS
+from app.models.lesson import Lesson
+from app.models.user import User
+from app.utils import USER_BY_ID, users_by_ids
+from tests.seed import seed
+
+REPEATS = 5
+failures = []
+
+
+def per_call_us(function, calls: int) -> float:
+    # best of a few runs, so a stray pause doesn't count
+    best = None
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / calls * 1e6
+
+
+def normalised(result) -> list:
+    # a user, a row or a list of either, comparable across query styles
+    if result is None or isinstance(result, User):
+        return [result]
+    return [item if isinstance(item, User) else tuple(item) if hasattr(item, "_fields") else item for item in result]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lessons", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    Base.metadata.create_all(engine)
+    seeded = seed(Session(), args.lessons)
+    db = Session()
+    teacher = db.get(User, seeded["callers"]["teacher"])
+    lesson_id = seeded["ids"]["lesson_id"]
+    student_ids = [user_id for user_id, in db.execute(select(User.id).where(User.role == "student"))][:4]
+
+    def lesson_access_before():
+        # the access select as it was built on every call
+        return db.execute(
+            select(Lesson.id, Lesson.organisation_id, Lesson.version.label("version"),
+                   membership_clause(teacher.role, teacher.id).label("is_member"))
+            .where(Lesson.id == lesson_id)
+        ).first()
+
+    # (name, before, after): before is the construction the routes used until now
+    queries = [
+        ("get_current_user: user by id",
+         lambda: db.query(User).filter(User.id == teacher.id).first(),
+         lambda: db.execute(USER_BY_ID, {"user_id": teacher.id}).scalar_one_or_none()),
+        ("lesson access check (teacher)",
+         lesson_access_before,
+         lambda: lesson_access(db, lesson_id, teacher)),
+        ("my-lessons rows (teacher)",
+         lambda: db.query(Lesson).filter(Lesson.teachers.any(id=teacher.id)).with_entities(*LESSON_ROW_COLUMNS).all(),
+         lambda: db.execute(TEACHER_LESSON_ROWS, {"teacher_id": teacher.id}).all()),
+        ("roster validation (4 students)",
+         lambda: db.query(User).filter(User.id.in_(student_ids)).all(),
+         lambda: users_by_ids(db, student_ids)),
+    ]
+
+    print(f"{'query':<34} {'before':>10} {'after':>10} {'saved':>7}")
+    for name, before, after in queries:
+        if normalised(before()) != normalised(after()):
+            failures.append(name)
+            print(f"FAIL  {name}: the prebuilt statement returns something else")
+            continue
+        before_us, after_us = per_call_us(before, args.calls), per_call_us(after, args.calls)
+        print(f"{name:<34} {before_us:>8.0f}us {after_us:>8.0f}us {1 - after_us / before_us:>6.0%}")
+
+    db.close()
+    engine.dispose()
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
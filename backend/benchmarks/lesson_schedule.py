@@ -0,0 +1,120 @@
+#CPU per response and bytes on the wire for a teacher's term schedule
+#run from backend/: python -m benchmarks.lesson_schedule [--weeks 12] [--per-week 25]
+import argparse
+import gzip
+import json
+import time
+from datetime import date, time as clock, timedelta
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app import init_db  # noqa: F401 (registers every mapper)
+from app.compression import BROTLI_QUALITY, GZIP_LEVEL, brotli
+from app.documents import lesson_documents, render_lesson
+from app.models.associations import LessonStudent
+from app.models.lesson import Lesson
+from app.models.user import User
+from app.schemas.lesson import LessonRead
+
+
+def build_schedule(weeks: int, per_week: int) -> List[Lesson]:
+    teacher = User(id=1, name="Term Teacher", email="teacher@example.com", role="teacher", organisation_id=1, is_verified=True)
+    students = [
+        User(id=100 + i, name=f"Student {i}", email=f"student{i}@example.com", role="student", organisation_id=1, is_verified=True)
+        for i in range(40)
+    ]
+
+    lessons = []
+    first_day = date(2026, 9, 7)
+    for index in range(weeks * per_week):
+        lesson = Lesson(
+            id=index + 1,
+            version=1,
+            date=first_day + timedelta(weeks=index // per_week, days=index % 5),
+            time=clock(9 + index % 8),
+            subject="Piano" if index % 2 else "Theory",
+            duration=60,
+            location="Room 2",
+            price=45.0,
+            organisation_id=1,
+            teachers=[teacher],
+        )
+        for offset in range(1 + index % 4):
+            student = students[(index + offset) % len(students)]
+            lesson.student_links.append(LessonStudent(
+                lesson_id=lesson.id,
+                student_id=student.id,
+                student=student,
+                attendance_status="assigned",
+                payment_status="unpaid",
+            ))
+        lessons.append(lesson)
+    return lessons
+
+
+def cpu_per_call(func, repeat: int) -> float:
+    func()
+    start = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weeks", type=int, default=12)
+    parser.add_argument("--per-week", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    lessons = build_schedule(args.weeks, args.per_week)
+    adapter = TypeAdapter(List[LessonRead])
+
+    def validated():
+        return [LessonRead.model_validate(lesson, from_attributes=True) for lesson in lessons]
+
+    def json_response():
+        # starlette JSONResponse, i.e. any custom response_class
+        return json.dumps(jsonable_encoder(validated()), separators=(",", ":")).encode()
+
+    def orjson_response():
+        return orjson.dumps(jsonable_encoder(validated()))
+
+    def response_model_path():
+        # FastAPI's default for routes with a response_model: pydantic-core straight to bytes
+        return adapter.dump_json(validated())
+
+    for lesson in lessons:
+        lesson_documents.put(lesson.id, lesson.version, render_lesson(lesson))
+
+    def cached_documents():
+        return b"[" + b",".join(lesson_documents.get(lesson.id, lesson.version) for lesson in lessons) + b"]"
+
+    print(f"{len(lessons)} lessons, {args.repeat} runs each\n")
+    print(f"{'serialisation':<34}{'cpu ms/response':>16}")
+    for name, func in [
+        ("JSONResponse (json.dumps)", json_response),
+        ("ORJSONResponse-style (orjson)", orjson_response),
+        ("response_model (pydantic-core)", response_model_path),
+        ("cached documents (app.documents)", cached_documents),
+    ]:
+        print(f"{name:<34}{cpu_per_call(func, args.repeat):>16.2f}")
+
+    body = cached_documents()
+    encodings = [
+        ("identity", lambda: body),
+        (f"gzip level {GZIP_LEVEL}", lambda: gzip.compress(body, compresslevel=GZIP_LEVEL)),
+    ]
+    if brotli is not None:
+        encodings.append((f"brotli quality {BROTLI_QUALITY}", lambda: brotli.compress(body, quality=BROTLI_QUALITY)))
+
+    print(f"\n{'encoding':<34}{'bytes':>16}{'cpu ms':>10}")
+    for name, func in encodings:
+        print(f"{name:<34}{len(func()):>16}{cpu_per_call(func, args.repeat):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#on-demand request profiling against a local SQLite database: flagged admin requests produce a
+#downloadable speedscope file with samples and SQL timings, anyone else's flag is ignored,
+#the store stays bounded, and what unflagged requests pay for the middleware
+#run from backend/: python -m benchmarks.profiling   (needs httpx for the test client; exits 1 on a failure)
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from datetime import time as clock
+
+directory = tempfile.mkdtemp()
+os.environ["DATABASE_SHARDS"] = json.dumps({"default": f"sqlite:///{directory}/profiling.db"})
+os.environ["PROFILE_DIR"] = f"{directory}/profiles"
+os.environ["PROFILE_KEEP"] = "3"
+os.environ.setdefault("SECRET_KEY", "profiling")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("EMAIL_TOKEN_EXPIRE_MINUTES", "60")
+
+from fastapi.testclient import TestClient
+
+import app.profiling as profiling
+from app.main import app
+from app.models.associations import LessonStudent
+from app.models.lesson import Lesson
+from app.models.organisation import Organisation
+from app.models.user import User
+from app.profiling import ProfilingMiddleware
+from app.tenancy import prepare_shard, tenants
+from app.utils import create_access_token
+
+LESSONS = 2000
+REQUESTS = 30
+failures = []
+
+
+def check(condition: bool, message: str):
+    print(("ok    " if condition else "FAIL  ") + message)
+    if not condition:
+        failures.append(message)
+
+
+def seed() -> dict:
+    with tenants.session("default") as db:
+        schools = [Organisation(name="Big School"), Organisation(name="Other School")]
+        db.add_all(schools)
+        db.flush()
+        admin, other_admin, teacher, student = (
+            User(name=name, email=f"{name.lower()}@example.com", password="x", role=role,
+                 organisation_id=school.id, is_verified=True)
+            for name, role, school in [
+                ("Admin", "admin", schools[0]), ("Other", "admin", schools[1]),
+                ("Teacher", "teacher", schools[0]), ("Student", "student", schools[0]),
+            ]
+        )
+        db.add_all([admin, other_admin, teacher, student])
+        db.flush()
+        for index in range(LESSONS):
+            db.add(Lesson(
+                date=date(2026, 1, 5) + timedelta(days=index % 300), time=clock(9 + index % 8), subject="Piano",
+                duration=60, location="Room 1", price=40, organisation_id=schools[0].id, teachers=[teacher],
+                student_links=[LessonStudent(student=student, attendance_status="assigned", payment_status="unpaid")],
+            ))
+        db.commit()
+        return {
+            role: {"Authorization": "Bearer " + create_access_token({"sub": str(user.id), "org": user.organisation_id})}
+            for role, user in [("admin", admin), ("other", other_admin), ("teacher", teacher)]
+        }
+
+
+def fast_path_us() -> float:
+    """What the middleware costs a request that doesn't ask for a profile."""
+    async def endpoint(scope, receive, send):
+        pass
+
+    middleware = ProfilingMiddleware(endpoint)
+    scope = {
+        "type": "http", "method": "GET", "path": "/lessons/", "query_string": b"start=2026-01-01",
+        "headers": [(b"host", b"testserver"), (b"authorization", b"Bearer x" * 20), (b"accept-encoding", b"gzip, br")],
+    }
+
+    async def run(app, count: int) -> float:
+        started = time.perf_counter()
+        for _ in range(count):
+            await app(scope, None, None)
+        return time.perf_counter() - started
+
+    count = 200_000
+    return (asyncio.run(run(middleware, count)) - asyncio.run(run(endpoint, count))) / count * 1e6
+
+
+def main():
+    prepare_shard("default")
+    headers = seed()
+    client = TestClient(app)
+
+    response = client.get("/lessons/", headers={**headers["admin"], "X-Profile": "1"})
+    profile_id = response.headers.get("x-profile-id")
+    check(response.status_code == 200 and len(response.json()) == LESSONS and profile_id is not None,
+          "a flagged admin request answers as usual, with X-Profile-Id")
+
+    download = client.get(f"/profiles/{profile_id}", headers=headers["admin"])
+    check(download.status_code == 200 and "attachment" in download.headers.get("content-disposition", ""),
+          "the profile downloads as a file")
+    document = download.json()
+    frames = document["shared"]["frames"]
+    sampled = [profile for profile in document["profiles"] if profile["type"] == "sampled"]
+    sql = [profile for profile in document["profiles"] if profile["type"] == "evented"]
+    sampled_names = {frames[index]["name"] for profile in sampled for stack in profile["samples"] for index in stack}
+    print(f"      {document['name']}: {sum(len(p['samples']) for p in sampled)} samples on {len(sampled)} threads, "
+          f"{sql[0]['name'] if sql else 'no SQL'}")
+    check("lesson_list_response" in sampled_names, "samples reach into the route's code")
+    check(bool(sql) and len(sql[0]["events"]) >= 2, "SQL statements are on the timeline")
+
+    check("x-profile-id" not in client.get("/lessons/my-lessons", headers={**headers["teacher"], "X-Profile": "1"}).headers,
+          "a teacher's flag is ignored")
+    check("x-profile-id" not in client.get("/lessons/", headers=headers["admin"]).headers,
+          "requests without the flag are not profiled")
+    check("x-profile-id" not in client.get("/lessons/", headers={**headers["admin"], "X-Profile": "0"}).headers,
+          "X-Profile: 0 is not a flag")
+    bad_sub = "Bearer " + create_access_token({"sub": "admin", "org": None})
+    check(profiling.profiling_admin({"type": "http", "headers": [(b"authorization", bad_sub.encode())]}) is None,
+          "a token with a non-numeric sub is not an admin")
+
+    def unreachable(organisation_id):
+        raise ConnectionError("shard unreachable")
+
+    profiling.tenant_session, tenant_session = unreachable, profiling.tenant_session
+    try:
+        response = client.get("/users/", headers={**headers["admin"], "X-Profile": "1"})
+    finally:
+        profiling.tenant_session = tenant_session
+    check(response.status_code == 200 and "x-profile-id" not in response.headers,
+          "a failing admin lookup leaves the request unprofiled")
+    check(client.get(f"/profiles/{profile_id}", headers=headers["other"]).status_code == 404,
+          "other organisations' admins cannot download it")
+
+    for _ in range(4):
+        client.get("/users/?profile=1", headers=headers["admin"]).raise_for_status()
+    listed = client.get("/profiles/", headers=headers["admin"]).json()
+    check(len(listed) == 3 and len(os.listdir(os.environ["PROFILE_DIR"])) == 3,
+          "the query flag works too, and only the newest PROFILE_KEEP profiles are kept")
+
+    timings = {"plain": [], "profiled": []}
+    for _ in range(REQUESTS):
+        for label, extra in [("plain", {}), ("profiled", {"X-Profile": "1"})]:
+            started = time.perf_counter()
+            client.get("/lessons/", headers={**headers["admin"], **extra}).raise_for_status()
+            timings[label].append(time.perf_counter() - started)
+    print(f"      GET /lessons/ ({LESSONS} lessons): {statistics.median(timings['plain']) * 1000:.1f} ms median, "
+          f"{statistics.median(timings['profiled']) * 1000:.1f} ms profiled")
+    overhead = fast_path_us()
+    print(f"      middleware on an unflagged request: {overhead:.2f} us")
+    check(overhead < 20, "unflagged requests pay next to nothing")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
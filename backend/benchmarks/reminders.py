@@ -0,0 +1,200 @@
+#a day's reminders (default 100k) through two concurrent dispatchers into a local SMTP stand-in
+#run from backend/: python -m benchmarks.reminders [--lessons 20000] [--students-per-lesson 4]
+#checks every participant gets exactly one reminder per lesson and prints throughput
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+SMTP_STAND_IN_PORT = 8025
+os.environ.setdefault("SECRET_KEY", "reminders")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("EMAIL_TOKEN_EXPIRE_MINUTES", "60")
+os.environ["SMTP_HOST"] = "127.0.0.1"
+os.environ["SMTP_PORT"] = str(SMTP_STAND_IN_PORT)
+os.environ["SMTP_START_TLS"] = "false"
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app import init_db  # noqa: F401 (registers every mapper)
+from app.database import Base
+from app.models.associations import LessonStudent, lesson_teachers
+from app.models.lesson import Lesson
+from app.models.organisation import Organisation
+from app.models.reminder import LessonReminder
+from app.models.user import User
+from app.reminders import REMINDER_LEAD, dispatch_due_reminders
+
+
+class SMTPStandIn:
+    """Accepts every message and records (recipient, subject)."""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.received = []
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._serve, daemon=True).start()
+        self.ready.wait()
+
+    def _serve(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(asyncio.start_server(self._session, "127.0.0.1", self.port))
+        self.ready.set()
+        self.loop.run_forever()
+
+    async def _session(self, reader, writer):
+        async def reply(line: str):
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        await reply("220 stand-in ready")
+        recipient = None
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode().strip().upper()
+            if command.startswith("EHLO"):
+                await reply("250-stand-in\r\n250 8BITMIME")
+            elif command.startswith("RCPT TO"):
+                recipient = line.decode().strip()[8:].strip("<>")
+                await reply("250 OK")
+            elif command == "DATA":
+                await reply("354 End data with <CR><LF>.<CR><LF>")
+                data = await reader.readuntil(b"\r\n.\r\n")
+                subject = next(
+                    (header[9:] for header in data.decode().split("\r\n") if header.startswith("Subject: ")),
+                    "",
+                )
+                self.received.append((recipient, subject))
+                await reply("250 OK queued")
+            elif command == "QUIT":
+                await reply("221 Bye")
+                break
+            else:
+                await reply("250 OK")
+        writer.close()
+
+
+def seed(Session, lesson_count: int, students_per_lesson: int, now: datetime) -> int:
+    db = Session()
+    organisation = Organisation(name="Reminder School")
+    db.add(organisation)
+    db.flush()
+
+    def users(prefix: str, role: str, count: int) -> list:
+        rows = [
+            {
+                "name": f"{prefix} {index}",
+                "email": f"{prefix.lower()}{index}@example.com",
+                "password": "x",
+                "role": role,
+                "organisation_id": organisation.id,
+                "is_verified": True,
+            }
+            for index in range(count)
+        ]
+        db.execute(insert(User), rows)
+        return list(db.execute(select(User.id).where(User.role == role).order_by(User.id)).scalars())
+
+    teacher_ids = users("Teacher", "teacher", 50)
+    student_ids = users("Student", "student", 2000)
+
+    # spread over the reminder window; the subject makes every lesson distinguishable in the inbox
+    step = (REMINDER_LEAD - timedelta(minutes=1)) / lesson_count
+    lessons = []
+    for index in range(lesson_count):
+        starts_at = now + timedelta(minutes=1) + step * index
+        lessons.append({
+            "date": starts_at.date(),
+            "time": starts_at.time().replace(microsecond=0),
+            "subject": f"Lesson {index}",
+            "duration": 60,
+            "location": "Room 1",
+            "price": 40,
+            "organisation_id": organisation.id,
+        })
+    db.execute(insert(Lesson), lessons)
+    lesson_ids = list(db.execute(select(Lesson.id).order_by(Lesson.id)).scalars())
+
+    db.execute(insert(lesson_teachers), [
+        {"lesson_id": lesson_id, "teacher_id": teacher_ids[index % len(teacher_ids)]}
+        for index, lesson_id in enumerate(lesson_ids)
+    ])
+    db.execute(insert(LessonStudent), [
+        {
+            "lesson_id": lesson_id,
+            "student_id": student_ids[(index * students_per_lesson + offset) % len(student_ids)],
+            "attendance_status": "assigned",
+            "payment_status": "unpaid",
+        }
+        for index, lesson_id in enumerate(lesson_ids)
+        for offset in range(students_per_lesson)
+    ])
+    db.commit()
+    db.close()
+    return lesson_count * (1 + students_per_lesson)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lessons", type=int, default=20000)
+    parser.add_argument("--students-per-lesson", type=int, default=4)
+    parser.add_argument("--dispatchers", type=int, default=2)
+    args = parser.parse_args()
+
+    stand_in = SMTPStandIn(SMTP_STAND_IN_PORT)
+    stand_in.start()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{directory}/reminders.db", connect_args={"timeout": 60})
+        Session = sessionmaker(bind=engine, autoflush=False)
+        Base.metadata.create_all(engine)
+
+        now = datetime.now().replace(microsecond=0)
+        expected = seed(Session, args.lessons, args.students_per_lesson, now)
+        print(f"{expected} reminders due for {args.lessons} lessons, {args.dispatchers} dispatchers")
+
+        results = []
+
+        def dispatcher():
+            db = Session()
+            try:
+                results.append(dispatch_due_reminders(db, now))
+            finally:
+                db.close()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=dispatcher) for _ in range(args.dispatchers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        with Session() as db:
+            markers = db.scalar(select(func.count()).select_from(LessonReminder).where(LessonReminder.sent_at.isnot(None)))
+            # a second pass must find nothing left to send
+            again = dispatch_due_reminders(db, now)
+
+        engine.dispose()
+
+    duplicates = sum(count - 1 for count in Counter(stand_in.received).values() if count > 1)
+    print(f"per dispatcher: {results}")
+    print(f"received {len(stand_in.received)}, markers {markers}, duplicates {duplicates}, second pass {again}")
+    print(f"{elapsed:.1f}s, {len(stand_in.received) / elapsed:.0f} reminders/s")
+
+    if len(stand_in.received) != expected or duplicates or again["sent"]:
+        raise SystemExit("reminder delivery check failed")
+
+
+if __name__ == "__main__":
+    main()
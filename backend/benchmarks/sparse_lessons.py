@@ -0,0 +1,74 @@
+#cost of a calendar view of GET /lessons/ with sparse fieldsets against full LessonRead documents
+#(cold and warm document cache), on an in-memory SQLite database
+#run from backend/: python -m benchmarks.sparse_lessons [--lessons 5000]   (needs httpx for the test client)
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("SECRET_KEY", "sparse-lessons")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("EMAIL_TOKEN_EXPIRE_MINUTES", "60")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.documents import lesson_documents
+from app.main import app
+from app.utils import create_access_token, get_tenant_db
+from tests.seed import seed
+
+RUNS = 10
+VARIANTS = [
+    ("full, cold cache", "/lessons/", True),
+    ("full, warm cache", "/lessons/", False),
+    ("fields=id,date,time,subject,location", "/lessons/?fields=id,date,time,subject,location", False),
+    ("include= (no rosters)", "/lessons/?include=", False),
+    ("include=teachers", "/lessons/?include=teachers", False),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lessons", type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    Base.metadata.create_all(engine)
+    seeded = seed(Session(), args.lessons)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_tenant_db] = override_get_db
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": str(seeded["callers"]["admin"])})}
+
+    print(f"GET /lessons/ with {args.lessons} lessons, median of {RUNS}")
+    baseline = None
+    for label, url, cold in VARIANTS:
+        timings, size = [], 0
+        for _ in range(RUNS):
+            if cold:
+                lesson_documents.clear()
+            started = time.perf_counter()
+            response = client.get(url, headers=headers)
+            timings.append(time.perf_counter() - started)
+            response.raise_for_status()
+            size = len(response.content)
+        median = statistics.median(timings)
+        baseline = baseline or median
+        print(f"  {label:<40}{median * 1000:>8.1f} ms {size / 1024:>8.0f} KiB  {baseline / median:>5.1f}x")
+    app.dependency_overrides.pop(get_tenant_db, None)
+
+
+if __name__ == "__main__":
+    main()
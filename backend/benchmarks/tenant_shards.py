@@ -0,0 +1,166 @@
+#tenant routing across two local SQLite databases: routes follow each organisation to its shard,
+#an organisation moved with app.tenancy keeps working (old tokens included) on the new one,
+#and an email registered on one shard can't sign up on another
+#run from backend/: python -m benchmarks.tenant_shards   (needs httpx for the test client; exits 1 on a failure)
+import json
+import os
+import sys
+import tempfile
+from datetime import date, time, timedelta
+
+directory = tempfile.mkdtemp()
+os.environ["DATABASE_SHARDS"] = json.dumps({
+    "default": f"sqlite:///{directory}/default.db",
+    "b": {"url": f"sqlite:///{directory}/b.db", "id_offset": 1000000},
+})
+os.environ["TENANT_CACHE_SECONDS"] = "0"
+os.environ.setdefault("SECRET_KEY", "tenant-shards")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("EMAIL_TOKEN_EXPIRE_MINUTES", "60")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app.main import app
+from app.models.associations import LessonStudent
+from app.models.lesson import Lesson
+from app.models.organisation import Organisation
+from app.models.series import LessonSeries
+from app.models.shard import OrganisationShard
+from app.models.user import User
+from app.tenancy import index_emails, move_organisation, prepare_shard, tenants
+from app.utils import hash_password
+
+PASSWORD = "correct horse"
+failures = []
+
+
+def check(condition: bool, message: str):
+    print(("ok    " if condition else "FAIL  ") + message)
+    if not condition:
+        failures.append(message)
+
+
+def seed_organisation(name: str, lesson_count: int) -> dict:
+    with tenants.session("default") as db:
+        organisation = Organisation(name=name)
+        db.add(organisation)
+        db.flush()
+
+        def user(role: str, index: int = 0) -> User:
+            return User(
+                name=f"{name} {role} {index}",
+                email=f"{role}{index}@{name.lower().replace(' ', '-')}.example.com",
+                password=hash_password(PASSWORD),
+                role=role,
+                organisation_id=organisation.id,
+                is_verified=True,
+            )
+
+        admin, teacher = user("admin"), user("teacher")
+        students = [user("student", index) for index in range(3)]
+        db.add_all([admin, teacher, *students])
+        db.flush()
+
+        for index in range(lesson_count):
+            db.add(Lesson(
+                date=date(2026, 1, 5) + timedelta(days=index),
+                time=time(10),
+                subject="Piano",
+                duration=60,
+                location="Room 1",
+                price=40,
+                organisation_id=organisation.id,
+                teachers=[teacher],
+                student_links=[
+                    LessonStudent(student=student, attendance_status="assigned", payment_status="unpaid")
+                    for student in students
+                ],
+            ))
+        db.add(LessonSeries(
+            organisation_id=organisation.id,
+            start_date=date(2026, 1, 5),
+            end_date=date(2026, 3, 30),
+            interval_weeks=1,
+            time=time(18),
+            subject="Ensemble",
+            duration=90,
+            location="Hall",
+            price=20,
+            teachers=[teacher],
+            students=students,
+        ))
+        db.commit()
+        return {"id": organisation.id, "admin": admin.email}
+
+
+def login(client: TestClient, email: str) -> dict:
+    response = client.post("/auth/login", data={"username": email, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": "Bearer " + response.json()["access_token"]}
+
+
+def count(shard: str, model, organisation_id: int) -> int:
+    with tenants.session(shard) as db:
+        return db.scalar(select(func.count()).select_from(model).where(model.organisation_id == organisation_id))
+
+
+def main():
+    for name in tenants.shards:
+        prepare_shard(name)
+
+    small = seed_organisation("Small School", 5)
+    big = seed_organisation("Big School", 40)
+    indexed = index_emails()
+    check(indexed == {"added": 10, "conflicts": []}, "index-emails puts the seeded users in the email directory")
+    client = TestClient(app)
+    small_headers, big_headers = login(client, small["admin"]), login(client, big["admin"])
+
+    def lesson_count(headers) -> int:
+        response = client.get("/lessons/", headers=headers)
+        response.raise_for_status()
+        return len(response.json())
+
+    before = {"small": lesson_count(small_headers), "big": lesson_count(big_headers)}
+    check(before["big"] > before["small"] > 0, f"both organisations served from the default shard {before}")
+
+    copied = move_organisation(big["id"], "b", drain_seconds=0)
+    print(f"      copied {copied}")
+    check(tenants.placement(big["id"]) == ("b", False), "directory points the big school at shard b")
+    check(count("default", Lesson, big["id"]) == 0 and count("default", User, big["id"]) == 0, "nothing of it left on default")
+    check(count("b", Lesson, big["id"]) == 40, "its lessons are on b")
+
+    check(lesson_count(big_headers) == before["big"], "a token issued before the move reads from b")
+    check(lesson_count(small_headers) == before["small"], "the small school is untouched")
+    check(lesson_count(login(client, big["admin"])) == before["big"], "login finds the moved users on b")
+    response = client.post("/users/", json={
+        "name": "Copy", "email": big["admin"], "role": "admin", "password": PASSWORD, "organisation_id": small["id"],
+    })
+    check(response.status_code == 400 and count("default", User, small["id"]) == 5,
+          "an email taken on shard b can't sign up again on default")
+
+    response = client.post("/lessons/admin", headers=big_headers, json={
+        "date": "2026-04-01", "time": "09:00:00", "subject": "Theory", "duration": 45,
+        "location": "Room 2", "price": 30, "organisation_id": big["id"], "teacher_ids": [], "student_ids": [],
+    })
+    check(response.status_code == 200 and count("b", Lesson, big["id"]) == 41, "new lessons are written to b")
+
+    with tenants.session("default") as db:
+        db.merge(OrganisationShard(organisation_id=big["id"], shard="b", moving=True))
+        db.commit()
+    tenants.forget(big["id"])
+    check(client.get("/lessons/", headers=big_headers).status_code == 503, "requests get a 503 while it is moving")
+    check(lesson_count(small_headers) == before["small"], "other organisations are not affected by the move")
+
+    move_organisation(big["id"], "default", drain_seconds=0)
+    with tenants.session("default") as db:
+        check(db.get(OrganisationShard, big["id"]) is None, "moving back to default removes the directory row")
+    check(count("b", Lesson, big["id"]) == 0 and count("default", Lesson, big["id"]) == 41, "and brings every lesson home")
+    check(lesson_count(big_headers) == before["big"] + 1, "the big school is served from default again")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
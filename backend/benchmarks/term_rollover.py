@@ -0,0 +1,173 @@
+#term rollover of a large timetable against a local SQLite file: dry run, the copy itself
+#(statement count stays flat, nothing is loaded into Python), statuses reset, reruns and clashes
+#run from backend/: python -m benchmarks.term_rollover [--lessons 10000]   (exits 1 on a failure)
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from datetime import time as clock
+
+os.environ.setdefault("SECRET_KEY", "term-rollover")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("EMAIL_TOKEN_EXPIRE_MINUTES", "60")
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app import init_db  # noqa: F401 (registers every mapper)
+from app.database import Base
+from app.models.associations import LessonStudent, lesson_teachers
+from app.models.lesson import Lesson
+from app.models.organisation import Organisation
+from app.models.series import LessonSeries
+from app.models.user import User
+from app.query_budget import QueryCounter
+from app.rollover import roll_over_lessons, shifted_date
+
+SOURCE_START, SOURCE_END = date(2026, 1, 5), date(2026, 3, 29)
+TARGET_START = date(2026, 4, 20)
+OFFSET = TARGET_START - SOURCE_START
+failures = []
+
+
+def check(condition: bool, message: str):
+    print(("ok    " if condition else "FAIL  ") + message)
+    if not condition:
+        failures.append(message)
+
+
+def seed(Session, lesson_count: int) -> dict:
+    db = Session()
+    organisation = Organisation(name="Rollover School")
+    db.add(organisation)
+    db.flush()
+
+    def users(role: str, count: int) -> list:
+        db.execute(insert(User), [
+            {"name": f"{role} {index}", "email": f"{role}{index}@example.com", "password": "x", "role": role,
+             "organisation_id": organisation.id, "is_verified": True}
+            for index in range(count)
+        ])
+        return list(db.execute(select(User.id).where(User.role == role).order_by(User.id)).scalars())
+
+    teacher_ids, student_ids = users("teacher", 40), users("student", 1500)
+    days = (SOURCE_END - SOURCE_START).days + 1
+    # one of 48 quarter-hour slots a day; with 40 teachers nobody is double-booked
+    slot = lambda index: index // days % 48
+    db.execute(insert(Lesson), [
+        {"date": SOURCE_START + timedelta(days=index % days), "time": clock(8 + slot(index) % 12, 15 * (slot(index) // 12)),
+         "subject": "Piano", "duration": 45, "location": f"Room {index % 9}", "price": 40,
+         "organisation_id": organisation.id}
+        for index in range(lesson_count)
+    ])
+    lesson_ids = list(db.execute(select(Lesson.id).order_by(Lesson.id)).scalars())
+    db.execute(insert(lesson_teachers), [
+        {"lesson_id": lesson_id, "teacher_id": teacher_ids[index // days % len(teacher_ids)]}
+        for index, lesson_id in enumerate(lesson_ids)
+    ])
+    # a finished term: everything attended and paid, which the copies must not inherit
+    db.execute(insert(LessonStudent), [
+        {"lesson_id": lesson_id, "student_id": student_ids[(index * 3 + offset) % len(student_ids)],
+         "attendance_status": "attended", "payment_status": "paid"}
+        for index, lesson_id in enumerate(lesson_ids)
+        for offset in range(1 + index % 3)
+    ])
+
+    # a series with one materialised occurrence; its 12 occurrences in the source term are skipped
+    series = LessonSeries(
+        organisation_id=organisation.id, start_date=SOURCE_START, end_date=TARGET_START + timedelta(weeks=12),
+        interval_weeks=1, time=clock(19), subject="Ensemble", duration=90, location="Hall", price=20,
+    )
+    db.add(series)
+    db.flush()
+    db.add(Lesson(date=SOURCE_START, time=clock(19), subject="Ensemble", duration=90, location="Hall", price=20,
+                  organisation_id=organisation.id, series_id=series.id, occurrence_date=SOURCE_START))
+
+    # already booked in the new term: the first lesson's teacher, from 15 minutes before its copy would start
+    first = db.execute(select(Lesson.date, Lesson.time).where(Lesson.id == lesson_ids[0])).one()
+    clashing = Lesson(date=first.date + OFFSET, time=clock(first.time.hour - 1, 45), subject="Exam", duration=30,
+                      location="Hall", price=0, organisation_id=organisation.id)
+    db.add(clashing)
+    db.flush()
+    db.execute(insert(lesson_teachers), [{"lesson_id": clashing.id, "teacher_id": teacher_ids[0]}])
+    organisation_id = organisation.id
+    db.commit()
+    db.close()
+    return {"organisation_id": organisation_id, "first_lesson_id": lesson_ids[0], "lessons": lesson_count}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lessons", type=int, default=10000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    engine = create_engine(f"sqlite:///{directory}/rollover.db")
+    Session = sessionmaker(bind=engine, autoflush=False)
+    Base.metadata.create_all(engine)
+    seeded = seed(Session, args.lessons)
+    organisation_id = seeded["organisation_id"]
+
+    def count(model_or_table) -> int:
+        with Session() as db:
+            return db.scalar(select(func.count()).select_from(model_or_table))
+
+    def rollover(dry_run: bool):
+        with Session() as db, QueryCounter(engine) as queries:
+            started = time.perf_counter()
+            result = roll_over_lessons(db, organisation_id, SOURCE_START, SOURCE_END, TARGET_START, dry_run=dry_run)
+            if not dry_run:
+                db.commit()
+            return result, time.perf_counter() - started, queries.count
+
+    before = (count(Lesson), count(lesson_teachers), count(LessonStudent))
+    plan, elapsed, statements = rollover(dry_run=True)
+    print(f"      dry run: {elapsed * 1000:.0f} ms, {statements} statements, would copy {plan['lessons']} lessons")
+    check((count(Lesson), count(lesson_teachers), count(LessonStudent)) == before, "a dry run writes nothing")
+    check(
+        plan["skipped_series_lessons"] == 12 and plan["conflict_count"] == 1
+        and plan["conflicts"][0]["lesson_id"] == seeded["first_lesson_id"],
+        "it reports the series occurrences and the overlap with the lesson already booked",
+    )
+
+    result, elapsed, statements = rollover(dry_run=False)
+    print(f"      rollover: {result['lessons']} lessons, {result['lesson_teachers']} teachers, "
+          f"{result['lesson_students']} students in {elapsed:.2f} s with {statements} statements")
+    check(
+        all(result[key] == plan[key] for key in ("lessons", "lesson_teachers", "lesson_students", "conflict_count")),
+        "the rollover does what the dry run said",
+    )
+    check(result["lessons"] == seeded["lessons"] - 1, "every lesson but the clashing one is copied")
+    check(statements <= 12, "a fixed number of statements, however many lessons")
+
+    with Session() as db:
+        copies = select(Lesson.id).where(Lesson.copied_from_id.is_not(None))
+        statuses = db.execute(
+            select(LessonStudent.attendance_status, LessonStudent.payment_status, func.count())
+            .where(LessonStudent.lesson_id.in_(copies))
+            .group_by(LessonStudent.attendance_status, LessonStudent.payment_status)
+        ).all()
+        original = Lesson.__table__.alias("original")
+        misplaced = db.scalar(
+            select(func.count()).select_from(Lesson).join(original, Lesson.copied_from_id == original.c.id)
+            .where(Lesson.date != shifted_date(original.c.date, OFFSET.days, "sqlite"))
+        )
+        first_copy, last_copy = db.execute(
+            select(func.min(Lesson.date), func.max(Lesson.date)).where(Lesson.copied_from_id.is_not(None))
+        ).one()
+    check(len(statuses) == 1 and statuses[0][:2] == ("assigned", "unpaid"), "copied rosters start assigned and unpaid")
+    check(misplaced == 0 and first_copy >= TARGET_START and last_copy <= SOURCE_END + OFFSET,
+          "each copy is moved by the offset into the target range")
+
+    again, _, _ = rollover(dry_run=False)
+    check(again["lessons"] == 0 and again["skipped_already_copied"] == result["lessons"],
+          "running it again copies nothing")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
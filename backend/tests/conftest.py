@@ -0,0 +1,111 @@
+#shared fixtures: an in-memory SQLite database and a local SMTP server standing in for the real one
+#run from backend/: python -m pytest
+import asyncio
+import email
+import os
+import threading
+
+os.environ.setdefault("SECRET_KEY", "tests")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("EMAIL_TOKEN_EXPIRE_MINUTES", "60")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import email as app_email
+from app import init_db  # noqa: F401 (registers every mapper)
+from app.database import Base
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def Session(engine):
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+class FakeSMTPServer:
+    """Accepts mail on a free local port and keeps every message.
+
+    Addresses in reject are refused at RCPT TO, like a mailbox that doesn't exist.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.reject = set()
+        self.port = None
+        self._loop = asyncio.new_event_loop()
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        ready = threading.Event()
+
+        def serve():
+            asyncio.set_event_loop(self._loop)
+            self._server = self._loop.run_until_complete(asyncio.start_server(self._session, "127.0.0.1", 0))
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._server.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def recipients(self) -> list:
+        return sorted(message["To"] for message in self.messages)
+
+    async def _session(self, reader, writer):
+        async def reply(line: str):
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        await reply("220 fake smtp ready")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode().strip()
+            verb = command.upper()
+            if verb.startswith("EHLO"):
+                await reply("250-fake smtp\r\n250 8BITMIME")
+            elif verb.startswith("RCPT TO"):
+                recipient = command[8:].strip().strip("<>")
+                await reply("550 No such user" if recipient in self.reject else "250 OK")
+            elif verb == "DATA":
+                await reply("354 End data with <CR><LF>.<CR><LF>")
+                data = (await reader.readuntil(b"\r\n.\r\n"))[:-5].replace(b"\r\n..", b"\r\n.")
+                self.messages.append(email.message_from_bytes(data))
+                await reply("250 OK queued")
+            elif verb == "QUIT":
+                await reply("221 Bye")
+                break
+            else:
+                await reply("250 OK")
+        writer.close()
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    server = FakeSMTPServer()
+    server.start()
+    monkeypatch.setattr(app_email, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(app_email, "SMTP_PORT", server.port)
+    monkeypatch.setattr(app_email, "SMTP_START_TLS", False)
+    monkeypatch.setattr(app_email, "SMTP_USER", None)
+    monkeypatch.setattr(app_email, "SMTP_PASS", None)
+    yield server
+    server.stop()
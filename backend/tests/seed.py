@@ -0,0 +1,108 @@
+#a small school with every kind of row the lesson, user, invoice and payroll routes read:
+#lessons with rosters, a series and archived history; shared by the query budget tests and benchmarks
+from datetime import date, datetime, time, timedelta
+
+from app.models.archive import ArchivedLesson, ArchivedLessonStudent, archive_lesson_teachers
+from app.models.associations import LessonStudent
+from app.models.lesson import Lesson
+from app.models.organisation import Organisation
+from app.models.series import LessonSeries
+from app.models.user import User
+
+
+def seed(session, lesson_count: int) -> dict:
+    organisation = Organisation(name="Budget School")
+    session.add(organisation)
+    session.flush()
+
+    def user(name, role):
+        return User(
+            name=name,
+            email=f"{name.lower().replace(' ', '.')}@example.com",
+            password="x",
+            role=role,
+            organisation_id=organisation.id,
+            is_verified=True,
+        )
+
+    admin = user("Admin", "admin")
+    teachers = [user(f"Teacher {i}", "teacher") for i in range(3)]
+    students = [user(f"Student {i}", "student") for i in range(8)]
+    session.add_all([admin, *teachers, *students])
+    session.flush()
+
+    first_day = date(2026, 1, 5)
+    for index in range(lesson_count):
+        lesson = Lesson(
+            date=first_day + timedelta(days=index),
+            time=time(9 + index % 8),
+            subject="Piano",
+            duration=60,
+            location="Room 1",
+            price=40,
+            organisation_id=organisation.id,
+            teachers=[teachers[0], teachers[1 + index % 2]],
+        )
+        for offset in range(1 + index % 4):
+            lesson.student_links.append(LessonStudent(
+                student=students[1 + (index + offset) % (len(students) - 1)] if offset else students[0],
+                attendance_status="assigned",
+                payment_status="unpaid",
+            ))
+        session.add(lesson)
+
+    session.add(LessonSeries(
+        organisation_id=organisation.id,
+        start_date=first_day,
+        end_date=first_day + timedelta(weeks=lesson_count // 5),
+        interval_weeks=1,
+        time=time(18),
+        subject="Ensemble",
+        duration=90,
+        location="Hall",
+        price=20,
+        teachers=[teachers[0]],
+        students=students[:4],
+    ))
+    # closed-term history, as app.archive leaves it (ids kept, no foreign keys)
+    for index in range(lesson_count // 5):
+        lesson_date = first_day - timedelta(days=index + 1)
+        lesson_id = 1_000_000 + index
+        session.add(ArchivedLesson(
+            id=lesson_id,
+            date=lesson_date,
+            time=time(10),
+            subject="Theory",
+            duration=60,
+            location="Room 1",
+            price=40,
+            organisation_id=organisation.id,
+            updated_at=datetime(2025, 12, 1),
+        ))
+        session.execute(archive_lesson_teachers.insert().values(
+            lesson_id=lesson_id, lesson_date=lesson_date, teacher_id=teachers[0].id,
+        ))
+        session.add(ArchivedLessonStudent(
+            lesson_id=lesson_id,
+            lesson_date=lesson_date,
+            student_id=students[index % len(students)].id,
+            attendance_status="attended",
+            payment_status="paid",
+            updated_at=datetime(2025, 12, 1),
+        ))
+    session.commit()
+
+    first_lesson = session.query(Lesson).order_by(Lesson.id).first()
+    # batch lookups ask for every live and archived lesson (and every user), plus an id that doesn't exist
+    lesson_ids = [row.id for row in session.query(Lesson.id)] + [row.id for row in session.query(ArchivedLesson.id)]
+    user_ids = [row.id for row in session.query(User.id)]
+    return {
+        "callers": {"admin": admin.id, "teacher": teachers[0].id, "student": students[0].id},
+        "ids": {
+            "lesson_id": first_lesson.id,
+            "student_id": students[0].id,
+            "teacher_id": teachers[0].id,
+            "lesson_ids": ",".join(map(str, lesson_ids + [999_999_999])),
+            "user_ids": ",".join(map(str, user_ids + [999_999_999])),
+        },
+    }
@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes import events as event_routes
+from app.audit import audit_log
+from app.events import InMemoryBackend, bus
+from app.main import app
+from app.models.organisation import Organisation
+from app.models.user import User
+from app.utils import create_access_token, get_tenant_db
+
+
+@pytest.fixture
+def client(Session, monkeypatch):
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setitem(app.dependency_overrides, get_tenant_db, override_get_db)
+    monkeypatch.setattr(audit_log, "session_for", lambda organisation_id: Session())
+    # the single-worker backend delivers straight to this process's subscriptions
+    monkeypatch.setattr(bus, "backend", InMemoryBackend())
+    bus.start()
+    yield TestClient(app)
+    audit_log.flush()
+
+
+@pytest.fixture
+def school(Session):
+    with Session() as db:
+        organisations = [Organisation(name="Event School"), Organisation(name="Other School")]
+        db.add_all(organisations)
+        db.flush()
+        people = {
+            name: User(name=name.title(), email=f"{name}@example.com", password="x", role=role,
+                       organisation_id=organisations[name == "outsider"].id, is_verified=True)
+            for name, role in [("admin", "admin"), ("teacher", "teacher"), ("student", "student"),
+                               ("bystander", "student"), ("outsider", "admin")]
+        }
+        db.add_all(people.values())
+        db.commit()
+        return {
+            "organisation_id": organisations[0].id,
+            "users": {name: (user.id, user.organisation_id, user.role) for name, user in people.items()},
+            "headers": {
+                name: {"Authorization": "Bearer " + create_access_token({"sub": str(user.id)})}
+                for name, user in people.items()
+            },
+        }
+
+
+def deliveries(school, calls) -> dict:
+    """Make calls (from a worker thread, like request handlers) with everyone subscribed; {name: [(type, lesson_id)]}."""
+    async def run():
+        subs = {
+            name: bus.subscribe(user_id, organisation_id, is_admin=role == "admin")
+            for name, (user_id, organisation_id, role) in school["users"].items()
+        }
+        try:
+            for call in calls:
+                await asyncio.to_thread(call)
+            await asyncio.sleep(0)
+            received = {name: [] for name in subs}
+            for name, sub in subs.items():
+                while not sub.queue.empty():
+                    message = sub.queue.get_nowait()
+                    received[name].append((message["type"], message["lesson_id"]))
+            return received
+        finally:
+            for sub in subs.values():
+                bus.unsubscribe(sub)
+
+    return asyncio.run(run())
+
+
+def test_lesson_writes_reach_its_teachers_students_and_admins_only(client, school):
+    student_id = school["users"]["student"][0]
+    body = {
+        "date": "2026-03-02", "time": "16:00", "subject": "Piano", "duration": 1, "location": "Room 1", "price": 40,
+        "organisation_id": school["organisation_id"], "teacher_ids": [school["users"]["teacher"][0]], "student_ids": [student_id],
+    }
+    created = {}
+
+    def create():
+        response = client.post("/lessons/", headers=school["headers"]["teacher"], json=body)
+        assert response.status_code == 200, response.text
+        created["id"] = response.json()["id"]
+
+    def update():
+        response = client.put(f"/lessons/{created['id']}", headers=school["headers"]["teacher"], json={**body, "subject": "Organ"})
+        assert response.status_code == 200, response.text
+
+    def mark_attended():
+        response = client.patch(f"/lessons/{created['id']}/students/{student_id}", headers=school["headers"]["teacher"],
+                                json={"attendance_status": "attended"})
+        assert response.status_code == 200, response.text
+
+    def delete():
+        assert client.delete(f"/lessons/admin/{created['id']}", headers=school["headers"]["admin"]).status_code == 204
+
+    received = deliveries(school, [create, update, mark_attended, delete])
+
+    expected = [(event_type, created["id"]) for event_type in
+                ("lesson.created", "lesson.updated", "lesson_student.updated", "lesson.deleted")]
+    assert received["teacher"] == received["student"] == received["admin"] == expected
+    assert received["bystander"] == received["outsider"] == []
+
+
+def test_the_stream_sends_ready_then_the_callers_events(Session, client, school, monkeypatch):
+    user_id, organisation_id, _ = school["users"]["student"]
+    monkeypatch.setattr(event_routes, "tenant_session", lambda organisation_id: Session())
+
+    class ConnectedRequest:
+        async def is_disconnected(self):
+            return False
+
+    async def stream():
+        token = create_access_token({"sub": str(user_id)})
+        response = await event_routes.stream_events(ConnectedRequest(), token=token, bearer=None)
+        assert response.media_type == "text/event-stream"
+        events = response.body_iterator
+        try:
+            ready = await anext(events)
+            bus.publish("lesson.updated", 99, organisation_id, [school["users"]["bystander"][0]])
+            bus.publish("lesson.created", 7, organisation_id, [user_id])
+            return ready, await asyncio.wait_for(anext(events), timeout=5)
+        finally:
+            await events.aclose()
+
+    ready, created = asyncio.run(stream())
+    assert ready == f'event: ready\ndata: {{"user_id": {user_id}}}\n\n'
+    assert created == 'event: lesson.created\ndata: {"lesson_id": 7}\n\n'
@@ -0,0 +1,75 @@
+import json
+from datetime import date
+
+import pytest
+
+from app import invoicing
+from app.models.invoice import InvoiceRun
+from app.models.organisation import Organisation
+from app.models.shard import OrganisationShard
+from app.tenancy import TenantRouter, load_shards, prepare_shard
+
+
+@pytest.fixture
+def router(tmp_path, monkeypatch):
+    router = TenantRouter(load_shards(json.dumps({"default": f"sqlite:///{tmp_path}/default.db"})), cache_seconds=0)
+    prepare_shard("default", router)
+    monkeypatch.setattr(invoicing, "tenants", router)
+    yield router
+    router.engine("default").dispose()
+
+
+@pytest.fixture
+def run(router) -> dict:
+    with router.session("default") as db:
+        organisation = Organisation(name="Invoice School")
+        db.add(organisation)
+        db.flush()
+        run = InvoiceRun(organisation_id=organisation.id, period_start=date(2026, 3, 1), status="pending")
+        db.add(run)
+        db.commit()
+        return {"id": run.id, "organisation_id": organisation.id}
+
+
+def set_moving(router: TenantRouter, organisation_id: int):
+    with router.session("default") as db:
+        db.merge(OrganisationShard(organisation_id=organisation_id, shard="default", moving=True))
+        db.commit()
+
+
+def stored_run(router: TenantRouter, run_id: int) -> InvoiceRun:
+    with router.session("default") as db:
+        return db.get(InvoiceRun, run_id)
+
+
+def test_a_run_for_a_moving_organisation_fails_retryably_instead_of_staying_pending(router, run):
+    set_moving(router, run["organisation_id"])
+
+    invoicing.run_invoice_generation(run["id"], run["organisation_id"])
+
+    failed = stored_run(router, run["id"])
+    assert (failed.status, failed.retryable) == ("failed", True)
+    assert failed.error == "Organisation is being moved, try again shortly" and failed.finished_at is not None
+
+
+def test_a_move_starting_mid_run_stops_it_at_the_next_stage(router, run, monkeypatch):
+    def occurrence_lines(db, organisation_id, period_start):
+        set_moving(router, organisation_id)
+        return []
+
+    monkeypatch.setattr(invoicing, "occurrence_lines", occurrence_lines)
+    invoicing.run_invoice_generation(run["id"], run["organisation_id"])
+
+    failed = stored_run(router, run["id"])
+    assert (failed.status, failed.stage, failed.retryable) == ("failed", "occurrences", True)
+
+
+def test_other_failures_are_recorded_and_not_raised(router, run, monkeypatch):
+    def occurrence_lines(db, organisation_id, period_start):
+        raise ValueError("bad price")
+
+    monkeypatch.setattr(invoicing, "occurrence_lines", occurrence_lines)
+    invoicing.run_invoice_generation(run["id"], run["organisation_id"])
+
+    failed = stored_run(router, run["id"])
+    assert (failed.status, failed.retryable, failed.error) == ("failed", False, "bad price")
@@ -0,0 +1,91 @@
+#per-endpoint SQL statement budgets, checked at several data sizes against an in-memory SQLite database
+#a budget is a fixed maximum with a little headroom over today's count, so a route whose count grows
+#with the data (an N+1) fails at the larger sizes while an extra lookup or two doesn't
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.audit import audit_log
+from app.database import Base
+from app.documents import lesson_documents
+from app.main import app
+from app.query_budget import QueryCounter
+from app.utils import create_access_token, get_tenant_db
+from tests.seed import seed
+
+SIZES = (5, 50, 200)
+
+# (method, path, caller, budget); paths are formatted with the seeded ids
+BUDGETS = [
+    ("GET", "/lessons/", "admin", 12),
+    ("GET", "/lessons/?fields=id,date,time,subject,location", "admin", 8),
+    ("GET", "/lessons/?include=teachers", "admin", 9),
+    ("GET", "/lessons/my-lessons", "teacher", 12),
+    ("GET", "/lessons/my-lessons-student", "student", 12),
+    ("GET", "/lessons/changes", "admin", 12),
+    ("GET", "/lessons/archived", "admin", 7),
+    ("GET", "/lessons/archived?fields=id,date,time&include=student_links", "admin", 5),
+    ("GET", "/lessons/{lesson_id}", "teacher", 8),
+    ("GET", "/lessons/batch?ids={lesson_ids}", "admin", 13),
+    ("GET", "/lessons/admin/students/{student_id}/lessons", "admin", 13),
+    ("GET", "/lessons/admin/teachers/{teacher_id}/lessons", "admin", 13),
+    ("PATCH", "/lessons/{lesson_id}/students/{student_id}", "teacher", 10),
+    # includes flushing the audit event the PATCH above buffered
+    ("GET", "/audit/", "admin", 5),
+    ("GET", "/lesson-series/", "admin", 6),
+    ("GET", "/users/", "admin", 4),
+    ("GET", "/users/batch?ids={user_ids}", "admin", 4),
+    ("GET", "/users/search", "admin", 4),
+    ("GET", "/invoices/", "admin", 4),
+    ("GET", "/payroll/?year=2026&month=1", "admin", 16),
+]
+
+BODIES = {
+    "PATCH": {"attendance_status": "attended"},
+}
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda size: f"{size}-lessons")
+def budget_school(request):
+    """(client, engine, seeded ids) for a school of the given size, with the app's sessions pointed at it."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    Base.metadata.create_all(engine)
+    with Session() as db:
+        seeded = seed(db, request.param)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    session_for = audit_log.session_for
+    app.dependency_overrides[get_tenant_db] = override_get_db
+    audit_log.session_for = lambda organisation_id: Session()
+    try:
+        yield TestClient(app), engine, seeded
+    finally:
+        app.dependency_overrides.pop(get_tenant_db, None)
+        audit_log.session_for = session_for
+        engine.dispose()
+
+
+@pytest.mark.parametrize(
+    "method, path, caller, budget", BUDGETS, ids=[f"{method} {path}" for method, path, _, _ in BUDGETS]
+)
+def test_query_budget(budget_school, method, path, caller, budget):
+    client, engine, seeded = budget_school
+    url = path.format(**seeded["ids"])
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": str(seeded["callers"][caller])})}
+
+    # budgets are for a cold document cache
+    lesson_documents.clear()
+    with QueryCounter(engine) as queries:
+        response = client.request(method, url, headers=headers, json=BODIES.get(method))
+
+    assert response.status_code < 400, response.text
+    queries.check(budget, f"{method} {path} as {caller}")
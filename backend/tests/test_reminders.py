@@ -0,0 +1,139 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.associations import LessonStudent
+from app.models.lesson import Lesson
+from app.models.organisation import Organisation
+from app.models.reminder import LessonReminder
+from app.models.series import LessonSeries
+from app.models.user import User
+from app.reminders import dispatch_due_reminders
+from app.series import materialise_occurrence
+
+# a Monday morning; the default REMINDER_LEAD covers the next 24 hours
+NOW = datetime(2026, 3, 2, 8, 0)
+
+
+@pytest.fixture
+def school(Session):
+    with Session() as db:
+        organisation = Organisation(name="Reminder School")
+        db.add(organisation)
+        db.flush()
+
+        def user(name: str, role: str, is_verified: bool = True) -> User:
+            return User(name=name, email=f"{name.lower()}@example.com", password="x", role=role,
+                        organisation_id=organisation.id, is_verified=is_verified)
+
+        people = {
+            "teacher": user("Teacher", "teacher"),
+            "student": user("Student", "student"),
+            "unverified": user("Unverified", "student", is_verified=False),
+            "cancelled": user("Cancelled", "student"),
+        }
+        db.add_all(people.values())
+        db.commit()
+        yield db, organisation, people
+
+
+def add_lesson(db, organisation, teacher, students, starts_at: datetime, cancelled=()) -> Lesson:
+    lesson = Lesson(
+        date=starts_at.date(), time=starts_at.time(), subject="Piano", duration=60, location="Room 1", price=40,
+        organisation_id=organisation.id, teachers=[teacher],
+        student_links=[
+            LessonStudent(student=student, payment_status="unpaid",
+                          attendance_status="cancelled" if student in cancelled else "assigned")
+            for student in students
+        ],
+    )
+    db.add(lesson)
+    db.commit()
+    return lesson
+
+
+def dispatch(Session) -> dict:
+    with Session() as db:
+        return dispatch_due_reminders(db, NOW)
+
+
+def test_each_participant_is_reminded_once(Session, smtp_server, school):
+    db, organisation, people = school
+    add_lesson(db, organisation, people["teacher"], [people["student"]], NOW + timedelta(hours=2))
+    # outside the window
+    add_lesson(db, organisation, people["teacher"], [people["student"]], NOW + timedelta(days=2))
+
+    assert dispatch(Session) == {"sent": 2, "failed": 0}
+    assert smtp_server.recipients() == ["student@example.com", "teacher@example.com"]
+    assert smtp_server.messages[0]["Subject"] == "Reminder: Piano on Mon 02 Mar at 10:00"
+
+    assert dispatch(Session) == {"sent": 0, "failed": 0}
+    assert len(smtp_server.messages) == 2
+
+
+def test_unverified_and_cancelled_students_are_skipped(Session, smtp_server, school):
+    db, organisation, people = school
+    students = [people["student"], people["unverified"], people["cancelled"]]
+    add_lesson(db, organisation, people["teacher"], students, NOW + timedelta(hours=3), cancelled=[people["cancelled"]])
+
+    dispatch(Session)
+    assert smtp_server.recipients() == ["student@example.com", "teacher@example.com"]
+
+
+def add_series(db, organisation, people) -> LessonSeries:
+    series = LessonSeries(
+        organisation_id=organisation.id, start_date=NOW.date() - timedelta(weeks=4), end_date=NOW.date() + timedelta(weeks=8),
+        interval_weeks=1, time=time(17), subject="Ensemble", duration=90, location="Hall", price=20,
+        teachers=[people["teacher"]], students=[people["student"], people["unverified"]],
+    )
+    db.add(series)
+    db.commit()
+    return series
+
+
+def test_series_occurrences_are_reminded_without_being_stored(Session, smtp_server, school):
+    db, organisation, people = school
+    series = add_series(db, organisation, people)
+
+    assert dispatch(Session) == {"sent": 2, "failed": 0}
+    assert smtp_server.recipients() == ["student@example.com", "teacher@example.com"]
+    assert all(message["Subject"].startswith("Reminder: Ensemble on Mon 02 Mar") for message in smtp_server.messages)
+
+    assert dispatch(Session) == {"sent": 0, "failed": 0}
+    with Session() as check:
+        assert check.scalar(select(func.count()).select_from(Lesson)) == 0
+        markers = check.execute(select(LessonReminder.series_id, LessonReminder.occurrence_date, LessonReminder.lesson_id)).all()
+        assert markers == [(series.id, NOW.date(), None)] * 2
+
+
+def test_an_occurrence_stored_after_its_reminder_is_not_reminded_again(Session, smtp_server, school):
+    db, organisation, people = school
+    series = add_series(db, organisation, people)
+    dispatch(Session)
+
+    # e.g. a status change materialises the occurrence after the reminder went out
+    materialise_occurrence(db, series, NOW.date())
+    db.commit()
+    assert dispatch(Session) == {"sent": 0, "failed": 0}
+
+    # moving it makes it due again, as for any lesson
+    lesson = db.execute(select(Lesson).where(Lesson.series_id == series.id)).scalar_one()
+    lesson.time = time(18)
+    db.commit()
+    assert dispatch(Session) == {"sent": 2, "failed": 0}
+
+
+def test_failed_sends_are_retried_on_the_next_pass(Session, smtp_server, school):
+    db, organisation, people = school
+    add_lesson(db, organisation, people["teacher"], [people["student"]], NOW + timedelta(hours=2))
+    smtp_server.reject.add("student@example.com")
+
+    assert dispatch(Session) == {"sent": 1, "failed": 1}
+    assert smtp_server.recipients() == ["teacher@example.com"]
+
+    smtp_server.reject.clear()
+    assert dispatch(Session) == {"sent": 1, "failed": 0}
+    assert smtp_server.recipients() == ["student@example.com", "teacher@example.com"]
+    with Session() as check:
+        assert check.scalar(select(func.count()).select_from(Lesson)) == 1
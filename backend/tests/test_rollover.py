@@ -0,0 +1,164 @@
+import asyncio
+from datetime import date, time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.audit import audit_log
+from app.events import EventBus, InMemoryBackend, bus
+from app.main import app
+from app.models.associations import LessonStudent
+from app.models.audit import AuditEvent
+from app.models.lesson import Lesson
+from app.models.organisation import Organisation
+from app.models.series import LessonSeries
+from app.models.user import User
+from app.rollover import roll_over_lessons
+from app.utils import create_access_token, get_tenant_db
+
+ROLLOVER = {"source_start": "2026-01-05", "source_end": "2026-03-29", "target_start": "2026-04-20"}
+
+
+class RecordingBackend(InMemoryBackend):
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def publish(self, event: dict):
+        self.events.append(event)
+
+
+@pytest.fixture
+def client(Session, monkeypatch):
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setitem(app.dependency_overrides, get_tenant_db, override_get_db)
+    monkeypatch.setattr(audit_log, "session_for", lambda organisation_id: Session())
+    monkeypatch.setattr(bus, "backend", RecordingBackend())
+    yield TestClient(app)
+    audit_log.flush()
+
+
+@pytest.fixture
+def school(Session):
+    with Session() as db:
+        organisation = Organisation(name="Rollover School")
+        db.add(organisation)
+        db.flush()
+        admin, teacher, student = (
+            User(name=role.title(), email=f"{role}@example.com", password="x", role=role,
+                 organisation_id=organisation.id, is_verified=True)
+            for role in ("admin", "teacher", "student")
+        )
+        db.add_all([admin, teacher, student])
+        db.add_all(
+            Lesson(date=lesson_date, time=time(16), subject="Piano", duration=45, location="Room 1", price=40,
+                   organisation_id=organisation.id, teachers=[teacher],
+                   student_links=[LessonStudent(student=student, attendance_status="attended", payment_status="paid")])
+            for lesson_date in (date(2026, 1, 5), date(2026, 1, 12))
+        )
+        db.commit()
+        return {
+            "organisation_id": organisation.id,
+            "teacher_id": teacher.id,
+            "headers": {"Authorization": "Bearer " + create_access_token({"sub": str(admin.id)})},
+        }
+
+
+def rolled_over_events(Session) -> list:
+    audit_log.flush()
+    with Session() as db:
+        return db.execute(select(AuditEvent).where(AuditEvent.action == "lessons.rolled_over")).scalars().all()
+
+
+def test_rollover_records_one_summary_event_and_publishes_once(Session, client, school):
+    response = client.post("/lessons/admin/rollover", headers=school["headers"], json=ROLLOVER)
+    assert response.status_code == 200 and response.json()["lessons"] == 2
+
+    (event,) = rolled_over_events(Session)
+    assert event.lesson_id is None and event.organisation_id == school["organisation_id"]
+    assert event.changes == {
+        "source_start": [None, "2026-01-05"],
+        "source_end": [None, "2026-03-29"],
+        "target_start": [None, "2026-04-20"],
+        "lessons": [None, 2],
+        "lesson_teachers": [None, 2],
+        "lesson_students": [None, 2],
+    }
+
+    (published,) = bus.backend.events
+    assert published["type"] == "lessons.rolled_over" and published["organisation_wide"]
+    assert published["organisation_id"] == school["organisation_id"]
+
+
+def test_dry_runs_and_empty_rollovers_record_nothing(Session, client, school):
+    client.post("/lessons/admin/rollover", headers=school["headers"], json={**ROLLOVER, "dry_run": True})
+    client.post("/lessons/admin/rollover", headers=school["headers"], json=ROLLOVER)
+    # everything is already copied
+    response = client.post("/lessons/admin/rollover", headers=school["headers"], json=ROLLOVER)
+    assert response.json()["lessons"] == 0
+
+    assert len(rolled_over_events(Session)) == 1
+    assert len(bus.backend.events) == 1
+
+
+def test_organisation_wide_events_reach_every_subscriber_of_the_organisation():
+    async def deliver():
+        local = EventBus(InMemoryBackend())
+        local.start()
+        student = local.subscribe(user_id=1, organisation_id=10, is_admin=False)
+        admin = local.subscribe(user_id=2, organisation_id=10, is_admin=True)
+        elsewhere = local.subscribe(user_id=3, organisation_id=20, is_admin=False)
+        local.publish("lessons.rolled_over", None, 10, (), organisation_wide=True)
+        await asyncio.sleep(0)
+        return student.queue.qsize(), admin.queue.qsize(), elsewhere.queue.qsize()
+
+    assert asyncio.run(deliver()) == (1, 1, 0)
+
+
+def roll_over(Session, school, dry_run: bool = True) -> dict:
+    with Session() as db:
+        result = roll_over_lessons(db, school["organisation_id"], date(2026, 1, 5), date(2026, 3, 29), date(2026, 4, 20), dry_run=dry_run)
+        db.commit()
+        return result
+
+
+def test_copies_overlapping_a_booked_lesson_or_series_occurrence_clash(Session, school):
+    with Session() as db:
+        teacher = db.get(User, school["teacher_id"])
+        # 15:30-16:30 overlaps the 16:00 copy on 2026-04-20 without starting at the same time
+        db.add(Lesson(date=date(2026, 4, 20), time=time(15, 30), subject="Exam", duration=60, location="Hall", price=0,
+                      organisation_id=school["organisation_id"], teachers=[teacher]))
+        # a weekly 16:30 series from 2026-04-27 overlaps the copy of the 2026-01-12 lesson
+        db.add(LessonSeries(organisation_id=school["organisation_id"], start_date=date(2026, 4, 27), end_date=date(2026, 6, 1),
+                            time=time(16, 30), subject="Ensemble", duration=60, location="Hall", price=20, teachers=[teacher]))
+        # back to back with the first copy, which is not a clash
+        db.add(Lesson(date=date(2026, 4, 20), time=time(16, 45), subject="Theory", duration=30, location="Hall", price=0,
+                      organisation_id=school["organisation_id"], teachers=[teacher]))
+        db.commit()
+
+    plan = roll_over(Session, school)
+    assert plan["conflict_count"] == 2 and plan["lessons"] == 0
+    assert [str(conflict["date"]) for conflict in plan["conflicts"]] == ["2026-04-20", "2026-04-27"]
+    assert roll_over(Session, school, dry_run=False)["lessons"] == 0
+
+
+def test_series_occurrences_in_the_source_range_are_reported_as_skipped(Session, school):
+    with Session() as db:
+        # Mondays 2026-03-02 .. 2026-03-23 in the source range, one of them stored
+        series = LessonSeries(organisation_id=school["organisation_id"], start_date=date(2026, 3, 2), end_date=date(2026, 3, 23),
+                              time=time(18), subject="Ensemble", duration=60, location="Hall", price=20)
+        db.add(series)
+        db.flush()
+        db.add(Lesson(date=date(2026, 3, 2), time=time(18), subject="Ensemble", duration=60, location="Hall", price=20,
+                      organisation_id=school["organisation_id"], series_id=series.id, occurrence_date=date(2026, 3, 2)))
+        db.commit()
+
+    plan = roll_over(Session, school)
+    assert plan["source_lessons"] == 6 and plan["skipped_series_lessons"] == 4 and plan["lessons"] == 2
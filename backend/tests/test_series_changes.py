@@ -0,0 +1,110 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.audit import audit_log
+from app.events import bus
+from app.main import app
+from app.models.organisation import Organisation
+from app.models.user import User
+from app.utils import create_access_token, get_tenant_db
+from tests.test_rollover import RecordingBackend
+
+SERIES = {
+    "start_date": "2026-03-02", "end_date": "2026-03-16", "time": "16:00", "subject": "Piano",
+    "duration": 1, "location": "Room 1", "price": 40,
+}
+
+
+@pytest.fixture
+def client(Session, monkeypatch):
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setitem(app.dependency_overrides, get_tenant_db, override_get_db)
+    monkeypatch.setattr(audit_log, "session_for", lambda organisation_id: Session())
+    monkeypatch.setattr(bus, "backend", RecordingBackend())
+    yield TestClient(app)
+    audit_log.flush()
+
+
+@pytest.fixture
+def school(Session):
+    with Session() as db:
+        organisation = Organisation(name="Series School")
+        db.add(organisation)
+        db.flush()
+        people = {
+            role: User(name=role.title(), email=f"{role}@example.com", password="x", role=role.rstrip("2"),
+                       organisation_id=organisation.id, is_verified=True)
+            for role in ("admin", "teacher", "student", "student2")
+        }
+        db.add_all(people.values())
+        db.commit()
+        return {
+            "organisation_id": organisation.id,
+            "ids": {role: user.id for role, user in people.items()},
+            "headers": {
+                role: {"Authorization": "Bearer " + create_access_token({"sub": str(user.id)})}
+                for role, user in people.items()
+            },
+        }
+
+
+def create_series(client, school) -> dict:
+    response = client.post("/lesson-series/", headers=school["headers"]["admin"], json={
+        **SERIES, "organisation_id": school["organisation_id"],
+        "teacher_ids": [school["ids"]["teacher"]], "student_ids": [school["ids"]["student"]],
+    })
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def changes(client, school, role: str, since=None) -> dict:
+    response = client.get("/lessons/changes", headers=school["headers"][role], params={"since": since} if since else {})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def occurrence_keys(lessons: list) -> list:
+    return [(lesson["id"], lesson["series_id"], lesson["occurrence_date"]) for lesson in lessons]
+
+
+def test_full_and_incremental_syncs_include_series_occurrences(client, school):
+    cursor = changes(client, school, "teacher")["cursor"]
+    series = create_series(client, school)
+    dates = ["2026-03-02", "2026-03-09", "2026-03-16"]
+
+    for role in ("admin", "teacher", "student"):
+        assert occurrence_keys(changes(client, school, role)["lessons"]) == [(None, series["id"], d) for d in dates]
+    assert occurrence_keys(changes(client, school, "teacher", cursor)["lessons"]) == [(None, series["id"], d) for d in dates]
+    assert changes(client, school, "student2")["lessons"] == []
+
+    (published,) = bus.backend.events
+    assert published["type"] == "series.created" and published["lesson_id"] is None
+    assert published["user_ids"] == sorted([school["ids"]["teacher"], school["ids"]["student"]])
+
+
+def test_deleting_a_series_or_an_occurrence_reaches_the_change_feed(client, school):
+    series = create_series(client, school)
+    stored = client.post(f"/lesson-series/{series['id']}/occurrences/2026-03-09", headers=school["headers"]["teacher"]).json()
+    cursors = {role: changes(client, school, role)["cursor"] for role in ("admin", "teacher", "student2")}
+
+    assert client.delete(f"/lesson-series/{series['id']}/occurrences/2026-03-02", headers=school["headers"]["admin"]).status_code == 204
+    for role in ("admin", "teacher"):
+        feed = changes(client, school, role, cursors[role])
+        assert feed["deleted_occurrences"] == [{"series_id": series["id"], "occurrence_date": "2026-03-02"}]
+
+    assert client.delete(f"/lesson-series/{series['id']}", headers=school["headers"]["admin"]).status_code == 204
+    for role in ("admin", "teacher"):
+        feed = changes(client, school, role, cursors[role])
+        assert feed["deleted_series_ids"] == [series["id"]]
+        # the stored occurrence stays, as a one-off lesson
+        assert occurrence_keys(feed["lessons"]) == [(stored["id"], None, None)]
+    assert changes(client, school, "student2", cursors["student2"])["deleted_series_ids"] == []
+
+    assert [event["type"] for event in bus.backend.events] == ["series.created", "series.occurrence_deleted", "series.deleted"]
+    assert all(school["ids"]["student2"] not in event["user_ids"] for event in bus.backend.events)
@@ -0,0 +1,132 @@
+import json
+from datetime import date, time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app import utils
+from app.documents import lesson_documents
+from app.main import app
+from app.models.associations import LessonStudent
+from app.models.lesson import Lesson
+from app.models.organisation import Organisation
+from app.models.shard import OrganisationShard
+from app.models.user import User
+from app.tenancy import OrganisationMoving, TenantRouter, load_shards, move_organisation, prepare_shard
+from app.utils import create_access_token, get_tenant_db
+
+SHARD_B_OFFSET = 1000000
+
+
+@pytest.fixture
+def router(tmp_path, monkeypatch):
+    router = TenantRouter(load_shards(json.dumps({
+        "default": f"sqlite:///{tmp_path}/default.db",
+        "b": {"url": f"sqlite:///{tmp_path}/b.db", "id_offset": SHARD_B_OFFSET},
+    })), cache_seconds=0)
+    for name in router.shards:
+        prepare_shard(name, router)
+    # what get_tenant_db and get_current_user route through
+    monkeypatch.setattr(utils, "tenants", router)
+    lesson_documents.clear()
+    yield router
+    lesson_documents.clear()
+    for engine in router._engines.values():
+        engine.dispose()
+
+
+def add_school(router: TenantRouter, shard: str, name: str) -> dict:
+    with router.session(shard) as db:
+        organisation = Organisation(name=name)
+        db.add(organisation)
+        db.flush()
+        teacher, student = (
+            User(name=f"{name} {role}", email=f"{role}@{name.lower()}.example.com", password="x", role=role,
+                 organisation_id=organisation.id, is_verified=True)
+            for role in ("teacher", "student")
+        )
+        lesson = Lesson(date=date(2026, 1, 5), time=time(10), subject=name, duration=60, location="Room 1", price=40,
+                        organisation_id=organisation.id, teachers=[teacher],
+                        student_links=[LessonStudent(student=student, attendance_status="assigned", payment_status="unpaid")])
+        db.add_all([teacher, student, lesson])
+        db.commit()
+        if shard != "default":
+            with router.session("default") as directory:
+                directory.add(OrganisationShard(organisation_id=organisation.id, shard=shard, moving=False))
+                directory.commit()
+        return {"id": organisation.id, "teacher_id": teacher.id, "lesson_id": lesson.id}
+
+
+def count(router: TenantRouter, shard: str, model, organisation_id: int) -> int:
+    with router.session(shard) as db:
+        return db.scalar(select(func.count()).select_from(model).where(model.organisation_id == organisation_id))
+
+
+def token(school: dict, user_id: int) -> str:
+    return create_access_token({"sub": str(user_id), "org": school["id"]})
+
+
+def test_shards_need_distinct_id_offsets():
+    with pytest.raises(ValueError, match="needs a positive id_offset"):
+        load_shards(json.dumps({"b": "sqlite://"}))
+    with pytest.raises(ValueError, match="same id_offset"):
+        load_shards(json.dumps({"b": {"url": "sqlite://", "id_offset": 5}, "c": {"url": "sqlite://", "id_offset": 5}}))
+
+
+def test_each_shard_hands_out_ids_from_its_own_range(router):
+    on_default, on_b = add_school(router, "default", "Elm"), add_school(router, "b", "Oak")
+    assert on_default["lesson_id"] < SHARD_B_OFFSET <= on_b["lesson_id"]
+    assert on_default["teacher_id"] < SHARD_B_OFFSET <= on_b["teacher_id"]
+
+
+def test_organisations_are_routed_to_their_shard(router):
+    on_default, on_b = add_school(router, "default", "Elm"), add_school(router, "b", "Oak")
+    assert router.session_for(on_default["id"]).get_bind() is router.engine("default")
+    assert router.session_for(on_b["id"]).get_bind() is router.engine("b")
+    # tokens issued before sharding carry no organisation
+    assert router.session_for(None).get_bind() is router.engine("default")
+
+    with router.session("default") as db:
+        db.merge(OrganisationShard(organisation_id=on_b["id"], shard="b", moving=True))
+        db.commit()
+    with pytest.raises(OrganisationMoving):
+        router.session_for(on_b["id"])
+
+
+def test_get_tenant_db_picks_the_engine_of_the_callers_organisation(router):
+    on_default, on_b = add_school(router, "default", "Elm"), add_school(router, "b", "Oak")
+    for school, shard in [(on_default, "default"), (on_b, "b")]:
+        dependency = get_tenant_db(token(school, school["teacher_id"]))
+        db = next(dependency)
+        assert db.get_bind() is router.engine(shard)
+        dependency.close()
+
+    client = TestClient(app)
+    for school in (on_default, on_b):
+        response = client.get("/lessons/my-lessons", headers={"Authorization": "Bearer " + token(school, school["teacher_id"])})
+        assert response.status_code == 200
+        assert [lesson["id"] for lesson in response.json()] == [school["lesson_id"]]
+
+
+def test_move_organisation_between_sqlite_files(router):
+    moving, staying = add_school(router, "default", "Elm"), add_school(router, "default", "Ash")
+
+    copied = move_organisation(moving["id"], "b", router=router, drain_seconds=0)
+    assert copied["lessons"] == 1 and copied["users"] == 2 and copied["lesson_students"] == 1
+    assert router.placement(moving["id"]) == ("b", False)
+    assert count(router, "default", Lesson, moving["id"]) == 0 and count(router, "default", User, moving["id"]) == 0
+    with router.session("b") as db:
+        # ids are kept, so tokens and client caches stay valid
+        assert db.get(Lesson, moving["lesson_id"]).teachers[0].id == moving["teacher_id"]
+    assert count(router, "default", Lesson, staying["id"]) == 1
+
+    client = TestClient(app)
+    response = client.get("/lessons/my-lessons", headers={"Authorization": "Bearer " + token(moving, moving["teacher_id"])})
+    assert response.status_code == 200 and [lesson["id"] for lesson in response.json()] == [moving["lesson_id"]]
+
+    move_organisation(moving["id"], "default", router=router, drain_seconds=0)
+    assert router.placement(moving["id"]) == ("default", False)
+    with router.session("default") as db:
+        assert db.get(OrganisationShard, moving["id"]) is None
+    assert count(router, "b", Lesson, moving["id"]) == 0 and count(router, "default", Lesson, moving["id"]) == 1
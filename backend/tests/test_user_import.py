@@ -0,0 +1,74 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app import user_import, utils
+from app.api.routes import user as user_routes
+from app.main import app
+from app.models.organisation import Organisation
+from app.models.user import User
+from app.tenancy import TenantRouter, load_shards, prepare_shard
+from app.utils import create_access_token
+
+
+@pytest.fixture
+def router(tmp_path, monkeypatch):
+    router = TenantRouter(load_shards(json.dumps({"default": f"sqlite:///{tmp_path}/default.db"})), cache_seconds=0)
+    prepare_shard("default", router)
+    for module in (utils, user_import, user_routes):
+        monkeypatch.setattr(module, "tenants", router)
+    # verification emails are not what these tests are about
+    monkeypatch.setattr(user_routes, "send_verification_emails", lambda emails: None)
+    yield router
+    router.engine("default").dispose()
+
+
+@pytest.fixture
+def admin_headers(router):
+    with router.session("default") as db:
+        organisation = Organisation(name="Import School")
+        db.add(organisation)
+        db.flush()
+        admin = User(name="Admin", email="admin@example.com", password="x", role="admin",
+                     organisation_id=organisation.id, is_verified=True)
+        db.add(admin)
+        db.commit()
+        return {"Authorization": "Bearer " + create_access_token({"sub": str(admin.id), "org": organisation.id})}
+
+
+def row(email) -> dict:
+    return {"name": "Student", "email": email, "role": "student", "password": "secret"}
+
+
+def test_rows_with_non_string_emails_are_reported(router, admin_headers):
+    response = TestClient(app).post("/users/import", headers=admin_headers, json={
+        "users": [row(42), row(["a@example.com"]), row({"address": "b@example.com"}), row("new@example.com")],
+    })
+
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
+    assert [(error["row"], error["email"]) for error in response.json()["errors"]] == [(1, "42"), (2, None), (3, None)]
+    with router.session("default") as db:
+        assert db.execute(select(User.email).where(User.role == "student")).scalars().all() == ["new@example.com"]
+
+
+def test_a_response_that_cannot_be_built_creates_nobody(router, admin_headers, monkeypatch):
+    real_import_users = user_routes.import_users
+
+    def import_users(db, raw_rows, organisation_id):
+        result = real_import_users(db, raw_rows, organisation_id)
+        result["errors"].append({"row": 2, "email": object(), "detail": "unserialisable"})
+        return result
+
+    monkeypatch.setattr(user_routes, "import_users", import_users)
+    with pytest.raises(Exception):
+        TestClient(app).post("/users/import", headers=admin_headers, json={"users": [row("new@example.com")]})
+
+    with router.session("default") as db:
+        assert db.execute(select(User).where(User.email == "new@example.com")).first() is None
+    # the claim was released too, so a retry can create the user
+    monkeypatch.setattr(user_routes, "import_users", real_import_users)
+    response = TestClient(app).post("/users/import", headers=admin_headers, json={"users": [row("new@example.com")]})
+    assert response.json() == {"created": 1, "errors": []}